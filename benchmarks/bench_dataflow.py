@@ -0,0 +1,107 @@
+# Compare the evaluation time of a feed forward chain through OpenMDAO and the native dataflow
+
+import sys
+import timeit
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.fused_codegen import FUSED_Compiled
+
+# A cheap component in a chain, it reads the output of the previous link
+class chain_link(FUSED_Object):
+
+    def __init__(self, i):
+
+        super(chain_link, self).__init__()
+
+        self.add_input(**{'name': 'x%d' % i, 'val': 1.0, 'type': float})
+        self.add_input(**{'name': 'scale', 'val': 1.0, 'type': float})
+        self.add_output(**{'name': 'x%d' % (i+1), 'val': 0.0, 'type': float})
+        self.add_output(**{'name': 'curve%d' % i, 'val': np.zeros(161), 'type': float, 'shape': (161,)})
+
+        self.names = ('x%d' % i, 'curve%d' % i, 'x%d' % (i+1))
+        self.grid = np.linspace(0.0, 40.0, 161)
+
+    def compute(self, inputs, outputs):
+
+        x_in, curve, x_out = self.names
+        x = inputs[x_in]
+        outputs[curve] = x * self.grid
+        outputs[x_out] = 1.01 * x * inputs['scale']
+
+def build_openmdao(n):
+
+    from fusedwind.fused_openmdao import FUSED_Component, FUSED_Group, FUSED_add, FUSED_Problem, FUSED_setup
+
+    root = FUSED_Group()
+    for i in range(n):
+        FUSED_add(root, 'link%d' % i, FUSED_Component(chain_link(i)), ['*'])
+    prob = FUSED_Problem(root)
+    FUSED_setup(prob)
+
+    return prob
+
+def build_dataflow(n):
+
+    flow = FUSED_Dataflow()
+    for i in range(n):
+        flow.add('link%d' % i, chain_link(i))
+    flow.setup()
+
+    return flow
+
+if __name__=="__main__":
+
+    n = 5
+    number = 2000
+
+    flow = build_dataflow(n)
+    # Each evaluation sets the input, runs and reads the final output
+    def evaluate_flow():
+
+        flow['x0'] = 2.0
+        flow.run()
+        return flow['x%d' % n].copy()
+
+    t_flow = min(timeit.repeat(evaluate_flow, number=number, repeat=3)) / number
+    print('native dataflow   %10.2f us per evaluation' % (1e6 * t_flow))
+
+    compiled = FUSED_Compiled(flow, inputs=['x0'], outputs=['x%d' % n])
+    x = compiled.pack({'x0': 2.0})
+    evaluate = compiled.evaluate
+    t_compiled = min(timeit.repeat(lambda: evaluate(x), number=number, repeat=3)) / number
+    print('compiled          %10.2f us per evaluation' % (1e6 * t_compiled))
+
+    # Only the final output is requested, the curves are no longer copied
+    pruned = build_dataflow(n)
+    pruned.prune(['x%d' % n])
+    def evaluate_pruned():
+
+        pruned['x0'] = 2.0
+        pruned.run()
+        return pruned['x%d' % n].copy()
+
+    t_pruned = min(timeit.repeat(evaluate_pruned, number=number, repeat=3)) / number
+    print('pruned dataflow   %10.2f us per evaluation' % (1e6 * t_pruned))
+
+    compiled = FUSED_Compiled(flow, inputs=['x0'], outputs=['x%d' % n], prune=True)
+    evaluate = compiled.evaluate
+    t_compiled_pruned = min(timeit.repeat(lambda: evaluate(x), number=number, repeat=3)) / number
+    print('compiled pruned   %10.2f us per evaluation' % (1e6 * t_compiled_pruned))
+
+    try:
+        from fusedwind.fused_openmdao import FUSED_run
+        prob = build_openmdao(n)
+    except ImportError:
+        print('OpenMDAO is not installed, skipping the comparison')
+        sys.exit(0)
+
+    prob['x0'] = 2.0
+    FUSED_run(prob)
+    print('max difference to OpenMDAO: %g' % abs(prob['x%d' % n] - flow['x%d' % n]).max())
+
+    t_prob = min(timeit.repeat(lambda: FUSED_run(prob), number=number, repeat=3)) / number
+    print('OpenMDAO problem  %10.2f us per evaluation' % (1e6 * t_prob))
+    print('speed up          %10.1f x' % (t_prob / t_flow))
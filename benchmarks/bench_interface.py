@@ -0,0 +1,78 @@
+# Compare construction time and memory of FUSED objects against the former nested dict interfaces
+
+import copy
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+from fusedwind.windio_plant_costs import fifc_aep
+
+# Interfaces as they were stored before, every variable a deep copied dict
+class legacy_object(object):
+
+    def __init__(self):
+
+        self.interface = {'output': {}, 'input': {}}
+
+    def implement_fifc(self, fifc):
+
+        for k, v in fifc['input'].items():
+            self.add_input(**dict(v.items()))
+        for k, v in fifc['output'].items():
+            self.add_output(**dict(v.items()))
+
+    def add_input(self, **kwargs):
+
+        self.interface['input'][kwargs['name']] = copy.deepcopy(kwargs)
+
+    def add_output(self, **kwargs):
+
+        self.interface['output'][kwargs['name']] = copy.deepcopy(kwargs)
+
+# The variables of the CSM AEP wrapper
+def declare(obj):
+
+    obj.implement_fifc(fifc_aep)
+    for name in ['max_tip_speed', 'max_power_coefficient', 'opt_tsr', 'cut_in_wind_speed', 'cut_out_wind_speed',
+                 'air_density', 'max_efficiency', 'thrust_coefficient', 'soiling_losses', 'array_losses',
+                 'availability', 'shear_exponent', 'wind_speed_50m', 'weibull_k', 'altitude']:
+        obj.add_input(**{'name': name, 'val': 0.0, 'type': float})
+    for name in ['rated_wind_speed', 'rated_rotor_speed', 'rotor_thrust', 'rotor_torque', 'gross_aep', 'capacity_factor']:
+        obj.add_output(**{'name': name, 'val': 0.0, 'type': float})
+    obj.add_output(**{'name': 'power_curve', 'val': np.zeros(161), 'type': float, 'shape': (161,)})
+
+    return obj
+
+def build_legacy():
+
+    return declare(legacy_object())
+
+def build_fused():
+
+    return declare(FUSED_Object())
+
+# Time and memory per object while n objects are alive, as in a farm level study
+def measure(build, n):
+
+    t = min(timeit.repeat(lambda: [build() for i in range(n)], number=1, repeat=3)) / n
+
+    tracemalloc.start()
+    objects = [build() for i in range(n)]
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return t, size / float(n)
+
+if __name__=="__main__":
+
+    n = 2000
+
+    t_legacy, m_legacy = measure(build_legacy, n)
+    t_fused, m_fused = measure(build_fused, n)
+
+    print('                 construction     memory per object')
+    print('nested dicts    %10.1f us   %10.0f bytes' % (1e6 * t_legacy, m_legacy))
+    print('slotted records %10.1f us   %10.0f bytes' % (1e6 * t_fused, m_fused))
+    print('reduction       %10.1f x    %10.1f x' % (t_legacy / t_fused, m_legacy / m_fused))
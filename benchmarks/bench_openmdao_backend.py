@@ -0,0 +1,62 @@
+# Import time of the FUSED OpenMDAO wrappers and their per-call overhead
+
+import subprocess
+import sys
+import timeit
+
+from fusedwind.fused_wind import FUSED_Object
+
+IMPORT_TIME = """
+import sys, time
+import numpy
+t = time.time()
+import fusedwind.fused_openmdao
+print('%g %d' % (time.time() - t, 'openmdao' in sys.modules))
+"""
+
+# A model with as many variables as the CSM AEP wrapper
+class wide_model(FUSED_Object):
+
+    def __init__(self):
+
+        super(wide_model, self).__init__()
+
+        for i in range(20):
+            self.add_input(**{'name': 'x%d' % i, 'val': 0.0, 'type': float})
+        for i in range(8):
+            self.add_output(**{'name': 'y%d' % i, 'val': 0.0, 'type': float})
+
+    def compute(self, inputs, outputs):
+
+        outputs['y0'] = inputs['x0']
+
+# Seconds to import the wrappers in a fresh interpreter and whether that imported OpenMDAO
+def import_time():
+
+    t, imported = subprocess.check_output([sys.executable, '-c', IMPORT_TIME]).decode().split()
+
+    return float(t), bool(int(imported))
+
+if __name__=="__main__":
+
+    t_import, imported = min(import_time() for i in range(5))
+    print('import fusedwind.fused_openmdao    %10.2f ms, OpenMDAO imported: %s' % (1e3 * t_import, imported))
+
+    from fusedwind.fused_openmdao import FUSED_Component, FUSED_Group, FUSED_add, FUSED_Problem, FUSED_setup, FUSED_run
+
+    model = wide_model()
+    number = 200
+    t_component = min(timeit.repeat(lambda: FUSED_Component(model), number=number, repeat=3)) / number
+    print('FUSED_Component construction       %10.2f us' % (1e6 * t_component))
+
+    root = FUSED_Group()
+    number = 200
+    t_add = min(timeit.repeat(lambda: FUSED_add(FUSED_Group(), 'c', FUSED_Component(model), ['*']), number=number, repeat=3)) / number
+    print('FUSED_add with a new component     %10.2f us' % (1e6 * t_add))
+
+    FUSED_add(root, 'c', FUSED_Component(model), ['*'])
+    prob = FUSED_Problem(root)
+    FUSED_setup(prob)
+    number = 2000
+    t_run = min(timeit.repeat(lambda: FUSED_run(prob), number=number, repeat=3)) / number
+    print('FUSED_run                          %10.2f us' % (1e6 * t_run))
@@ -0,0 +1,106 @@
+# Compare serial finite differences of a FUSED component, one compute per input, to batched partials computed in one call
+
+import sys
+import timeit
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+from fusedwind.fused_partials import FUSED_Partials
+
+# Power curve scaled per wind speed bin, the Jacobian to the bins is diagonal
+class scaled_curve(FUSED_Object):
+
+    vectorized = True
+    complex_step = True
+
+    def __init__(self, n=161):
+
+        super(scaled_curve, self).__init__()
+
+        self.add_input(**{'name': 'rating', 'val': 5000.0, 'type': float})
+        self.add_input(**{'name': 'bins', 'val': np.linspace(0.0, 1.0, n), 'type': float, 'shape': (n,)})
+        self.add_output(**{'name': 'curve', 'val': np.zeros(n), 'type': float, 'shape': (n,)})
+        self.add_output(**{'name': 'total', 'val': 0.0, 'type': float})
+
+    def compute(self, inputs, outputs):
+
+        rating = np.asarray(inputs['rating'])[..., None]
+        curve = rating * np.tanh(3.0 * inputs['bins'] ** 2)
+        outputs['curve'] = curve
+        outputs['total'] = curve.sum(axis=-1)
+
+def build(partials):
+
+    from fusedwind.fused_openmdao import FUSED_Component, FUSED_Group, FUSED_add, FUSED_Problem, FUSED_setup
+
+    root = FUSED_Group()
+    comp = FUSED_Component(scaled_curve(), partials=partials)
+    FUSED_add(root, 'curve', comp, ['*'])
+    if partials is None:
+        comp.declare_partials('*', '*', method='fd')
+    prob = FUSED_Problem(root)
+    FUSED_setup(prob)
+
+    return prob
+
+# Forward differences with one call of compute per perturbed input, as finite differencing in OpenMDAO does
+def serial_jacobian(model, step=1e-6):
+
+    inputs = dict((k, np.array(v['val'], dtype=float)) for k, v in model.interface['input'].items())
+    base = {}
+    model.compute(inputs, base)
+    J = {}
+    for wrt in sorted(inputs.keys()):
+        x = inputs[wrt].reshape(-1)
+        for j in range(x.size):
+            x[j] += step
+            outputs = {}
+            model.compute(inputs, outputs)
+            x[j] -= step
+            for of in outputs.keys():
+                J.setdefault((of, wrt), []).append((np.ravel(outputs[of]) - np.ravel(base[of])) / step)
+
+    return dict((k, np.array(v).T) for k, v in J.items())
+
+if __name__=="__main__":
+
+    number = 20
+    model = scaled_curve()
+
+    t_serial = min(timeit.repeat(lambda: serial_jacobian(model), number=number, repeat=3)) / number
+    print('serial fd      %10.3f ms per Jacobian' % (1e3 * t_serial))
+    for method in ['fd', 'cs']:
+        partials = FUSED_Partials(model, method)
+        t = min(timeit.repeat(partials.jacobian, number=number, repeat=3)) / number
+        print('batched %-6s %10.3f ms per Jacobian, %d of %d entries nonzero, speed up %.1f x' %
+              (method, 1e3 * t, partials.sparsity.sum(), partials.sparsity.size, t_serial / t))
+
+    # Finite differences against the complex step for an input at the magnitude of the annual energy and costs of
+    # a plant, where an absolute step of 1e-6 would be below the resolution of the input
+    tolerance = 1e-6
+    large = {'rating': 1.3e9}
+    fd = FUSED_Partials(model, 'fd')
+    J_fd = fd.jacobian(large)
+    J_cs = FUSED_Partials(model, 'cs').jacobian(large)
+    j = fd.input_layout['rating'][0]
+    error = abs(J_fd[:, j] - J_cs[:, j]).max() / abs(J_cs[:, j]).max()
+    print('fd to cs relative difference at a rating of %g: %g, tolerance %g' % (large['rating'], error, tolerance))
+    if error > tolerance:
+        raise Exception('Finite differences do not agree with the complex step')
+
+    try:
+        from fusedwind.fused_openmdao import FUSED_run
+        problems = [('OpenMDAO fd', build(None)), ('batched fd', build('fd')), ('batched cs', build('cs'))]
+    except ImportError:
+        print('OpenMDAO is not installed, skipping the comparison of totals')
+        sys.exit(0)
+
+    reference = None
+    for label, prob in problems:
+        FUSED_run(prob)
+        J = prob.compute_totals(['curve', 'total'], ['rating', 'bins'])
+        if reference is None:
+            reference = J
+        error = max(abs(J[k] - reference[k]).max() for k in J.keys())
+        print('%-14s max difference of the totals to OpenMDAO fd %g' % (label, error))
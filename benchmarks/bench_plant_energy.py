@@ -0,0 +1,50 @@
+# Compare the AEP of many sites in one vectorized pass to one evaluation per site
+
+import time
+
+import numpy as np
+
+from fusedwind.plant_energy import aep_weibull_fused, default_wind_curve
+
+# Cubic power curve of a 5 MW turbine between cut in at 3 m/s and rated at 11.5 m/s, cut out at 25 m/s
+def power_curve(v):
+
+    curve = np.clip(5000.0 * ((v - 3.0) / 8.5) ** 3, 0.0, 5000.0)
+    curve[(v < 3.0) | (v > 25.0)] = 0.0
+
+    return curve
+
+def plant_inputs(sites):
+
+    inputs = {'power_curve': power_curve(default_wind_curve), 'wind_curve': default_wind_curve,
+              'machine_rating': 5000.0, 'hub_height': 90.0, 'turbine_number': 100.0,
+              'soiling_losses': 0.0, 'array_losses': 0.1, 'availability': 0.941}
+    inputs.update(sites)
+
+    return inputs
+
+if __name__=="__main__":
+
+    n = 100000
+    n_single = 2000
+    rng = np.random.RandomState(0)
+    sites = {'wind_speed_50m': rng.uniform(5.0, 11.0, n),
+             'weibull_k': rng.uniform(1.5, 3.0, n),
+             'shear_exponent': rng.uniform(0.05, 0.2, n)}
+
+    aep = aep_weibull_fused(n_sites=n)
+    outputs = {}
+    start = time.time()
+    aep.compute(plant_inputs(sites), outputs)
+    t_multi = (time.time() - start) / n
+    print('multi-site      %10.3f us per site' % (1e6 * t_multi))
+
+    single = aep_weibull_fused(n_sites=1)
+    single_outputs = {}
+    start = time.time()
+    for i in range(n_single):
+        single.compute(plant_inputs(dict((k, v[i:i+1]) for k, v in sites.items())), single_outputs)
+    t_single = (time.time() - start) / n_single
+    print('one per call    %10.3f us per site' % (1e6 * t_single))
+    print('speed up        %10.1f x' % (t_single / t_multi))
+    print('max difference  %10.3g' % abs(single_outputs['net_aep'][0] / outputs['net_aep'][n_single - 1] - 1.0))
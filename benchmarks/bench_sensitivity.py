@@ -0,0 +1,71 @@
+# Compare the Sobol indices of a 20 input model computed one evaluation at a time to batched and pooled evaluations
+
+import time
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.fused_sensitivity import FUSED_Sensitivity, problem_bounds
+
+weights = np.array([0.0, 0.5, 1.0, 2.0, 4.0] + [9.0] * 5 + [99.0] * 10)
+
+# G function of Sobol on the unit cube, whose indices are known in closed form
+class g_function(FUSED_Object):
+
+    vectorized = True
+
+    def __init__(self):
+
+        super(g_function, self).__init__()
+
+        for i in range(len(weights)):
+            self.add_input(**{'name': 'x%02d' % i, 'val': 0.5, 'type': float, 'lower': 0.0, 'upper': 1.0})
+        self.add_output(**{'name': 'g', 'val': 0.0, 'type': float})
+
+    def compute(self, inputs, outputs):
+
+        g = 1.0
+        for i in range(len(weights)):
+            g = g * (np.abs(4.0 * np.asarray(inputs['x%02d' % i]) - 2.0) + weights[i]) / (1.0 + weights[i])
+        outputs['g'] = g
+
+def g_dataflow():
+
+    flow = FUSED_Dataflow()
+    flow.add('g', g_function())
+    flow.setup()
+
+    return flow
+
+def exact_indices():
+
+    partial = 1.0 / (3.0 * (1.0 + weights) ** 2)
+    variance = np.prod(1.0 + partial) - 1.0
+
+    return partial / variance, partial * np.prod(1.0 + partial) / (1.0 + partial) / variance
+
+def report(label, summary, seconds):
+
+    first, total = exact_indices()
+    result = summary['outputs']['g']
+    error = max(np.abs(result['first'] - first).max(), np.abs(result['total'] - total).max())
+    print('%-14s %8.2f us per evaluation, %7d evaluations, largest index error %.3f'
+          % (label, 1e6 * seconds / summary['evaluations'], summary['evaluations'], error))
+
+if __name__=="__main__":
+
+    # The factories are not called for their bounds, they are taken from the interface of the model
+    bounds = problem_bounds(g_function())
+
+    start = time.time()
+    summary = FUSED_Sensitivity(g_dataflow, ['g'], bounds, n=256, processes=0, resamples=100).run()
+    report('one at a time', summary, time.time() - start)
+
+    start = time.time()
+    summary = FUSED_Sensitivity(g_dataflow, ['g'], bounds, n=1024, processes=None, chunk_size=1024, resamples=100).run()
+    report('process pool', summary, time.time() - start)
+
+    start = time.time()
+    summary = FUSED_Sensitivity(g_function(), ['g'], n=4096, chunk_size=16384, resamples=100).run()
+    report('batched', summary, time.time() - start)
@@ -0,0 +1,46 @@
+# Compare a cold evaluation that builds and sets up its problem to a request on a warm evaluation server
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from fusedwind.fused_doe import FUSED_DOE
+from fusedwind.fused_server import FUSED_Server, FUSED_Client
+
+from bench_dataflow import build_dataflow, build_openmdao
+
+# Setup dominates for an OpenMDAO problem, the native dataflow is used when OpenMDAO is not installed
+def chain():
+
+    try:
+        return build_openmdao(20)
+    except ImportError:
+        return build_dataflow(20)
+
+if __name__=="__main__":
+
+    cases = {'x0': np.linspace(1.0, 2.0, 32)}
+    number = 20
+
+    start = time.time()
+    for i in range(number):
+        FUSED_DOE(chain, cases, ['x20'], processes=0).run()
+    t_cold = (time.time() - start) / number
+    print('cold evaluation           %10.2f ms per request' % (1e3 * t_cold))
+
+    address = os.path.join(tempfile.mkdtemp(), 'fused.sock')
+    server = FUSED_Server({'chain': chain}, address, processes=2, chunk_size=16).start()
+    client = FUSED_Client(server.address)
+    client.evaluate('chain', cases, ['x20'])
+
+    start = time.time()
+    for i in range(number):
+        client.evaluate('chain', cases, ['x20'])
+    t_warm = (time.time() - start) / number
+    print('warm server               %10.2f ms per request' % (1e3 * t_warm))
+    print('speed up                  %10.1f x' % (t_cold / t_warm))
+
+    client.close()
+    server.close()
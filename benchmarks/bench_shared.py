@@ -0,0 +1,71 @@
+# Compare a sweep whose tasks each carry a long wind time series to one reading it from shared memory
+
+import time
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.fused_doe import FUSED_DOE
+
+# Ten years of 10 minute means
+n_steps = 10 * 8760 * 6
+
+# Energy of a power law curve over a wind time series of 10 minute means
+class series_energy(FUSED_Object):
+
+    def __init__(self):
+
+        super(series_energy, self).__init__()
+
+        self.add_input(**{'name': 'wind_series', 'val': np.zeros(n_steps), 'type': float, 'shape': (n_steps,)})
+        self.add_input(**{'name': 'rated_wind_speed', 'val': 11.0, 'type': float})
+        self.add_output(**{'name': 'energy', 'val': 0.0, 'type': float})
+
+    def compute(self, inputs, outputs):
+
+        u = inputs['wind_series'] / inputs['rated_wind_speed']
+        outputs['energy'] = np.sum(np.minimum(u, 1.0) ** 3) / 6.0
+
+def build_dataflow():
+
+    flow = FUSED_Dataflow()
+    flow.add('energy', series_energy())
+    flow.setup()
+
+    return flow
+
+# The series is sent with the cases of every chunk, as when it is part of the case table
+class series_doe(FUSED_DOE):
+
+    def __init__(self, series, cases, outputs, processes):
+
+        super(series_doe, self).__init__(build_dataflow, cases, outputs, processes, chunk_size=1)
+        self.series = series
+
+    def case_rows(self, start, stop):
+
+        chunk = super(series_doe, self).case_rows(start, stop)
+        chunk['wind_series'] = np.tile(self.series, (stop - start, 1))
+
+        return chunk
+
+if __name__=="__main__":
+
+    n = 64
+    processes = 2
+    series = 8.0 * np.random.RandomState(0).weibull(2.0, n_steps)
+    cases = {'rated_wind_speed': np.linspace(10.0, 13.0, n)}
+    print('series of %.1f MB, %d cases on %d processes' % (series.nbytes / 1e6, n, processes))
+
+    start = time.time()
+    sent, errors = series_doe(series, cases, ['energy'], processes).run()
+    t_sent = time.time() - start
+    print('series per task %10.2f ms' % (1e3 * t_sent))
+
+    start = time.time()
+    shared, errors = FUSED_DOE(build_dataflow, cases, ['energy'], processes, chunk_size=1, shared={'wind_series': series}).run()
+    t_shared = time.time() - start
+    print('shared memory   %10.2f ms' % (1e3 * t_shared))
+    print('speed up        %10.1f x' % (t_sent / t_shared))
+    print('max difference: %g' % abs(sent['energy'] - shared['energy']).max())
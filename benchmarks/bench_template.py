@@ -0,0 +1,49 @@
+# Compare building and setting up a problem per request to taking a pooled instance from a template
+
+import sys
+import timeit
+
+from fusedwind.fused_template import FUSED_Template
+
+from bench_dataflow import build_dataflow, build_openmdao
+
+def request(template):
+
+    with template.problem() as problem:
+        problem['x0'] = 2.0
+        problem.run()
+
+if __name__=="__main__":
+
+    n = 20
+    number = 50
+
+    factory = lambda: build_dataflow(n)
+    t_build = min(timeit.repeat(factory, number=number, repeat=3)) / number
+    template = FUSED_Template(factory, pool_size=4)
+    t_pool = min(timeit.repeat(lambda: request(template), number=number, repeat=3)) / number
+    t_clone = min(timeit.repeat(template.clone, number=number, repeat=3)) / number
+    print('dataflow build and setup  %10.2f us' % (1e6 * t_build))
+    print('dataflow clone            %10.2f us, %.1f x faster than a build' % (1e6 * t_clone, t_build / t_clone))
+    print('dataflow pooled request   %10.2f us' % (1e6 * t_pool))
+
+    try:
+        from fusedwind.fused_openmdao import FUSED_run
+        build_openmdao(n)
+    except ImportError:
+        print('OpenMDAO is not installed, skipping the comparison')
+        sys.exit(0)
+
+    factory = lambda: build_openmdao(n)
+    t_build = min(timeit.repeat(factory, number=5, repeat=3)) / 5
+    template = FUSED_Template(factory, pool_size=4)
+    def request_openmdao():
+
+        with template.problem() as prob:
+            prob['x0'] = 2.0
+            FUSED_run(prob)
+
+    t_pool = min(timeit.repeat(request_openmdao, number=number, repeat=3)) / number
+    print('OpenMDAO build and setup  %10.2f us' % (1e6 * t_build))
+    print('OpenMDAO pooled request   %10.2f us' % (1e6 * t_pool))
+    print('speed up per request      %10.1f x' % (t_build / t_pool))
@@ -0,0 +1,73 @@
+# Compare cold loads of windio YAML files, parsed and compiled, to warm loads from the binary cache
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from fusedwind.fused_windio import FUSED_WindIO, load_windio
+
+# Library of n windio files of 5 interfaces of 12 variables each
+def write_library(path, n):
+
+    for i in range(n):
+        with open(os.path.join(path, 'schema_%03d.yaml' % i), 'w') as f:
+            for j in range(5):
+                f.write('fifc_%03d_%d:\n  output:\n' % (i, j))
+                for k in range(2):
+                    f.write('    out_%d: {type: float, val: 0.0, units: USD, desc: output %d}\n' % (k, k))
+                f.write('  input:\n')
+                for k in range(10):
+                    f.write('    in_%d: {type: float, val: 1.0, units: m, desc: input %d, lower: 0.0, upper: 10.0}\n' % (k, k))
+                f.write('    curve: {type: float, val: [0.0, 1.0, 2.0, 3.0], shape: [4]}\n')
+
+def load_library(path, cache_dir):
+
+    for name in sorted(os.listdir(path)):
+        load_windio(os.path.join(path, name), cache_dir)
+
+# Time to start python, import the plant cost interfaces and use one of them
+def import_time(cache_dir):
+
+    env = dict(os.environ, FUSED_CACHE_DIR=cache_dir)
+    code = 'import fusedwind.windio_plant_costs as w; w.fifc_aep'
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+
+    return time.time() - start
+
+if __name__=="__main__":
+
+    n = 300
+    work = tempfile.mkdtemp()
+    library = os.path.join(work, 'library')
+    cache_dir = os.path.join(work, 'cache')
+    os.makedirs(library)
+    write_library(library, n)
+
+    try:
+        start = time.time()
+        load_library(library, cache_dir)
+        t_cold = time.time() - start
+
+        start = time.time()
+        load_library(library, cache_dir)
+        t_warm = time.time() - start
+
+        print('cold load       %10.2f ms for %d files' % (1e3 * t_cold, n))
+        print('warm load       %10.2f ms for %d files' % (1e3 * t_warm, n))
+        print('speed up        %10.1f x' % (t_cold / t_warm))
+
+        start = time.time()
+        FUSED_WindIO(os.path.join(library, 'schema_000.yaml'), cache_dir)
+        print('lazy handle     %10.2f us' % (1e6 * (time.time() - start)))
+
+        plant_cache = os.path.join(work, 'plant')
+        t_import_cold = import_time(plant_cache)
+        t_import_warm = min(import_time(plant_cache) for i in range(3))
+        print('import cold     %10.2f ms' % (1e3 * t_import_cold))
+        print('import warm     %10.2f ms' % (1e3 * t_import_warm))
+    finally:
+        shutil.rmtree(work)
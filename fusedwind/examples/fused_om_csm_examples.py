@@ -5,11 +5,21 @@ FUSED LCOE assmbly example.
 # FUSED wrapper
 from fusedwind.fused_openmdao import FUSED_Component, FUSED_Group, FUSED_add, FUSED_print, \
                                      FUSED_Problem, FUSED_setup, FUSED_run, FUSED_VarComp
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.fused_doe import FUSED_DOE
+from fusedwind.fused_sampling import full_factorial
+from fusedwind.fused_template import FUSED_Template
+from fusedwind.fused_recorder import FUSED_Recorder, load_records
+from fusedwind.plant_energy import aep_weibull_fused, aep_series_fused
+from fusedwind.fused_plant import FUSED_PerTurbine
+from fusedwind.fused_uncertainty import FUSED_MonteCarlo, FUSED_Normal, FUSED_Uniform, FUSED_Triangular
+from fusedwind.fused_sensitivity import FUSED_Sensitivity
 
 # NREL cost and scaling model sub-assemblies
 from fusedwind.examples.fused_nrel_csm import tcc_csm_fused, bos_csm_fused, opex_csm_fused, fin_csm_fused, aep_csm_fused
 
 import numpy as np
+import tempfile
 
 ### examples for individual fused components
 ############################################
@@ -47,6 +57,8 @@ def example_aep():
     print("AEP output")
     FUSED_print(root)
 
+    return prob
+
 def example_turbine():
 
     # openmdao example of execution
@@ -163,33 +175,29 @@ def example_finance():
     FUSED_print(root)
 
 
-### Full NREL cost and scaling model LCOE assembly and problem execution
-#########################################################################
+def example_aep_batch():
 
-def example_lcoe():
+    # evaluate the AEP model for a sweep of mean wind speeds in one call
+    wind_speeds = np.linspace(6.0, 10.0, 9)
 
-    # openmdao example of execution
-    root = FUSED_Group()
-    FUSED_add(root, 'desvars',FUSED_VarComp([('machine_rating',5000.0),
-    																 ('rotor_diameter', 126.0),
-    																 ('hub_height', 90.0),
-    																 ('turbine_number', 100.0),
-    																 ('year', 2009.0),
-    																 ('month',12.0),
-    																 ('sea_depth', 20.0),
-    																 ]), ['*'])
+    aep = aep_csm_fused()
+    outputs = aep.compute_batch({'machine_rating': 5000.0, 'max_tip_speed': 80.0, 'rotor_diameter': 126.0,
+                                 'max_power_coefficient': 0.488, 'opt_tsr': 7.525, 'cut_in_wind_speed': 3.0,
+                                 'cut_out_wind_speed': 25.0, 'hub_height': 90.0, 'altitude': 0.0, 'air_density': 0.0,
+                                 'max_efficiency': 0.902, 'thrust_coefficient': 0.5, 'soiling_losses': 0.0,
+                                 'array_losses': 0.1, 'availability': 0.941, 'turbine_number': 100,
+                                 'shear_exponent': 0.1, 'weibull_k': 2.15, 'wind_speed_50m': wind_speeds})
 
-    FUSED_add(root, 'tcc_csm_test', FUSED_Component(tcc_csm_fused()), ['*'])
-    FUSED_add(root, 'aep_test', FUSED_Component(aep_csm_fused()), ['*'])
-    FUSED_add(root, 'bos_csm_test', FUSED_Component(bos_csm_fused()), ['*'])
-    FUSED_add(root, 'opex_csm_test', FUSED_Component(opex_csm_fused()), ['*'])
-    FUSED_add(root, 'fin_csm_test', FUSED_Component(fin_csm_fused()), ['*'])
+    print("Net AEP for a sweep of mean wind speeds at 50 m")
+    for ws, net_aep in zip(wind_speeds, outputs['net_aep']):
+        print(str(ws) + ' ' + str(net_aep))
 
-    prob = FUSED_Problem(root)
-    FUSED_setup(prob)
 
+### Full NREL cost and scaling model LCOE assembly and problem execution
+#########################################################################
+
+def set_lcoe_inputs(prob):
 
-    # set inputs
     # simple test of module
     # Turbine inputs
     prob['rotor_diameter'] = 126.0
@@ -235,14 +243,246 @@ def example_lcoe():
     prob['sea_depth'] = 20.0
     prob['multiplier'] = 1.0
 
+def example_lcoe():
+
+    # openmdao example of execution
+    root = FUSED_Group()
+    FUSED_add(root, 'desvars',FUSED_VarComp([('machine_rating',5000.0),
+    																 ('rotor_diameter', 126.0),
+    																 ('hub_height', 90.0),
+    																 ('turbine_number', 100.0),
+    																 ('year', 2009.0),
+    																 ('month',12.0),
+    																 ('sea_depth', 20.0),
+    																 ]), ['*'])
+
+    FUSED_add(root, 'tcc_csm_test', FUSED_Component(tcc_csm_fused()), ['*'])
+    FUSED_add(root, 'aep_test', FUSED_Component(aep_csm_fused()), ['*'])
+    FUSED_add(root, 'bos_csm_test', FUSED_Component(bos_csm_fused()), ['*'])
+    FUSED_add(root, 'opex_csm_test', FUSED_Component(opex_csm_fused()), ['*'])
+    FUSED_add(root, 'fin_csm_test', FUSED_Component(fin_csm_fused()), ['*'])
+
+    prob = FUSED_Problem(root)
+    FUSED_setup(prob)
+
+    set_lcoe_inputs(prob)
+
     FUSED_run(prob)
     print("Overall cost of energy for an offshore wind plant with 100 NREL 5 MW turbines")
     FUSED_print(root)
 
+    return prob
+
+# the same assembly executed natively without OpenMDAO
+def lcoe_dataflow():
+
+    flow = FUSED_Dataflow()
+    flow.add('tcc_csm_test', tcc_csm_fused())
+    flow.add('aep_test', aep_csm_fused())
+    flow.add('bos_csm_test', bos_csm_fused())
+    flow.add('opex_csm_test', opex_csm_fused())
+    flow.add('fin_csm_test', fin_csm_fused())
+    flow.setup()
+
+    set_lcoe_inputs(flow)
+
+    return flow
+
+def example_lcoe_dataflow():
+
+    flow = lcoe_dataflow()
+    flow.run()
+    print("Overall cost of energy for an offshore wind plant with 100 NREL 5 MW turbines (native dataflow)")
+    flow.list_outputs()
+
+    prob = example_lcoe()
+    print("Difference in cost of energy to the OpenMDAO problem: " + str(flow['coe'] - prob['coe']))
+
+def example_lcoe_analysis():
+
+    # graph of the plant cost assembly, then only what contributes to the net energy production is run
+    flow = lcoe_dataflow()
+    print("Analysis of the plant cost assembly")
+    print('\n'.join(flow.analysis().report(['coe'])))
+
+    flow.prune(['net_aep'])
+    flow.run()
+    print("Net annual energy production from the pruned dataflow: " + str(flow['net_aep']))
+
+def example_lcoe_doe():
+
+    # full factorial sweep over wind resource and water depth on a pool of processes
+    cases = full_factorial({'wind_speed_50m': np.linspace(6.0, 10.0, 5),
+                            'sea_depth': [0.0, 10.0, 20.0, 30.0]})
+
+    doe = FUSED_DOE(lcoe_dataflow, cases, ['coe', 'net_aep', 'bos_costs'], processes=4, chunk_size=5)
+    values, errors = doe.run()
+
+    print("Cost of energy over wind speed and sea depth")
+    for i in range(len(values['coe'])):
+        print(str(cases['wind_speed_50m'][i]) + ' ' + str(cases['sea_depth'][i]) + ' ' + str(values['coe'][i]))
+    for i, error in sorted(errors.items()):
+        print('Case ' + str(i) + ' failed: ' + error)
+
+def example_lcoe_template():
+
+    # the dataflow is set up once, each request takes a pooled instance that is reset when it is returned
+    template = FUSED_Template(lcoe_dataflow, pool_size=2)
+
+    print("Cost of energy over wind speed from a pool of set up problems")
+    for wind_speed in [6.0, 8.0, 10.0]:
+        with template.problem() as flow:
+            flow['wind_speed_50m'] = wind_speed
+            flow.run()
+            print(str(wind_speed) + ' ' + str(flow['coe']))
+
+def example_lcoe_record():
+
+    # the sweep is streamed to one binary column per variable in a new directory, recording the same sweep to
+    # the directory again resumes it if it was interrupted, here every case is already recorded
+    cases = full_factorial({'wind_speed_50m': np.linspace(6.0, 10.0, 9),
+                            'sea_depth': np.linspace(0.0, 40.0, 9)})
+    path = tempfile.mkdtemp(prefix='fused_lcoe_sweep')
+
+    doe = FUSED_DOE(lcoe_dataflow, cases, ['coe', 'net_aep'], processes=4, chunk_size=9)
+    for attempt in range(2):
+        with FUSED_Recorder(path, ['wind_speed_50m', 'sea_depth', 'coe', 'net_aep']) as recorder:
+            doe.record(recorder)
+
+    records = load_records(path)
+    print("Lowest cost of energy of " + str(len(records['coe'])) + " recorded cases: " + str(records['coe'].min()))
+
+def example_aep_multisite():
+
+    # the power curve of the NREL 5 MW turbine from the cost and scaling model evaluated at many sites in one pass
+    prob = example_aep()
+    sites = {'wind_speed_50m': np.array([6.5, 8.02, 9.5]),
+             'weibull_k': np.array([1.8, 2.15, 2.4]),
+             'shear_exponent': np.array([0.14, 0.1, 0.08])}
+
+    aep = aep_weibull_fused(n_sites=3)
+    inputs = {}
+    for k in ['power_curve', 'machine_rating', 'hub_height', 'turbine_number', 'soiling_losses', 'array_losses', 'availability']:
+        inputs[k] = prob[k]
+    inputs['wind_curve'] = aep.interface['input']['wind_curve']['val']
+    inputs.update(sites)
+    outputs = {}
+    aep.compute(inputs, outputs)
+
+    print("Net AEP at the sample sites, multi-site component and cost and scaling model")
+    for i in range(3):
+        for k, v in sites.items():
+            prob[k] = v[i]
+        FUSED_run(prob)
+        print(str(outputs['net_aep'][i]) + ' ' + str(prob['net_aep']))
+
+def example_lcoe_series():
+
+    # ten minute wind speeds at hub height over three years, generated a month at a time in place of SCADA files
+    def wind_series():
+        rng = np.random.RandomState(0)
+        for month in range(36):
+            yield 9.0 * rng.weibull(2.15, 6 * 24 * 30)
+
+    # the power curve and the plant inputs are taken from the LCOE chain with the Weibull AEP of the cost and scaling model
+    lcoe = lcoe_dataflow()
+    lcoe.run()
+
+    flow = FUSED_Dataflow()
+    flow.add('tcc_csm_test', tcc_csm_fused())
+    flow.add('aep_series_test', aep_series_fused(wind_series))
+    flow.add('bos_csm_test', bos_csm_fused())
+    flow.add('opex_csm_test', opex_csm_fused())
+    flow.add('fin_csm_test', fin_csm_fused())
+    flow.setup()
+
+    for k in flow.independent_inputs():
+        if k in lcoe.values:
+            flow[k] = lcoe[k]
+    flow['measurement_height'] = 90.0
+    flow.run()
+
+    print("Cost of energy from a three year wind speed series and from the Weibull fit of the cost and scaling model")
+    print(str(flow['coe']) + ' ' + str(lcoe['coe']))
+
+def lcoe_per_turbine_dataflow(n_turbines=100):
+
+    # machine rating, rotor diameter and hub height are given per turbine and the costs are averaged over the turbines,
+    # the rotor loads of each turbine type pass from the AEP model to the turbine cost model
+    per_turbine = ['machine_rating', 'rotor_diameter', 'hub_height']
+    rotor_loads = {'rotor_thrust': 'array', 'rotor_torque': 'array'}
+
+    flow = FUSED_Dataflow()
+    flow.add('tcc_csm_test', FUSED_PerTurbine(tcc_csm_fused(), per_turbine + ['rotor_thrust', 'rotor_torque'], n_turbines))
+    flow.add('aep_test', FUSED_PerTurbine(aep_csm_fused(), per_turbine, n_turbines, rotor_loads))
+    flow.add('bos_csm_test', FUSED_PerTurbine(bos_csm_fused(), per_turbine, n_turbines))
+    flow.add('opex_csm_test', FUSED_PerTurbine(opex_csm_fused(), ['machine_rating'], n_turbines))
+    flow.add('fin_csm_test', fin_csm_fused())
+    flow.setup()
+
+    set_lcoe_inputs(flow)
+
+    return flow
+
+def example_lcoe_per_turbine():
+
+    flow = lcoe_per_turbine_dataflow(100)
+    flow.run()
+    print("Cost of energy of 100 NREL 5 MW turbines per turbine: " + str(flow['coe']))
+
+    # a third of the plant replaced by a smaller turbine type, each type is computed once
+    flow['machine_rating'][:33] = 3000.0
+    flow['rotor_diameter'][:33] = 100.0
+    flow['hub_height'][:33] = 80.0
+    flow.run()
+    print("Cost of energy of a plant with 67 NREL 5 MW and 33 3 MW turbines: " + str(flow['coe']))
+
+def example_lcoe_uncertainty():
+
+    # wind resource, losses and offshore cost multiplier drawn from a Sobol sequence in batches of 256 cases,
+    # sampling stops once the 95 % confidence intervals of the mean, P50 and P90 are within 0.5 % of their values
+    distributions = {'wind_speed_50m': FUSED_Normal(8.02, 0.4),
+                     'availability': FUSED_Triangular(0.90, 0.941, 0.96),
+                     'array_losses': FUSED_Uniform(0.08, 0.12),
+                     'multiplier': FUSED_Triangular(0.9, 1.0, 1.3)}
+
+    mc = FUSED_MonteCarlo(lcoe_dataflow, distributions, ['coe', 'net_aep'], batch_size=256, max_samples=16384,
+                          quantiles=(0.5, 0.9), rtol=0.005, processes=4)
+    summary = mc.run()
+
+    print("Uncertainty of the cost of energy from " + str(summary['samples']) + " cases, converged: " + str(summary['converged']))
+    for name, stats in sorted(summary['outputs'].items()):
+        print(name + ' mean ' + str(stats['mean']) + ' +- ' + str(stats['mean_interval']) + ' std ' + str(stats['std']) +
+              ' P50 ' + str(stats['quantiles'][0.5]) + ' P90 ' + str(stats['quantiles'][0.9]))
+
+def example_lcoe_sensitivity():
+
+    # first order and total Sobol indices of the cost of energy from a Saltelli design of 256*(7+2) cases
+    bounds = {'wind_speed_50m': (6.0, 10.0),
+              'weibull_k': (1.8, 2.5),
+              'availability': (0.90, 0.96),
+              'array_losses': (0.05, 0.15),
+              'sea_depth': (10.0, 40.0),
+              'multiplier': (0.9, 1.3),
+              'machine_rating': (4000.0, 6000.0)}
+
+    sensitivity = FUSED_Sensitivity(lcoe_dataflow, ['coe'], bounds, n=256, processes=4, chunk_size=256)
+    summary = sensitivity.run()
+
+    print("Sobol indices of the cost of energy from " + str(summary['evaluations']) + " cases")
+    result = summary['outputs']['coe']
+    for i, name in enumerate(summary['names']):
+        print(name + ' first ' + str(result['first'][i]) + ' ' + str(result['first_interval'][:, i]) +
+              ' total ' + str(result['total'][i]) + ' ' + str(result['total_interval'][:, i]))
+
 
 if __name__=="__main__":
 
     example_aep()
+
+    example_aep_batch()
+
+    example_aep_multisite()
     
     example_turbine()
     
@@ -253,3 +493,21 @@ if __name__=="__main__":
     example_finance()
     
     example_lcoe()
+
+    example_lcoe_dataflow()
+
+    example_lcoe_series()
+
+    example_lcoe_per_turbine()
+
+    example_lcoe_analysis()
+
+    example_lcoe_doe()
+
+    example_lcoe_template()
+
+    example_lcoe_record()
+
+    example_lcoe_uncertainty()
+
+    example_lcoe_sensitivity()
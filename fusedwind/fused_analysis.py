@@ -0,0 +1,129 @@
+# Static analysis of the graph of producers and consumers built from the interfaces of FUSED objects
+
+from fusedwind.fused_dataflow import build_graph, source_name, topological_levels
+
+# Graph of an assembly given as (name, object) pairs, inputs follow promotes=['*'] unless connected explicitly
+class FUSED_Analysis(object):
+
+    def __init__(self, objects, connections=None):
+
+        super(FUSED_Analysis,self).__init__()
+
+        if connections is None:
+            connections = {}
+        self.objects = list(objects)
+        self.connections = connections
+        self.producers, self.consumers, self.depends = build_graph(self.objects, connections)
+        self.names = [n for n, o in self.objects]
+        self.levels = topological_levels(self.names, self.depends)
+        self.interfaces = dict((n, o.interface) for n, o in self.objects)
+
+        # Variable feeding each input of each component
+        self.sources = {}
+        for name, obj in self.objects:
+            self.sources[name] = dict((k, source_name(connections, name, k)) for k in obj.interface['input'].keys())
+
+    # Inputs fed by no output per component, which are the independent inputs of the assembly
+    def unconnected_inputs(self):
+
+        found = {}
+        for name in self.names:
+            inputs = sorted(k for k, src in self.sources[name].items() if src not in self.producers)
+            if len(inputs) > 0:
+                found[name] = inputs
+
+        return found
+
+    # Explicit connections whose source is not the output of any component, usually a misspelt name
+    def dangling_connections(self):
+
+        return dict((target, source) for target, source in self.connections.items() if source not in self.producers)
+
+    # Outputs consumed by no component per component, outputs listed in requested count as used
+    def unused_outputs(self, requested=()):
+
+        found = {}
+        for name in self.names:
+            outputs = sorted(k for k in self.interfaces[name]['output'].keys() if k not in self.consumers and k not in requested)
+            if len(outputs) > 0:
+                found[name] = outputs
+
+        return found
+
+    # Variables and components the named outputs depend on, walking back from the outputs to the independent inputs
+    def dependencies(self, outputs):
+
+        variables = set()
+        components = set()
+        pending = list(outputs)
+        while len(pending) > 0:
+            k = pending.pop()
+            if k in variables:
+                continue
+            if k not in self.producers and k not in self.consumers:
+                raise Exception('The variable '+k+' is neither produced nor consumed by any component')
+            variables.add(k)
+            name = self.producers.get(k)
+            if name is not None and name not in components:
+                components.add(name)
+                pending.extend(self.sources[name].values())
+
+        return variables, components
+
+    # Pruned execution plan for the named outputs: the levels of the components that contribute to them,
+    # the outputs of each of these components that are needed, and the components and outputs that are skipped
+    def plan(self, outputs):
+
+        variables, components = self.dependencies(outputs)
+        levels = []
+        for level in self.levels:
+            level = [n for n in level if n in components]
+            if len(level) > 0:
+                levels.append(level)
+        copied = {}
+        skipped = {}
+        for name in components:
+            names = sorted(self.interfaces[name]['output'].keys())
+            copied[name] = [k for k in names if k in variables]
+            skipped[name] = [k for k in names if k not in variables]
+
+        return {'outputs': list(outputs),
+                'levels': levels,
+                'components': [n for level in levels for n in level],
+                'inputs': sorted(k for k in variables if k not in self.producers),
+                'copied_outputs': copied,
+                'skipped_outputs': dict((k, v) for k, v in skipped.items() if len(v) > 0),
+                'skipped_components': [n for n in self.names if n not in components]}
+
+    # Lines of a readable report, with the pruned plan when outputs are given
+    def report(self, outputs=None):
+
+        lines = []
+        unconnected = self.unconnected_inputs()
+        lines.append('Unconnected inputs:')
+        for name in self.names:
+            if name in unconnected:
+                lines.append('  ' + name + ': ' + ', '.join(unconnected[name]))
+        dangling = self.dangling_connections()
+        if len(dangling) > 0:
+            lines.append('Connections from variables no component produces:')
+            for target in sorted(dangling.keys()):
+                lines.append('  ' + dangling[target] + ' -> ' + target)
+        unused = self.unused_outputs(outputs if outputs is not None else ())
+        lines.append('Unused outputs:')
+        for name in self.names:
+            if name in unused:
+                lines.append('  ' + name + ': ' + ', '.join(unused[name]))
+
+        if outputs is not None:
+            plan = self.plan(outputs)
+            total = sum(len(self.interfaces[n]['output']) for n in self.names)
+            kept = sum(len(v) for v in plan['copied_outputs'].values())
+            lines.append('Plan for ' + ', '.join(outputs) + ': ' + str(len(plan['components'])) + ' of ' +
+                         str(len(self.names)) + ' components, ' + str(kept) + ' of ' + str(total) + ' outputs copied')
+            for level in plan['levels']:
+                lines.append('  ' + ', '.join(level))
+            if len(plan['skipped_components']) > 0:
+                lines.append('Skipped components: ' + ', '.join(plan['skipped_components']))
+
+        return lines
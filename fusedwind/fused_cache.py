@@ -0,0 +1,262 @@
+# Memoize the outputs of FUSED objects keyed on the values of their interface inputs
+
+import hashlib
+import os
+import pickle
+import tempfile
+import types
+from collections import OrderedDict
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+
+# Directory of the files FUSED keeps between runs, one directory per kind under ~/.cache/fusedwind or FUSED_CACHE_DIR
+def default_cache_dir(kind):
+
+    root = os.environ.get('FUSED_CACHE_DIR')
+    if root is None:
+        root = os.path.join(os.path.expanduser('~'), '.cache', 'fusedwind')
+
+    return os.path.join(root, kind)
+
+# Hash the values of the declared inputs of an interface, including arrays
+def hash_inputs(inner_dict, inputs, namespace=''):
+
+    h = hashlib.sha1(namespace.encode('utf-8'))
+    for k in sorted(inner_dict.keys()):
+        val = np.ascontiguousarray(inputs[k], dtype=float)
+        h.update(k.encode('utf-8'))
+        h.update(str(val.shape).encode('utf-8'))
+        h.update(val.tobytes())
+
+    return h.hexdigest()
+
+# Least recently used store of outputs with a memory budget and an optional on-disk tier
+class FUSED_Cache(object):
+
+    def __init__(self, max_bytes=64*2**20, path=None):
+
+        super(FUSED_Cache,self).__init__()
+
+        self.max_bytes = max_bytes
+        self.path = path
+        if path is not None and not os.path.isdir(path):
+            os.makedirs(path)
+
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+
+        if key in self.entries:
+            # Mark the entry as most recently used
+            result = self.entries.pop(key)
+            self.entries[key] = result
+            self.hits += 1
+            return result
+
+        if self.path is not None:
+            fname = os.path.join(self.path, key+'.pkl')
+            if os.path.exists(fname):
+                with open(fname, 'rb') as f:
+                    result = pickle.load(f)
+                self._store(key, result)
+                self.hits += 1
+                self.disk_hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+
+        self._store(key, result)
+
+        if self.path is not None:
+            fname = os.path.join(self.path, key+'.pkl')
+            if not os.path.exists(fname):
+                # Write to a temporary file first so that concurrent runs never read a partial entry
+                fd, tmp = tempfile.mkstemp(dir=self.path)
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+                os.rename(tmp, fname)
+
+    def _store(self, key, result):
+
+        size = sum(v.nbytes for v in result.values())
+        if size > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self.nbytes -= sum(v.nbytes for v in self.entries.pop(key).values())
+        while self.nbytes + size > self.max_bytes:
+            old_key, old = self.entries.popitem(last=False)
+            self.nbytes -= sum(v.nbytes for v in old.values())
+
+        self.entries[key] = result
+        self.nbytes += size
+
+    def clear(self):
+
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'entries': len(self.entries), 'nbytes': self.nbytes}
+
+# Byte code, names and constants of a function, nested functions included
+def _describe_code(code):
+
+    consts = [_describe_code(c) if isinstance(c, types.CodeType) else _describe(c) for c in code.co_consts]
+
+    return ('code', code.co_code, code.co_names, consts)
+
+# Description of a value that does not depend on object identities or on how it was built, so that digests of it
+# agree between processes. FUSED objects are described by the arguments of their constructor, other objects by
+# their class and attributes, functions by their code and the values they close over, arrays by their content
+def _describe(value):
+
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return ('array', value.shape, _describe(value.tolist()))
+        return ('array', value.shape, value.dtype.str, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return [_describe(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(_describe(v)) for v in value)
+    if hasattr(value, 'items'):
+        return sorted((str(k), _describe(v)) for k, v in value.items())
+    if isinstance(value, FUSED_Object):
+        return (type(value).__module__ + '.' + type(value).__name__, _describe(value._config))
+    if isinstance(value, types.FunctionType):
+        cells = [c.cell_contents for c in value.__closure__ or ()]
+        return ('function', value.__module__, value.__qualname__, _describe_code(value.__code__),
+                _describe(value.__defaults__), _describe(cells))
+    if isinstance(value, types.MethodType):
+        return ('method', value.__name__, _describe(value.__self__))
+    if hasattr(value, '__dict__') and not isinstance(value, type) and not callable(value):
+        return (type(value).__module__ + '.' + type(value).__name__, _describe(value.__dict__))
+
+    return repr(value)
+
+# Name of a model in a cache, its class and a digest of the arguments given to its constructor. Attributes the model
+# sets while it runs, e.g. counters or results, do not change the name, so a configuration finds its entries again
+# in other processes. Attributes changed after construction are not seen either, such models need their own name.
+# A model that cannot be described is only recognized within this process, which a cache on disk does not accept
+def model_name(model, persistent=False):
+
+    try:
+        digest = hashlib.sha1(repr(_describe(model)).encode('utf-8')).hexdigest()
+    except Exception:
+        if persistent:
+            raise Exception('The model '+type(model).__name__+' cannot be described, give it a name to cache it on disk')
+        digest = 'id' + str(id(model))
+
+    return type(model).__module__ + '.' + type(model).__name__ + ':' + digest
+
+# Complex inputs, as used by complex step, bypass the caches that store float outputs
+def _complex_inputs(inner_dict, inputs):
+
+    for k in inner_dict.keys():
+        if np.iscomplexobj(inputs[k]):
+            return True
+
+    return False
+
+# FUSED object that returns cached outputs when its model is called again with the same inputs
+class FUSED_Cached(FUSED_Object):
+
+    # Models configured differently through their constructors are told apart by model_name unless a name is given
+    def __init__(self, model, cache=None, name=None):
+
+        super(FUSED_Cached,self).__init__()
+
+        self.model = model
+        self.interface = model.interface
+        self.vectorized = getattr(model, 'vectorized', False)
+        self.complex_step = getattr(model, 'complex_step', False)
+        if cache is None:
+            cache = FUSED_Cache()
+        self.cache = cache
+        if name is None:
+            name = model_name(model, cache.path is not None)
+        self.name = name
+
+    def compute(self, inputs, outputs):
+
+        if _complex_inputs(self.interface['input'], inputs):
+            return self.model.compute(inputs, outputs)
+
+        key = hash_inputs(self.interface['input'], inputs, self.name)
+        result = self.cache.get(key)
+
+        if result is None:
+            self.model.compute(inputs, outputs)
+            result = {}
+            for k in self.interface['output'].keys():
+                if k in outputs:
+                    result[k] = np.array(outputs[k], dtype=float)
+            self.cache.put(key, result)
+        else:
+            for k, v in result.items():
+                outputs[k] = v.copy()
+
+        return outputs
+
+# FUSED object that skips its model and returns the previous outputs while its inputs are unchanged
+class FUSED_Incremental(FUSED_Object):
+
+    def __init__(self, model):
+
+        super(FUSED_Incremental,self).__init__()
+
+        self.model = model
+        self.interface = model.interface
+        self.vectorized = getattr(model, 'vectorized', False)
+        self.complex_step = getattr(model, 'complex_step', False)
+        self.last_inputs = None
+        self.last_outputs = None
+
+    def changed(self, inputs):
+
+        if self.last_inputs is None:
+            return True
+        for k, v in self.last_inputs.items():
+            if not np.array_equal(v, inputs[k]):
+                return True
+
+        return False
+
+    def compute(self, inputs, outputs):
+
+        if _complex_inputs(self.interface['input'], inputs):
+            self.invalidate()
+            return self.model.compute(inputs, outputs)
+
+        if not self.changed(inputs):
+            for k, v in self.last_outputs.items():
+                outputs[k] = v.copy()
+            return outputs
+
+        self.model.compute(inputs, outputs)
+
+        self.last_inputs = {}
+        for k in self.interface['input'].keys():
+            self.last_inputs[k] = np.array(inputs[k], dtype=float)
+        self.last_outputs = {}
+        for k in self.interface['output'].keys():
+            if k in outputs:
+                self.last_outputs[k] = np.array(outputs[k], dtype=float)
+
+        return outputs
+
+    # Force the model to run on the next call
+    def invalidate(self):
+
+        self.last_inputs = None
@@ -0,0 +1,142 @@
+# Generate one Python function evaluating a set up FUSED dataflow from a flat input array to a flat output array
+
+import hashlib
+import os
+
+import numpy as np
+
+from fusedwind.fused_wind import build_layout, transfer_plan
+from fusedwind.fused_cache import default_cache_dir
+
+# Signature of the interfaces and wiring the generated source depends on
+def interface_signature(flow, inputs, outputs, order=None, output_names=None):
+
+    if order is None:
+        order = flow.order
+    if output_names is None:
+        output_names = [sorted(outs.keys()) for name, obj, ins, outs in order]
+
+    lines = []
+    for (name, obj, ins, outs), names in zip(order, output_names):
+        lines.append(name + ':' + type(obj).__module__ + '.' + type(obj).__name__ + ':' + ','.join(names))
+    for k in sorted(flow.state.layout.keys()):
+        lines.append(k + ':' + str(flow.state.layout[k]))
+    lines.append('inputs:' + ','.join(inputs))
+    lines.append('outputs:' + ','.join(outputs))
+
+    return hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest()
+
+# Source of a module whose build function returns the evaluator, the wiring is inlined as constant slices
+# and the outputs of each component are copied into views of the buffer without going through a wrapper
+def generate_source(signature, plan, output_names):
+
+    lines = ['# Generated by fusedwind.fused_codegen for signature ' + signature,
+             '',
+             'def build(data, computes, inputs, views, out_index):',
+             '']
+    for i, names in enumerate(output_names):
+        lines.append('    c%d = computes[%d]' % (i, i))
+        lines.append('    i%d = inputs[%d]' % (i, i))
+        lines.append('    o%d = {}' % i)
+        for j, k in enumerate(names):
+            lines.append('    v%d_%d = o%d[%r] = views[%d][%d]' % (i, j, i, k, i, j))
+    lines.append('    take = data.take')
+    lines.append('')
+    lines.append('    def fused_evaluate(x):')
+    lines.append('')
+    for s, d in plan:
+        lines.append('        data[%d:%d] = x[%d:%d]' % (d.start, d.stop, s.start, s.stop))
+    for i, names in enumerate(output_names):
+        lines.append('        c%d(i%d, o%d)' % (i, i, i))
+        for j, k in enumerate(names):
+            lines.append('        v%d_%d[...] = o%d[%r]' % (i, j, i, k))
+    lines.append('        return take(out_index)')
+    lines.append('')
+    lines.append('    return fused_evaluate')
+    lines.append('')
+
+    return '\n'.join(lines)
+
+def _load_module(name, path):
+
+    try:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except ImportError:
+        import imp
+        module = imp.load_source(name, path)
+
+    return module
+
+# Flattened evaluator of a set up dataflow, calls write into and read from the buffer of the dataflow
+# With prune set, only the components contributing to the outputs run and only the outputs they need are copied
+class FUSED_Compiled(object):
+
+    def __init__(self, flow, inputs=None, outputs=None, cache_dir=None, prune=False):
+
+        super(FUSED_Compiled,self).__init__()
+
+        if inputs is None:
+            inputs = flow.independent_inputs()
+        if outputs is None:
+            outputs = sorted(flow.producers.keys())
+        if cache_dir is None:
+            cache_dir = default_cache_dir('codegen')
+
+        self.flow = flow
+        self.input_names = list(inputs)
+        self.output_names = list(outputs)
+
+        # Layouts of the flat input and output arrays
+        variables = dict((k, {'shape': flow.state.layout[k][2]}) for k in self.input_names + self.output_names)
+        self.input_layout = build_layout(variables, self.input_names)
+        self.output_layout = build_layout(variables, self.output_names)
+        self.n_inputs = sum(stop - start for start, stop, shape in self.input_layout.values())
+
+        plan = transfer_plan(self.input_layout, flow.state.layout, self.input_names)
+        out_index = np.concatenate([np.arange(*flow.state.layout[k][:2]) for k in self.output_names] + [np.zeros(0, dtype=int)])
+
+        order = flow.order
+        output_names = [sorted(outs.keys()) for name, obj, ins, outs in order]
+        if prune:
+            pruned = flow.analysis().plan(self.output_names)
+            order = [c for c in order if c[0] in pruned['components']]
+            output_names = [pruned['copied_outputs'][name] for name, obj, ins, outs in order]
+
+        # Reuse the generated source of an identical assembly
+        self.signature = interface_signature(flow, self.input_names, self.output_names, order, output_names)
+        path = os.path.join(cache_dir, 'fused_' + self.signature + '.py')
+        if not os.path.exists(path):
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            tmp = path + '.' + str(os.getpid())
+            with open(tmp, 'w') as f:
+                f.write(generate_source(self.signature, plan, output_names))
+            os.rename(tmp, path)
+        module = _load_module('fused_' + self.signature, path)
+
+        self.evaluate = module.build(flow.state.data,
+                                     [obj.compute for name, obj, ins, outs in order],
+                                     [ins for name, obj, ins, outs in order],
+                                     [[flow.values[k] for k in names] for names in output_names],
+                                     out_index.astype(int))
+
+    def __call__(self, x):
+
+        return self.evaluate(x)
+
+    # Flat input array from a dict of input values
+    def pack(self, values):
+
+        x = np.zeros(self.n_inputs)
+        for k, (start, stop, shape) in self.input_layout.items():
+            x[start:stop] = np.ravel(values[k]) if k in values else np.ravel(self.flow[k])
+
+        return x
+
+    # Dict of named outputs from a flat output array
+    def unpack(self, y):
+
+        return dict((k, y[start:stop].reshape(shape)) for k, (start, stop, shape) in self.output_layout.items())
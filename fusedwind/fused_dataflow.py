@@ -0,0 +1,363 @@
+# Run FUSED objects as a feed forward dataflow without OpenMDAO
+
+import weakref
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from fusedwind.fused_wind import create_vector
+from fusedwind.fused_profile import profiler
+from fusedwind.fused_validation import FUSED_Validator, check_declarations
+
+# The following are helper functions to build the dataflow graph from interfaces
+################################################################################
+
+# Name of the variable feeding an input of a component, inputs follow promotes=['*'] unless connected explicitly
+def source_name(connections, component_name, input_name):
+
+    return connections.get(component_name+'.'+input_name, input_name)
+
+# Find the producer of every variable and the components that consume it
+def build_graph(objects, connections=None):
+
+    if connections is None:
+        connections = {}
+
+    producers = {}
+    consumers = {}
+    for name, obj in objects:
+        for k in obj.interface['output'].keys():
+            if k in producers:
+                raise Exception('The output '+k+' is produced by both '+producers[k]+' and '+name)
+            producers[k] = name
+        for k in obj.interface['input'].keys():
+            consumers.setdefault(source_name(connections, name, k), []).append(name)
+
+    depends = {}
+    for name, obj in objects:
+        depends[name] = set()
+    for k, users in consumers.items():
+        if k in producers:
+            for user in users:
+                if user != producers[k]:
+                    depends[user].add(producers[k])
+
+    return producers, consumers, depends
+
+# Sort the components into levels, a component only depends on components in earlier levels
+def topological_levels(names, depends):
+
+    levels = []
+    done = set()
+    remaining = list(names)
+    while len(remaining) > 0:
+        level = [n for n in remaining if depends[n] <= done]
+        if len(level) == 0:
+            raise Exception('The components '+', '.join(remaining)+' form a cycle')
+        levels.append(level)
+        done.update(level)
+        remaining = [n for n in remaining if n not in done]
+
+    return levels
+
+# Outputs of a component that copy into the preallocated buffers of the dataflow
+class FUSED_Outputs(dict):
+
+    def __setitem__(self, k, v):
+
+        dict.__getitem__(self, k)[...] = v
+
+# Outputs of a component in a pruned plan, the outputs nothing needs are not copied and keep their previous values
+class FUSED_PrunedOutputs(FUSED_Outputs):
+
+    def __init__(self, skipped):
+
+        super(FUSED_PrunedOutputs,self).__init__()
+        self.skipped = frozenset(skipped)
+
+    def __setitem__(self, k, v):
+
+        if k not in self.skipped:
+            dict.__getitem__(self, k)[...] = v
+
+def _compute(component):
+
+    name, obj, inputs, outputs = component
+    if profiler.enabled:
+        profiler.profile_compute(name, obj.compute, inputs, outputs, outputs.keys())
+    else:
+        obj.compute(inputs, outputs)
+
+def _close_pool(pool):
+
+    pool.terminate()
+    pool.join()
+
+# Feed forward execution of FUSED objects
+#########################################
+
+class FUSED_Dataflow(object):
+
+    # With incremental set, a run only executes the components downstream of changed variables
+    # With threads set, the independent components of each level run concurrently on a thread pool. The pool is
+    # closed by close(), at the end of a with statement or when the dataflow is collected. Threads only apply to
+    # the native dataflow, FUSED groups run by OpenMDAO execute their components one at a time
+    def __init__(self, incremental=False, threads=None):
+
+        super(FUSED_Dataflow,self).__init__()
+
+        self.objects = []
+        self.connections = {}
+        self.values = {}
+        self.order = []
+        self.incremental = incremental
+        self.snapshot = None
+        self.threads = threads
+        self._pool = None
+        self._finalizer = None
+        self.variables = {}
+        self._validator = None
+        self.plan = None
+        self.shared = {}
+
+    # Add a FUSED object, all of its variables are promoted
+    def add(self, name, obj):
+
+        for n, o in self.objects:
+            if n == name:
+                raise Exception('A component named '+name+' has already been added')
+        self.objects.append((name, obj))
+
+        return obj
+
+    # Feed the input 'component.input' from the variable named source
+    def connect(self, source, target):
+
+        self.connections[target] = source
+
+    # Build the graph, sort it and allocate the buffers
+    def setup(self):
+
+        self.producers, self.consumers, self.depends = build_graph(self.objects, self.connections)
+        self.levels = topological_levels([n for n, o in self.objects], self.depends)
+        objects = dict(self.objects)
+
+        # Outputs take their default from the producer, independent inputs from their first consumer
+        variables = {}
+        declarations = {}
+        for name, obj in self.objects:
+            for k, v in obj.interface['output'].items():
+                variables[k] = v
+                declarations.setdefault(k, []).append((name, v, True))
+        for name, obj in self.objects:
+            for k, v in obj.interface['input'].items():
+                src = source_name(self.connections, name, k)
+                if src not in variables:
+                    variables[src] = v
+                declarations.setdefault(src, []).append((name, v, False))
+
+        # Types and shapes of connected variables are checked once here, runs do no checking
+        check_declarations(declarations)
+        self.variables = variables
+        self._validator = None
+
+        # One contiguous buffer, the independent inputs first and then the outputs of each component in execution order
+        independent = sorted(k for k in variables.keys() if k not in self.producers)
+        names = list(independent)
+        for level in self.levels:
+            for name in level:
+                names.extend(sorted(objects[name].interface['output'].keys()))
+        self.state = create_vector(variables, names)
+        self.n_independent = sum(int(np.prod(self.state[k].shape)) for k in independent)
+
+        # A pruned plan is rebuilt for the new graph
+        if self.plan is not None:
+            self.plan = self.analysis().plan(self.plan['outputs'])
+        self._bind()
+        self.snapshot = None
+
+    # Bind the inputs and outputs of every component to views of the buffer
+    def _bind(self):
+
+        objects = dict(self.objects)
+        self.values = dict(self.state.views)
+        self.values.update(self.shared)
+        self.order = []
+        self.level_order = []
+        self.sources = {}
+        for level in self.levels:
+            self.level_order.append([])
+            for name in level:
+                obj = objects[name]
+                inputs = {}
+                for k in obj.interface['input'].keys():
+                    inputs[k] = self.values[source_name(self.connections, name, k)]
+                self.sources[name] = set(source_name(self.connections, name, k) for k in obj.interface['input'].keys())
+                if self.plan is None:
+                    outputs = FUSED_Outputs()
+                else:
+                    outputs = FUSED_PrunedOutputs(self.plan['skipped_outputs'].get(name, ()))
+                for k in obj.interface['output'].keys():
+                    dict.__setitem__(outputs, k, self.values[k])
+                self.order.append((name, obj, inputs, outputs))
+                if self.plan is None or name in self.plan['components']:
+                    self.level_order[-1].append((name, obj, inputs, outputs))
+        self.level_order = [level for level in self.level_order if len(level) > 0]
+
+    # Variables that are not produced by any component
+    def independent_inputs(self):
+
+        return sorted(k for k in self.values.keys() if k not in self.producers)
+
+    # Static analysis of the graph, see fusedwind.fused_analysis
+    def analysis(self):
+
+        from fusedwind.fused_analysis import FUSED_Analysis
+
+        return FUSED_Analysis(self.objects, self.connections)
+
+    # Only run the components and copy the outputs that contribute to the named outputs, None runs everything again
+    # The values of the skipped outputs are not updated by runs while the dataflow is pruned
+    def prune(self, outputs=None):
+
+        self.plan = None if outputs is None else self.analysis().plan(outputs)
+        self._bind()
+        self.snapshot = None
+
+    # Feed independent inputs from arrays held outside the buffer, e.g. read-only views of shared memory
+    # The components read the arrays in place and the copies in the buffer are no longer used
+    def share(self, arrays):
+
+        for k, v in arrays.items():
+            if k not in self.state.layout or k in self.producers:
+                raise Exception('The shared variable '+k+' is not an independent input')
+            if np.shape(v) != self.state[k].shape:
+                raise Exception('The shared variable '+k+' of shape '+str(self.state[k].shape)+' has values of shape '+str(np.shape(v)))
+        self.shared = dict(arrays)
+        self._bind()
+        self.snapshot = None
+
+    # Validator of the independent inputs, compiled on first use, to check tables of cases before they are run
+    def validator(self):
+
+        if self._validator is None:
+            self._validator = FUSED_Validator(self.variables, self.independent_inputs())
+
+        return self._validator
+
+    # Copy of the whole state vector, which can be hashed or sent to a worker as one buffer
+    def snapshot_state(self):
+
+        return self.state.snapshot()
+
+    def restore_state(self, data):
+
+        self.state.restore(data)
+
+    def __getitem__(self, name):
+
+        return self.values[name]
+
+    def __setitem__(self, name, val):
+
+        self.values[name][...] = val
+
+    # A run that fails clears the snapshot, the next run executes every component
+    def run(self):
+
+        try:
+            if not self.incremental or self.snapshot is None:
+                for level in self.level_order:
+                    self.execute(level)
+            else:
+                self.run_incremental()
+        except Exception:
+            self.snapshot = None
+            raise
+
+        if self.incremental:
+            self.snapshot = self.state.data[:self.n_independent].copy()
+
+    # Rerun the components that see a changed variable, dirtiness follows the outputs that change
+    def run_incremental(self):
+
+        current = self.state.data[:self.n_independent]
+        if np.array_equal(current, self.snapshot):
+            return
+        changed = current != self.snapshot
+        dirty = set()
+        for k in self.independent_inputs():
+            start, stop, shape = self.state.layout[k]
+            if changed[start:stop].any():
+                dirty.add(k)
+
+        for level in self.level_order:
+            level = [c for c in level if not self.sources[c[0]].isdisjoint(dirty)]
+            previous = {}
+            for name, obj, inputs, outputs in level:
+                for k, v in outputs.items():
+                    previous[k] = v.copy()
+            self.execute(level)
+            for k, v in previous.items():
+                if not np.array_equal(v, self.values[k]):
+                    dirty.add(k)
+
+    # Run the components of one level, they do not depend on each other
+    def execute(self, level):
+
+        if self.threads is None or len(level) < 2:
+            if profiler.enabled:
+                for component in level:
+                    _compute(component)
+                return
+            for name, obj, inputs, outputs in level:
+                obj.compute(inputs, outputs)
+            return
+
+        if self._pool is None:
+            self._pool = ThreadPool(self.threads)
+            self._finalizer = weakref.finalize(self, _close_pool, self._pool)
+        self._pool.map(_compute, level)
+
+    def close(self):
+
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._pool = None
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    # The thread pool is not copied along with the dataflow and the views are rebound to the copied buffer
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_finalizer'] = None
+        for k in ['values', 'order', 'level_order']:
+            state.pop(k, None)
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        if 'state' in state:
+            self._bind()
+
+    # Execute every component on the next run
+    def invalidate(self):
+
+        self.snapshot = None
+
+    def list_outputs(self):
+
+        for name, obj, inputs, outputs in self.order:
+            for k in sorted(outputs.keys()):
+                print(k + ' ' + str(self.values[k]))
@@ -0,0 +1,307 @@
+# Run tables of input cases through FUSED problems on a pool of processes
+
+import hashlib
+import multiprocessing
+import traceback
+import weakref
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object, batch_shape
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.fused_cache import model_name
+from fusedwind.fused_sampling import case_count
+from fusedwind.fused_validation import FUSED_Validator, check_table, checkable
+from fusedwind.fused_shared import FUSED_SharedArrays, attach_arrays, read_only, share_inputs
+
+# Run a problem once, either a native dataflow or an OpenMDAO problem
+def run_problem(problem):
+
+    if isinstance(problem, FUSED_Dataflow):
+        problem.run()
+    else:
+        from fusedwind.fused_openmdao import FUSED_run
+        FUSED_run(problem)
+
+# Shape of one case of an output, scalars stored as one element arrays are flattened
+def case_shape(problem, name):
+
+    shape = np.shape(problem[name])
+    if shape == (1,):
+        return ()
+
+    return shape
+
+# Declarations of the inputs of a FUSED object, a dataflow or the FUSED components of an OpenMDAO problem
+def problem_inputs(problem):
+
+    if isinstance(problem, FUSED_Object):
+        return problem.interface['input']
+    if isinstance(problem, FUSED_Dataflow):
+        return problem.variables
+    from fusedwind.fused_openmdao import FUSED_inputs
+
+    return FUSED_inputs(problem)
+
+# Validators per problem and names of the inputs in the cases, compiled once per worker
+_validators = weakref.WeakKeyDictionary()
+
+# Message per case that does not match the declarations of the problem, inputs it does not declare are not checked
+def case_errors(problem, cases, n):
+
+    if problem not in _validators:
+        _validators[problem] = (problem_inputs(problem), {})
+    inputs, validators = _validators[problem]
+    names = tuple(checkable(inputs, sorted(cases.keys())))
+    if len(names) == 0:
+        return {}
+    if names not in validators:
+        validators[names] = FUSED_Validator(inputs, names)
+
+    return validators[names].point_errors(cases, n)
+
+# Evaluate a chunk of cases on a set up problem, failures are recorded and do not stop the chunk
+# Cases that do not match the declarations of the inputs fail without being run
+def run_cases(problem, cases, outputs):
+
+    n = case_count(cases)
+    values = {}
+    for name in outputs:
+        values[name] = np.full((n,) + case_shape(problem, name), np.nan)
+    errors = case_errors(problem, cases, n)
+
+    for i in range(n):
+        if i in errors:
+            continue
+        try:
+            for k, v in cases.items():
+                problem[k] = v[i]
+            run_problem(problem)
+            for name in outputs:
+                values[name][i] = np.reshape(problem[name], values[name][i].shape)
+        except Exception:
+            errors[i] = traceback.format_exc()
+
+    return values, errors
+
+# Evaluate a chunk of cases on a FUSED object with compute_batch, a vectorized model computes the chunk in one call
+# When the chunk fails or holds invalid cases the others are computed one at a time
+def run_batch(model, cases, outputs, shared=None):
+
+    n = case_count(cases)
+    inputs = dict(cases)
+    if shared is not None:
+        inputs.update(shared)
+    values = {}
+    for name in outputs:
+        values[name] = np.full(batch_shape(model.interface['output'][name], n), np.nan)
+    errors = case_errors(model, cases, n)
+
+    if len(errors) == 0:
+        try:
+            results = model.compute_batch(inputs, n=n)
+            for name in outputs:
+                values[name][...] = np.reshape(results[name], values[name].shape)
+            return values, errors
+        except Exception:
+            pass
+
+    for i in range(n):
+        if i in errors:
+            continue
+        try:
+            point = dict((k, np.asarray(v)[i:i + 1]) for k, v in cases.items())
+            if shared is not None:
+                point.update(shared)
+            results = model.compute_batch(point, n=1)
+            for name in outputs:
+                values[name][i] = np.reshape(results[name], values[name][i].shape)
+        except Exception:
+            errors[i] = traceback.format_exc()
+
+    return values, errors
+
+# Each worker process sets up its problem once and reuses it for every chunk
+# The shared inputs are attached once, the segments stay open for the life of the worker
+_worker_problem = None
+_worker_segments = []
+
+def _init_worker(problem_factory, shared=None):
+
+    global _worker_problem, _worker_segments
+    _worker_problem = problem_factory()
+    if shared is not None:
+        views, _worker_segments = attach_arrays(shared)
+        share_inputs(_worker_problem, views)
+
+def _run_chunk(task):
+
+    start, cases, outputs = task
+    values, errors = run_cases(_worker_problem, cases, outputs)
+
+    return start, values, errors
+
+# A pool replaces a worker that dies, e.g. killed for running out of memory, but the chunk it was running is lost
+# and its result never comes, so the sweep fails instead of waiting for it
+def check_workers(workers):
+
+    for p in workers:
+        if p.exitcode is not None:
+            raise Exception('The worker process '+str(p.pid)+' died with the exit code '+str(p.exitcode))
+
+# Design of experiments over a table of cases, a dict of input name to an array of values per case
+class FUSED_DOE(object):
+
+    # The problem factory must be picklable, e.g. a module level function returning a set up problem. A FUSED object
+    # can be given in its place, its chunks are computed in this process by compute_batch, in one call when vectorized
+    # cases is a table or a provider of rows built on request, an object with the input names, the number of rows
+    # n_rows and rows(start, stop) returning the table of the rows start to stop, e.g. a FUSED_Saltelli design
+    # shared maps inputs that are the same for every case, e.g. power curves or wind time series, to their values.
+    # They are placed once in shared memory that the workers read in place, only the cases are sent with the tasks
+    def __init__(self, problem_factory, cases, outputs, processes=None, chunk_size=16, shared=None):
+
+        super(FUSED_DOE,self).__init__()
+
+        self.problem_factory = problem_factory
+        self.cases = cases
+        self.outputs = list(outputs)
+        self.processes = processes
+        self.chunk_size = chunk_size
+        if hasattr(cases, 'rows'):
+            self.n = cases.n_rows
+            names = cases.names
+        else:
+            self.n = check_table(cases)
+            names = cases.keys()
+        self.shared = None
+        if shared is not None:
+            for k in shared.keys():
+                if k in names:
+                    raise Exception('The input '+k+' is both shared and varied by the cases')
+            self.shared = dict((k, np.asarray(v, dtype=float)) for k, v in shared.items())
+
+    # Inputs of the cases start to stop as a dict of name to array
+    def case_rows(self, start, stop):
+
+        if hasattr(self.cases, 'rows'):
+            return self.cases.rows(start, stop)
+
+        chunk = {}
+        for k, v in self.cases.items():
+            chunk[k] = np.asarray(v)[start:stop]
+
+        return chunk
+
+    # Chunks of the case table, starting at the case first
+    def tasks(self, first=0):
+
+        for start in range(first, self.n, self.chunk_size):
+            stop = min(start + self.chunk_size, self.n)
+            yield start, self.case_rows(start, stop), self.outputs
+
+    # Stream (start, values, errors) per chunk in case order, errors maps the case index to its traceback
+    def chunks(self, first=0):
+
+        if isinstance(self.problem_factory, FUSED_Object):
+            for start, cases, outputs in self.tasks(first):
+                yield self._offset(start, *run_batch(self.problem_factory, cases, outputs, self.shared))
+            return
+
+        if self.processes == 0:
+            _init_worker(self.problem_factory)
+            if self.shared is not None:
+                share_inputs(_worker_problem, read_only(self.shared))
+            for task in self.tasks(first):
+                yield self._offset(*_run_chunk(task))
+            return
+
+        # The segments are removed when the sweep ends, fails, is closed early or a worker dies
+        arrays = None
+        handle = None
+        if self.shared is not None:
+            arrays = FUSED_SharedArrays(self.shared)
+            handle = arrays.handle()
+        try:
+            before = set(p.pid for p in multiprocessing.active_children())
+            pool = multiprocessing.Pool(self.processes, _init_worker, (self.problem_factory, handle))
+            workers = [p for p in multiprocessing.active_children() if p.pid not in before]
+            try:
+                results = pool.imap(_run_chunk, self.tasks(first))
+                while True:
+                    try:
+                        result = results.next(1.0)
+                    except StopIteration:
+                        break
+                    except multiprocessing.TimeoutError:
+                        check_workers(workers)
+                        continue
+                    yield self._offset(*result)
+            finally:
+                pool.terminate()
+                pool.join()
+        finally:
+            if arrays is not None:
+                arrays.close()
+
+    def _offset(self, start, values, errors):
+
+        return start, values, dict((start + i, e) for i, e in errors.items())
+
+    # Run every case and gather the outputs, failed cases hold NaN
+    def run(self):
+
+        values = dict((name, []) for name in self.outputs)
+        errors = {}
+        for start, chunk_values, chunk_errors in self.chunks():
+            for name in self.outputs:
+                values[name].append(chunk_values[name])
+            errors.update(chunk_errors)
+
+        for name in self.outputs:
+            if len(values[name]) > 0:
+                values[name] = np.concatenate(values[name])
+            else:
+                values[name] = np.zeros(0)
+
+        return values, errors
+
+    # Digest of the case table, the outputs and the problem factory, which identifies a sweep in a recording
+    # The factory is known by its name and, for a function, its byte code, a FUSED object by its configuration
+    def digest(self):
+
+        sha = hashlib.sha1()
+        factory = self.problem_factory
+        if isinstance(factory, FUSED_Object):
+            sha.update(model_name(factory).encode('utf-8'))
+        sha.update(repr((getattr(factory, '__module__', None), getattr(factory, '__qualname__', type(factory).__name__),
+                         self.n, self.outputs)).encode('utf-8'))
+        code = getattr(factory, '__code__', None)
+        if code is not None:
+            sha.update(code.co_code)
+        for start in range(0, self.n, self.chunk_size):
+            chunk = self.case_rows(start, min(start + self.chunk_size, self.n))
+            for k in sorted(chunk.keys()):
+                sha.update(k.encode('utf-8'))
+                sha.update(np.ascontiguousarray(chunk[k], dtype=float).tobytes())
+        if self.shared is not None:
+            for k in sorted(self.shared.keys()):
+                sha.update(k.encode('utf-8'))
+                sha.update(np.ascontiguousarray(self.shared[k]).tobytes())
+
+        return sha.hexdigest()
+
+    # Stream the inputs of the case table and the outputs into a FUSED_Recorder, failed cases hold NaN
+    # Cases already in the recorder are skipped, so an interrupted sweep resumes where it stopped
+    # A recorder holding cases of another sweep, by digest(), raises instead of being resumed
+    def record(self, recorder):
+
+        recorder.check(self.digest())
+        errors = {}
+        for start, chunk_values, chunk_errors in self.chunks(len(recorder)):
+            n = len(chunk_values[self.outputs[0]]) if len(self.outputs) > 0 else min(self.chunk_size, self.n - start)
+            chunk_values.update(self.case_rows(start, start + n))
+            recorder.record_batch(chunk_values, n)
+            errors.update(chunk_errors)
+        recorder.flush()
+
+        return errors
@@ -1,149 +1,322 @@
 # Create OpenMDAO components, groups and problems from fused objects and inputs
+# OpenMDAO is imported on first use and the backend for version 1.x or 2.x is resolved once
+
+import weakref
 
-import openmdao as op
 import numpy as np
 
-# Return FUSED Component based on version of OpenMDAO 1.x or 2.x
-################################################################
-def FUSED_Component(*args, **kwargs):
+from fusedwind.fused_wind import batch_value
+from fusedwind.fused_validation import default_value, check_declarations
+from fusedwind.fused_cache import FUSED_Cached, FUSED_Incremental
+from fusedwind.fused_partials import FUSED_Partials
+from fusedwind.fused_profile import profiler
+
+# The following are the backends for OpenMDAO 1.x and 2.x
+##########################################################
+
+# Behaviour shared by the components of all backends
+class FUSED_Component_Base(object):
+
+    def init_model(self, model, batch_size=None, cache=None, incremental=False, partials=None):
+
+        # Partials are computed on the model itself, partials is 'fd', 'cs' or a FUSED_Partials
+        if partials is not None and batch_size is not None:
+            raise Exception('Partials are not supported for components with a batch_size')
+        if partials is not None and not isinstance(partials, FUSED_Partials):
+            partials = FUSED_Partials(model, partials)
+        self.partials = partials
+
+        # Memoize the model when given a FUSED_Cache
+        if cache is not None:
+            model = FUSED_Cached(model, cache)
+        # Only rerun the model when its inputs changed since the last run
+        if incremental:
+            model = FUSED_Incremental(model)
+        self.model = model
+        self.batch_size = batch_size
+
+        process_io(self, self.model.interface['input'], 'add_input', batch_size)
+        process_io(self, self.model.interface['output'], 'add_output', batch_size)
+
+    def run_model(self, inputs, outputs):
+
+        if profiler.enabled:
+            profiler.profile_compute(self.pathname, self.compute_model, inputs, outputs, self.model.interface['output'].keys())
+        else:
+            self.compute_model(inputs, outputs)
+
+    def compute_model(self, inputs, outputs):
+
+        if self.batch_size is None:
+            self.model.compute(inputs, outputs)
+        else:
+            self.model.compute_batch(inputs, outputs, self.batch_size)
+
+    # Dense blocks of the Jacobian for the pairs of variables the sparsity probe found to be connected
+    def model_partials(self, inputs):
+
+        return self.partials.blocks(inputs)
+
+class OpenMDAO2_Backend(object):
+
+    def __init__(self, api):
+
+        self.api = api
+        self.input_method = 'add_input'
+
+        class FUSED_OpenMDAO(FUSED_Component_Base, api.ExplicitComponent):
+
+            def __init__(self, model, batch_size=None, cache=None, incremental=False, partials=None):
 
-    if int(op.__version__[0]) > 1:
-        from openmdao.api import ExplicitComponent
-        class FUSED_OpenMDAO(ExplicitComponent):
-        
-            def __init__(self, model):
-        
                 super(FUSED_OpenMDAO,self).__init__()
-        
-                self.model = model
-        
-                process_io(self, self.model.interface['input'], 'add_input')
-                process_io(self, self.model.interface['output'], 'add_output')
-        
+
+                self.init_model(model, batch_size, cache, incremental, partials)
+
+            def setup(self):
+
+                if self.partials is not None:
+                    for (of, wrt), (rows, cols) in self.partials.nonzero.items():
+                        self.declare_partials(of, wrt, rows=rows, cols=cols)
+
             def compute(self, inputs, outputs):
-        
-                self.model.compute(inputs, outputs)
-
-        return FUSED_OpenMDAO(*args, **kwargs)
-    else:
-        from openmdao.api import Component
-        class FUSED_OpenMDAO(Component):
-        
-            def __init__(self, model):
-        
+
+                self.run_model(inputs, outputs)
+
+            def compute_partials(self, inputs, partials):
+
+                if self.partials is None:
+                    return
+                for (of, wrt), block in self.model_partials(inputs).items():
+                    rows, cols = self.partials.nonzero[of, wrt]
+                    partials[of, wrt] = block[rows, cols]
+
+        self.Component = _register(FUSED_OpenMDAO)
+
+    def add(self, group, component_name, component, promoters):
+
+        return group.add_subsystem(component_name, component, promotes=promoters)
+
+    def print_outputs(self, group):
+
+        group.list_outputs()
+
+    def run(self, problem):
+
+        return problem.run_driver()
+
+    def components(self, problem):
+
+        return [s for s in problem.model.system_iter(recurse=True) if isinstance(s, FUSED_Component_Base)]
+
+    # Values of every output and input by absolute name, read through the public listing of the model so that
+    # the layout of the vectors of OpenMDAO is not relied on
+    def snapshot(self, problem):
+
+        if hasattr(problem, 'final_setup'):
+            problem.final_setup()
+        model = problem.model
+        state = {}
+        for name, meta in model.list_outputs(out_stream=None) + model.list_inputs(out_stream=None):
+            state[name] = np.array(meta['val'] if 'val' in meta else meta['value'], copy=True)
+
+        return state
+
+    def restore(self, problem, state):
+
+        if hasattr(problem, 'final_setup'):
+            problem.final_setup()
+        for name, val in state.items():
+            problem.set_val(name, val)
+
+class OpenMDAO1_Backend(object):
+
+    def __init__(self, api):
+
+        self.api = api
+        self.input_method = 'add_param'
+
+        class FUSED_OpenMDAO(FUSED_Component_Base, api.Component):
+
+            def __init__(self, model, batch_size=None, cache=None, incremental=False, partials=None):
+
                 super(FUSED_OpenMDAO,self).__init__()
-        
-                self.model = model
-        
-                process_io(self, self.model.interface['input'], 'add_input')
-                process_io(self, self.model.interface['output'], 'add_output')
-        
+
+                self.init_model(model, batch_size, cache, incremental, partials)
+
             def solve_nonlinear(self, params, unknowns, resids):
-        
-                self.model.compute(params, unknowns)
 
-        return FUSED_OpenMDAO(*args, **kwargs)
+                self.run_model(params, unknowns)
 
-# Add inputs and outputs to a class
-def process_io(component, interface, add_method):
+            def linearize(self, params, unknowns, resids):
 
-    for k, v in interface.items():
-        
-        # Apply the sizes of arrays
-        if 'shape' in v.keys():
-            for i, sz in enumerate(v['shape']):
-                if type(sz) is not int:
-                    my_name = sz['name']
-                    if my_name not in kwargs.keys():
-                        print('The interface requires that the size '+my_name+' is specified')
-                        raise Exception
-                    v['shape'][i]=kwargs[my_name]
-            if 'val' in v.keys():
-                v['val']=np.zeros(v['shape'], dtype=float)
+                if self.partials is None:
+                    return super(FUSED_OpenMDAO,self).linearize(params, unknowns, resids)
+
+                return self.model_partials(params)
+
+        self.Component = _register(FUSED_OpenMDAO)
+
+    def add(self, group, component_name, component, promoters):
+
+        return group.add(component_name, component, promotes=promoters)
+
+    def print_outputs(self, group):
+
+        for io in group.unknowns:
+            print(io + ' ' + str(group.unknowns[io]))
+
+    def run(self, problem):
+
+        return problem.run()
+
+    def components(self, problem):
+
+        return [s for s in problem.root.subsystems(recurse=True) if isinstance(s, FUSED_Component_Base)]
+
+    def snapshot(self, problem):
+
+        root = problem.root
+
+        return [root.unknowns.vec.copy(), root.params.vec.copy()]
+
+    def restore(self, problem, state):
+
+        root = problem.root
+        root.unknowns.vec[:] = state[0]
+        root.params.vec[:] = state[1]
+
+# Make the component class of the backend importable from this module so that components can be pickled
+def _register(cls):
+
+    cls.__module__ = __name__
+    if hasattr(cls, '__qualname__'):
+        cls.__qualname__ = cls.__name__
+    globals()[cls.__name__] = cls
+
+    return cls
+
+_backend = None
+
+# Import OpenMDAO and resolve its backend on first use
+def openmdao_backend():
+
+    global _backend
+    if _backend is None:
+        import openmdao
+        import openmdao.api
+        if int(openmdao.__version__.split('.')[0]) > 1:
+            _backend = OpenMDAO2_Backend(openmdao.api)
         else:
-            v['val'] = float(v['val'])
+            _backend = OpenMDAO1_Backend(openmdao.api)
+
+    return _backend
+
+# Resolve the component class when it is looked up before the backend, e.g. when unpickling
+def __getattr__(name):
 
-        if int(op.__version__[0]) > 1:
-            if add_method == 'add_input':
-                component.add_input(k, v['val'])
-            elif add_method == 'add_output':
-                component.add_output(k, v['val'])
+    if name == 'FUSED_OpenMDAO':
+        return openmdao_backend().Component
+    raise AttributeError(name)
+
+# Return FUSED Component based on version of OpenMDAO 1.x or 2.x
+################################################################
+def FUSED_Component(*args, **kwargs):
+
+    return openmdao_backend().Component(*args, **kwargs)
+
+# Add inputs and outputs to a class, with a leading dimension of batch_size points if given
+def process_io(component, interface, add_method, batch_size=None):
+
+    if add_method == 'add_input':
+        add = getattr(component, openmdao_backend().input_method)
+    elif add_method == 'add_output':
+        add = component.add_output
+
+    for k, v in interface.items():
+
+        # Apply the sizes of arrays, defaults are checked against their declared type and shape
+        if batch_size is not None:
+            val = batch_value(v, batch_size)
         else:
-            if add_method == 'add_input':
-                component.add_param(k, v['val'])
-            elif add_method == 'add_output':
-                component.add_output(k, v['val'])
+            val = default_value(k, v)
+
+        add(k, val)
 
 # Return FUSED Group based on version of OpenMDAO 1.x or 2.x
 ############################################################
 def FUSED_Group(*args, **kwargs):
 
-    if int(op.__version__[0]) > 1:
-        from openmdao.api import Group
-        return Group(*args, **kwargs)
-    else:
-        from openmdao.api import Group
-        return Group(*args, **kwargs)
+    return openmdao_backend().api.Group(*args, **kwargs)
+
+# Declarations of the variables that FUSED components promote to each group
+_group_declarations = weakref.WeakKeyDictionary()
 
 # Add component or subsystem to group based on version of OpenMDAO 1.x or 2.x
+# The types and shapes of FUSED components promoting all of their variables are checked against the earlier ones
 def FUSED_add(group, component_name, component, promoters=None):
-  
-    if int(op.__version__[0]) > 1:
-        return group.add_subsystem(component_name, component, promotes=promoters)
-    else:
-        return group.add(component_name, component, promotes=promoters)
+
+    if isinstance(component, FUSED_Component_Base) and promoters is not None and list(promoters) == ['*']:
+        declarations = _group_declarations.setdefault(group, {})
+        added = {}
+        for io, is_output in [('output', True), ('input', False)]:
+            for k, v in component.model.interface[io].items():
+                added.setdefault(k, []).append((component_name, v, is_output))
+        check_declarations(dict((k, declarations.get(k, []) + v) for k, v in added.items()))
+        for k, v in added.items():
+            declarations.setdefault(k, []).extend(v)
+
+    return openmdao_backend().add(group, component_name, component, promoters)
 
 # Add explicit connections between group components based on version of OpenMDAO 1.x or 2.x
 def FUSED_connect(group, output_connection, input_connections):
-  
-    if int(op.__version__[0]) > 1:
-        return group.connect(output_connection, input_connections)
-    else:
-        return group.connect(output_connection, input_connections)
+
+    return group.connect(output_connection, input_connections)
 
 # Add ability to print output for different openmdao versions
 def FUSED_print(group):
 
-    if int(op.__version__[0]) > 1:
-        group.list_outputs()
-    else:
-        for io in group.unknowns:
-            print(io + ' ' + str(group.unknowns[io]))
+    openmdao_backend().print_outputs(group)
 
 # Return FUSED Problem based on version of OpenMDAO 1.x or 2.x
 # Redundancy kept for consistency with other FUSED functions
 ############################################################
 def FUSED_Problem(*args, **kwargs):
 
-    if int(op.__version__[0]) > 1:
-        from openmdao.api import Problem
-        return Problem(*args, **kwargs)
-    else:
-        from openmdao.api import Problem
-        return Problem(*args, **kwargs)
+    return openmdao_backend().api.Problem(*args, **kwargs)
 
 # Add independent variable components to a problem
 def FUSED_VarComp(*args, **kwargs):
 
-    if int(op.__version__[0]) > 1:
-        from openmdao.api import IndepVarComp
-        return IndepVarComp(*args, **kwargs)
-    else:
-        from openmdao.api import IndepVarComp
-        return IndepVarComp(*args, **kwargs)
+    return openmdao_backend().api.IndepVarComp(*args, **kwargs)
 
 # Add ability to print output for different openmdao versions
 def FUSED_setup(problem):
 
-    if int(op.__version__[0]) > 1:
-        problem.setup()
-    else:
-        problem.setup()
+    problem.setup()
+
+# Declarations of the inputs of the FUSED components of a problem by name, as promoted with ['*']
+def FUSED_inputs(problem):
+
+    inputs = {}
+    for component in openmdao_backend().components(problem):
+        for k, v in component.model.interface['input'].items():
+            inputs.setdefault(k, v)
+
+    return inputs
+
+# Copy of the whole state of a set up problem, restored by FUSED_restore
+def FUSED_snapshot(problem):
+
+    return openmdao_backend().snapshot(problem)
+
+def FUSED_restore(problem, state):
+
+    openmdao_backend().restore(problem, state)
 
 # Run problem based on version of OpenMDAO 1.x or 2.x
 def FUSED_run(problem):
-  
-    if int(op.__version__[0]) > 1:
-        return problem.run_driver()
-    else:
-        return problem.run()
+
+    if profiler.enabled:
+        return profiler.profile_run('FUSED_run', openmdao_backend().run, problem)
+
+    return openmdao_backend().run(problem)
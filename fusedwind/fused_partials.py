@@ -0,0 +1,189 @@
+# Jacobians of FUSED objects from one batch of perturbed points, by finite differences or complex step
+
+import numpy as np
+
+from fusedwind.fused_wind import batch_shape, batch_value, build_layout
+
+# The following are helper functions to move between named variables and flat arrays
+#####################################################################################
+
+# Flat array of the values of a layout, variables missing from values take their interface default
+def pack_values(inner_dict, layout, values=None, dtype=float):
+
+    x = np.zeros(max([stop for start, stop, shape in layout.values()] + [0]), dtype=dtype)
+    for k, (start, stop, shape) in layout.items():
+        if values is not None and k in values:
+            x[start:stop] = np.ravel(values[k])
+        else:
+            x[start:stop] = np.ravel(batch_value(inner_dict[k], 1))
+
+    return x
+
+# Flat arrays of the lower and upper bounds of a layout, infinite where a variable has no bound
+def flat_bounds(inner_dict, layout):
+
+    n = max([stop for start, stop, shape in layout.values()] + [0])
+    lower = np.full(n, -np.inf)
+    upper = np.full(n, np.inf)
+    for k, (start, stop, shape) in layout.items():
+        if 'lower' in inner_dict[k].keys():
+            lower[start:stop] = np.broadcast_to(np.asarray(inner_dict[k]['lower'], dtype=float), shape).ravel()
+        if 'upper' in inner_dict[k].keys():
+            upper[start:stop] = np.broadcast_to(np.asarray(inner_dict[k]['upper'], dtype=float), shape).ravel()
+
+    return lower, upper
+
+# Batch of named inputs from the rows of a 2D array
+def unpack_batch(inner_dict, layout, X):
+
+    n = X.shape[0]
+
+    return dict((k, X[:, start:stop].reshape(batch_shape(inner_dict[k], n))) for k, (start, stop, shape) in layout.items())
+
+# Compute a batch of points given as the rows of X and return the outputs as the rows of a 2D array
+# Complex points, as for complex step, are computed in complex arrays by compute_batch
+def evaluate_rows(model, X, input_layout, output_layout):
+
+    n = X.shape[0]
+    inputs = unpack_batch(model.interface['input'], input_layout, X)
+    outputs = model.compute_batch(inputs, n=n)
+
+    n_out = max([stop for start, stop, shape in output_layout.values()] + [0])
+    Y = np.zeros((n, n_out), dtype=X.dtype)
+    for k, (start, stop, shape) in output_layout.items():
+        Y[:, start:stop] = np.reshape(outputs[k], (n, stop - start))
+
+    return Y
+
+# Partial derivatives of a FUSED object
+########################################
+
+class FUSED_Partials(object):
+
+    # method is 'fd' for finite differences, with form 'forward' or 'central', or 'cs' for complex step,
+    # which needs a model whose compute works on complex arrays and sets complex_step = True
+    def __init__(self, model, method='fd', step=None, form='forward', sparsity=None, seed=0):
+
+        super(FUSED_Partials,self).__init__()
+
+        if method not in ('fd', 'cs'):
+            raise Exception('Unknown method '+str(method)+' to compute partials, use fd or cs')
+        if method == 'cs' and not getattr(model, 'complex_step', False):
+            raise Exception('The model '+type(model).__name__+' does not support complex step')
+        if form not in ('forward', 'central'):
+            raise Exception('Unknown form '+str(form)+' of finite differences, use forward or central')
+
+        self.model = model
+        self.method = method
+        self.form = form
+        if step is None:
+            step = 1e-40 if method == 'cs' else 1e-6
+        self.step = step
+
+        self.input_layout = build_layout(model.interface['input'])
+        self.output_layout = build_layout(model.interface['output'])
+        self.n_in = max([stop for start, stop, shape in self.input_layout.values()] + [0])
+        self.n_out = max([stop for start, stop, shape in self.output_layout.values()] + [0])
+
+        if sparsity is None:
+            sparsity = self.probe(seed)
+        self.sparsity = sparsity
+        self.columns = np.flatnonzero(sparsity.any(axis=0))
+        self.nonzero = self.pattern()
+
+    # Entries that change when their input is perturbed at any of a few random points, the first near the defaults and
+    # the others spread over the bounds of the inputs or over ten times their typical scale where they have no bounds.
+    # Outputs that become NaN are kept as dependent since nothing can be said about them, points that fail are skipped
+    def probe(self, seed=0, points=8):
+
+        rng = np.random.RandomState(seed)
+        x0 = pack_values(self.model.interface['input'], self.input_layout)
+        lower, upper = flat_bounds(self.model.interface['input'], self.input_layout)
+        bounded = np.isfinite(lower) & np.isfinite(upper)
+        width = np.where(bounded, upper - lower, 0.0)
+        scale = np.abs(x0) + 1.0
+
+        changed = np.zeros((self.n_in, self.n_out), dtype=bool)
+        evaluated = 0
+        for p in range(points):
+            if p == 0:
+                x = x0 + scale * rng.uniform(0.01, 0.1, size=x0.shape)
+            else:
+                x = np.where(bounded, np.where(bounded, lower, 0.0) + width * rng.uniform(size=x0.shape),
+                             np.clip(x0 + scale * rng.uniform(-10.0, 10.0, size=x0.shape), lower, upper))
+            delta = (np.abs(x) + 1.0) * rng.uniform(0.01, 0.1, size=x.shape)
+            # Steps stay inside the bounds, a point on the upper bound is perturbed downwards
+            delta = np.where(x + delta > upper, -delta, delta)
+
+            X = np.tile(x, (self.n_in + 1, 1))
+            X[1 + np.arange(self.n_in), np.arange(self.n_in)] += delta
+            try:
+                Y = evaluate_rows(self.model, X, self.input_layout, self.output_layout)
+            except Exception:
+                continue
+            changed |= (Y[1:] != Y[0]) | np.isnan(Y[1:])
+            evaluated += 1
+
+        if evaluated == 0:
+            raise Exception('The model '+type(self.model).__name__+' failed at every point probed for its sparsity')
+
+        return changed.T
+
+    # Dense Jacobian of the flat outputs to the flat inputs, inputs not influencing any output are not perturbed
+    # The sparsity only selects the columns and the declared entries, the computed entries are returned as they are
+    # Finite difference steps are relative to inputs larger than one, step * max(1, |x|), so that they stay above the
+    # resolution of large inputs, the complex step is exact to rounding and stays absolute
+    def jacobian(self, inputs=None):
+
+        x = pack_values(self.model.interface['input'], self.input_layout, inputs)
+        columns = self.columns
+        m = len(columns)
+        J = np.zeros((self.n_out, self.n_in))
+        if m == 0:
+            return J
+
+        if self.method == 'cs':
+            X = np.tile(x.astype(complex), (m, 1))
+            X[np.arange(m), columns] += 1j * self.step
+            Y = evaluate_rows(self.model, X, self.input_layout, self.output_layout)
+            J[:, columns] = Y.imag.T / self.step
+        elif self.form == 'forward':
+            X = np.tile(x, (m + 1, 1))
+            X[1 + np.arange(m), columns] += self.step * np.maximum(1.0, np.abs(x[columns]))
+            # The steps actually taken after rounding of x + h
+            h = X[1 + np.arange(m), columns] - x[columns]
+            Y = evaluate_rows(self.model, X, self.input_layout, self.output_layout)
+            J[:, columns] = (Y[1:] - Y[0]).T / h
+        else:
+            X = np.tile(x, (2 * m, 1))
+            X[np.arange(m), columns] += self.step * np.maximum(1.0, np.abs(x[columns]))
+            X[m + np.arange(m), columns] -= self.step * np.maximum(1.0, np.abs(x[columns]))
+            h = X[np.arange(m), columns] - X[m + np.arange(m), columns]
+            Y = evaluate_rows(self.model, X, self.input_layout, self.output_layout)
+            J[:, columns] = (Y[:m] - Y[m:]).T / h
+
+        return J
+
+    # Pairs of (output, input) names with at least one nonzero entry and the rows and columns of the entries in their block
+    def pattern(self):
+
+        blocks = {}
+        for of, (o0, o1, oshape) in self.output_layout.items():
+            for wrt, (i0, i1, ishape) in self.input_layout.items():
+                rows, cols = np.nonzero(self.sparsity[o0:o1, i0:i1])
+                if len(rows) > 0:
+                    blocks[of, wrt] = (rows, cols)
+
+        return blocks
+
+    # Dense blocks of the Jacobian per pair of (output, input) names in the pattern
+    def blocks(self, inputs=None):
+
+        J = self.jacobian(inputs)
+        blocks = {}
+        for of, wrt in self.nonzero.keys():
+            o0, o1, oshape = self.output_layout[of]
+            i0, i1, ishape = self.input_layout[wrt]
+            blocks[of, wrt] = J[o0:o1, i0:i1]
+
+        return blocks
@@ -0,0 +1,94 @@
+# Evaluate models of one turbine type over plants with an array of turbines that may differ
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object, create_interface, set_input, set_output, make_variable, batch_shape
+
+# Interface with the named inputs as arrays over the turbines of a plant, sized by the symbolic size size_name
+# The outputs become arrays over the turbines for the names in array_outputs and keep their shape otherwise
+def per_turbine_interface(fifc, names, array_outputs=(), size_name='n_turbines'):
+
+    def per_turbine(variable):
+
+        var = make_variable(variable)
+        shape = tuple(var['shape']) if 'shape' in var.keys() else ()
+        var['shape'] = ({'name': size_name},) + shape
+
+        return var
+
+    plant = create_interface()
+    for k, v in fifc['input'].items():
+        set_input(plant, per_turbine(v) if k in names else v)
+    for k, v in fifc['output'].items():
+        set_output(plant, per_turbine(v) if k in array_outputs else v)
+
+    return plant
+
+### FUSED-wrapper file
+class FUSED_PerTurbine(FUSED_Object):
+
+    # The inputs in names take one value per turbine, the other inputs are shared by the plant, e.g. turbine_number
+    # Each unique combination of per turbine values is computed once, all of them in one call of compute_batch
+    # aggregate maps outputs to 'mean', 'sum' or 'array' over the turbines, the default 'mean' reproduces the plant
+    # value of a homogeneous plant when the model is evaluated for a plant of turbine_number turbines of one type
+    def __init__(self, model, names, n_turbines, aggregate=None):
+
+        super(FUSED_PerTurbine,self).__init__()
+
+        self.model = model
+        self.names = sorted(names)
+        self.n_turbines = n_turbines
+        self.aggregate = dict((k, 'mean') for k in model.interface['output'].keys())
+        if aggregate is not None:
+            for k, v in aggregate.items():
+                if v not in ('mean', 'sum', 'array'):
+                    raise Exception('Unknown aggregation '+str(v)+' of '+k+', use mean, sum or array')
+                self.aggregate[k] = v
+        for k in self.names:
+            if k not in model.interface['input']:
+                raise Exception('The per turbine input '+k+' is not an input of '+type(model).__name__)
+
+        array_outputs = [k for k, v in self.aggregate.items() if v == 'array']
+        self.implement_fifc(per_turbine_interface(model.interface, self.names, array_outputs), n_turbines=n_turbines)
+
+        # Per turbine inputs keep their default value for every turbine
+        for k in self.names:
+            val = np.zeros(batch_shape(model.interface['input'][k], n_turbines))
+            val[...] = model.interface['input'][k]['val']
+            self.interface['input'][k]['val'] = val
+
+    # Unique turbine types as a batch of inputs, their number of turbines and the type of each turbine
+    def turbine_types(self, inputs):
+
+        n = self.n_turbines
+        rows = np.concatenate([np.reshape(np.asarray(inputs[k], dtype=float), (n, -1)) for k in self.names], axis=1)
+        types, inverse, counts = np.unique(rows, axis=0, return_inverse=True, return_counts=True)
+        inverse = np.reshape(inverse, -1)
+
+        batch = {}
+        start = 0
+        for k in self.names:
+            size = int(np.prod(batch_shape(self.model.interface['input'][k], 1)))
+            batch[k] = types[:, start:start + size].reshape(batch_shape(self.model.interface['input'][k], len(types)))
+            start += size
+
+        return batch, counts, inverse
+
+    def compute(self, inputs, outputs):
+
+        batch, counts, inverse = self.turbine_types(inputs)
+        for k in self.model.interface['input'].keys():
+            if k not in batch:
+                batch[k] = inputs[k]
+
+        results = self.model.compute_batch(batch, n=len(counts))
+
+        for k, how in self.aggregate.items():
+            values = np.asarray(results[k])
+            if how == 'array':
+                outputs[k] = values[inverse]
+                continue
+            total = np.tensordot(counts, values, axes=(0, 0))
+            outputs[k] = total if how == 'sum' else total / self.n_turbines
+
+        return outputs
@@ -0,0 +1,147 @@
+# Instrument the evaluation of FUSED components and problems, a disabled profiler costs one attribute check per call
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+class FUSED_Profiler(object):
+
+    # Percentiles use up to max_samples durations per name, counts and totals are always exact
+    def __init__(self, max_samples=100000, max_events=100000):
+
+        super(FUSED_Profiler,self).__init__()
+
+        self.enabled = False
+        self.max_samples = max_samples
+        self.max_events = max_events
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def enable(self):
+
+        self.enabled = True
+
+    def disable(self):
+
+        self.enabled = False
+
+    def reset(self):
+
+        self.calls = {}
+        self.totals = {}
+        self.samples = {}
+        self.bytes = {}
+        self.inside = {}
+        self.events = []
+        self.t0 = time.time()
+
+    def record(self, name, start, duration, nbytes=None):
+
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.totals[name] = self.totals.get(name, 0.0) + duration
+            samples = self.samples.setdefault(name, [])
+            if len(samples) < self.max_samples:
+                samples.append(duration)
+            if nbytes is not None:
+                copied = self.bytes.setdefault(name, {})
+                for k, v in nbytes.items():
+                    copied[k] = copied.get(k, 0) + v
+            if len(self.events) < self.max_events:
+                self.events.append((name, start, duration, threading.current_thread().ident))
+
+    # Spans open in the calling thread as (name, whether it is a run)
+    def stack(self):
+
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+
+        return self.local.stack
+
+    # Call run(*args) and record its time under name, e.g. FUSED_run. The time of the components called directly
+    # inside it is added up in inside[name], so that the time spent outside the components is known
+    def profile_run(self, name, run, *args):
+
+        stack = self.stack()
+        stack.append((name, True))
+        start = time.time()
+        try:
+            return run(*args)
+        finally:
+            stack.pop()
+            self.record(name, start, time.time() - start)
+
+    # Call compute(inputs, outputs) and record its time and the bytes of each output it produced
+    def profile_compute(self, name, compute, inputs, outputs, output_names):
+
+        stack = self.stack()
+        parent = stack[-1] if len(stack) > 0 else None
+        stack.append((name, False))
+        start = time.time()
+        try:
+            compute(inputs, outputs)
+        finally:
+            stack.pop()
+        duration = time.time() - start
+
+        nbytes = {}
+        for k in output_names:
+            nbytes[k] = np.asarray(outputs[k]).nbytes
+        self.record(name, start, duration, nbytes)
+        if parent is not None and parent[1]:
+            with self.lock:
+                self.inside[parent[0]] = self.inside.get(parent[0], 0.0) + duration
+
+    # Rows of calls, total, mean and percentile times in seconds and bytes copied, hottest first
+    def summary(self):
+
+        rows = []
+        for name, calls in self.calls.items():
+            samples = np.array(self.samples[name])
+            rows.append({'name': name, 'calls': calls, 'total': self.totals[name],
+                         'mean': self.totals[name] / calls,
+                         'p50': float(np.percentile(samples, 50)),
+                         'p90': float(np.percentile(samples, 90)),
+                         'p99': float(np.percentile(samples, 99)),
+                         'bytes': sum(self.bytes.get(name, {}).values()),
+                         'bytes_per_variable': dict(self.bytes.get(name, {}))})
+
+        return sorted(rows, key=lambda row: -row['total'])
+
+    def to_json(self, path):
+
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    # Trace viewable in chrome://tracing or Perfetto
+    def to_chrome_trace(self, path):
+
+        pid = os.getpid()
+        events = []
+        for name, start, duration, tid in self.events:
+            events.append({'name': name, 'ph': 'X', 'ts': 1e6 * (start - self.t0), 'dur': 1e6 * duration,
+                           'pid': pid, 'tid': tid})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events}, f)
+
+# The profiler used by the FUSED wrappers
+profiler = FUSED_Profiler()
+
+# Print the hottest entries in the style of FUSED_print
+def FUSED_print_profile(n=20):
+
+    print('%-40s %8s %12s %12s %12s %12s %12s %12s' % ('name', 'calls', 'total [s]', 'mean [us]',
+                                                      'p50 [us]', 'p90 [us]', 'p99 [us]', 'bytes'))
+    for row in profiler.summary()[:n]:
+        print('%-40s %8d %12.6f %12.2f %12.2f %12.2f %12.2f %12d' % (row['name'], row['calls'], row['total'],
+              1e6 * row['mean'], 1e6 * row['p50'], 1e6 * row['p90'], 1e6 * row['p99'], row['bytes']))
+
+    # Time of the runs not spent inside the components they called goes to the framework, e.g. OpenMDAO bookkeeping,
+    # components that ran elsewhere, e.g. in a native dataflow, are not counted
+    if 'FUSED_run' in profiler.totals:
+        outside = profiler.totals['FUSED_run'] - profiler.inside.get('FUSED_run', 0.0)
+        print('%-40s %8s %12.6f' % ('FUSED_run outside components', '', outside))
@@ -0,0 +1,201 @@
+# Record the inputs and outputs of many cases to disk as one binary column per variable
+
+import json
+import os
+
+import numpy as np
+
+# Column files hold float64 rows, the meta file commits the number of rows that are complete in every column
+_dtype = np.dtype('<f8')
+
+def _meta_path(path):
+
+    return os.path.join(path, 'meta.json')
+
+def _column_path(path, name):
+
+    return os.path.join(path, name + '.f64')
+
+def read_meta(path):
+
+    with open(_meta_path(path)) as f:
+        return json.load(f)
+
+def _write_meta(path, meta):
+
+    tmp = _meta_path(path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.rename(tmp, _meta_path(path))
+
+# Recorded columns of a directory as name -> array of shape (count,)+shape, memory mapped unless mmap is False
+def load_records(path, mmap=True):
+
+    meta = read_meta(path)
+    count = meta['count']
+    records = {}
+    for name, shape in meta['variables'].items():
+        shape = (count,) + tuple(shape)
+        if count == 0:
+            records[name] = np.zeros(shape)
+        elif mmap:
+            records[name] = np.memmap(_column_path(path, name), dtype=_dtype, mode='r', shape=shape)
+        else:
+            records[name] = np.fromfile(_column_path(path, name), dtype=_dtype, count=int(np.prod(shape))).reshape(shape)
+
+    return records
+
+# Streaming recorder
+####################
+
+class FUSED_Recorder(object):
+
+    # Cases are buffered chunk_size at a time and appended to the columns, the memory used is bounded by the chunk
+    # An existing recording is resumed, columns written after the last committed chunk are truncated
+    # The shapes of the variables are taken from the first case unless given as a dict of name to shape
+    # digest identifies what is recorded, e.g. FUSED_DOE.digest(), a recording made for another digest is not resumed
+    def __init__(self, path, names=None, shapes=None, chunk_size=4096, digest=None):
+
+        super(FUSED_Recorder,self).__init__()
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffers = None
+        self.buffered = 0
+
+        if os.path.exists(_meta_path(path)):
+            meta = read_meta(path)
+            if names is not None and sorted(names) != sorted(meta['variables'].keys()):
+                raise Exception('The recording in '+path+' holds the variables '+', '.join(sorted(meta['variables'].keys())))
+            self.names = sorted(meta['variables'].keys())
+            self.count = meta['count']
+            self.digest = meta.get('digest')
+            if digest is not None:
+                self.check(digest)
+            self.shapes = dict((k, tuple(v)) for k, v in meta['variables'].items())
+            for name in self.names:
+                with open(_column_path(path, name), 'r+b') as f:
+                    f.truncate(self.count * int(np.prod(self.shapes[name])) * _dtype.itemsize)
+        else:
+            if names is None:
+                raise Exception('The names of the variables must be given to start a recording')
+            for name in names:
+                if os.sep in name or name == 'meta':
+                    raise Exception('The variable '+name+' cannot be recorded as a column file')
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            self.names = sorted(names)
+            self.count = 0
+            self.digest = digest
+            self.shapes = None
+            if shapes is not None:
+                self.shapes = dict((k, tuple(shapes[k])) for k in self.names)
+                self._start()
+
+        if self.shapes is not None:
+            self._allocate()
+
+    # Create the empty columns and commit the meta of a new recording
+    def _start(self):
+
+        for name in self.names:
+            open(_column_path(self.path, name), 'wb').close()
+        self._commit()
+
+    def _allocate(self):
+
+        self.buffers = dict((k, np.zeros((self.chunk_size,) + self.shapes[k], dtype=_dtype)) for k in self.names)
+
+    def _commit(self):
+
+        _write_meta(self.path, {'count': self.count, 'digest': self.digest,
+                                'variables': dict((k, list(v)) for k, v in self.shapes.items())})
+
+    # Make sure the recording holds the cases identified by digest, an empty recording takes the digest
+    def check(self, digest):
+
+        if self.digest == digest:
+            return
+        if len(self) > 0:
+            raise Exception('The recording in '+self.path+' holds '+str(len(self))+' cases of another sweep, '
+                            'record to a new directory or remove it')
+        self.digest = digest
+        if self.shapes is not None:
+            self._commit()
+
+    # Record one case from a dict of values or a problem, scalars stored as one element arrays are flattened
+    def record(self, values):
+
+        if self.shapes is None:
+            self.shapes = {}
+            for k in self.names:
+                shape = np.shape(values[k])
+                self.shapes[k] = () if shape == (1,) else shape
+            self._start()
+            self._allocate()
+
+        for k in self.names:
+            self.buffers[k][self.buffered] = np.reshape(values[k], self.shapes[k])
+        self.buffered += 1
+        if self.buffered == self.chunk_size:
+            self.flush()
+
+    # Record n cases at once, values hold a leading dimension of n cases
+    def record_batch(self, values, n=None):
+
+        if n is None:
+            n = len(values[self.names[0]])
+        if self.shapes is None:
+            self.record(dict((k, np.asarray(v)[0]) for k, v in values.items()))
+            start = 1
+        else:
+            start = 0
+
+        while start < n:
+            stop = min(n, start + self.chunk_size - self.buffered)
+            for k in self.names:
+                self.buffers[k][self.buffered:self.buffered + stop - start] = \
+                    np.reshape(np.asarray(values[k])[start:stop], (stop - start,) + self.shapes[k])
+            self.buffered += stop - start
+            start = stop
+            if self.buffered == self.chunk_size:
+                self.flush()
+
+    # Append the buffered cases to the columns and commit them
+    def flush(self):
+
+        if self.buffered == 0:
+            return
+        for k in self.names:
+            with open(_column_path(self.path, k), 'ab') as f:
+                self.buffers[k][:self.buffered].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+        self.count += self.buffered
+        self.buffered = 0
+        self._commit()
+
+    def close(self):
+
+        self.flush()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+        return False
+
+    # Number of recorded cases, including those still buffered
+    def __len__(self):
+
+        return self.count + self.buffered
+
+    def load(self, mmap=True):
+
+        self.flush()
+
+        return load_records(self.path, mmap)
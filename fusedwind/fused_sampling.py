@@ -0,0 +1,187 @@
+# Generate tables of input cases for design of experiments
+
+import numpy as np
+
+# Every combination of the levels of each input, levels is a dict of name to list of values
+def full_factorial(levels):
+
+    names = sorted(levels.keys())
+    grids = np.meshgrid(*[np.asarray(levels[k], dtype=float) for k in names], indexing='ij')
+
+    cases = {}
+    for k, grid in zip(names, grids):
+        cases[k] = grid.ravel()
+
+    return cases
+
+# Latin hypercube of n cases, bounds is a dict of name to (lower, upper)
+def latin_hypercube(bounds, n, seed=None):
+
+    rng = np.random.RandomState(seed)
+
+    cases = {}
+    for k in sorted(bounds.keys()):
+        lower, upper = bounds[k]
+        u = (rng.permutation(n) + rng.uniform(size=n)) / n
+        cases[k] = lower + u * (upper - lower)
+
+    return cases
+
+# Number of cases in a table
+def case_count(cases):
+
+    counts = set(len(v) for v in cases.values())
+    if len(counts) != 1:
+        raise Exception('All inputs of a case table must have the same number of cases')
+
+    return counts.pop()
+
+# The following are quasi-random sequences filling the unit cube more evenly than random sampling
+###################################################################################################
+
+# Degree s, coefficients a and initial direction numbers m of the primitive polynomials of dimensions 2 to 64
+# from the new-joe-kuo-6.21201 table of S. Joe and F. Y. Kuo
+_joe_kuo = [(1, 0, [1]),
+            (2, 1, [1, 3]),
+            (3, 1, [1, 3, 1]),
+            (3, 2, [1, 1, 1]),
+            (4, 1, [1, 1, 3, 3]),
+            (4, 4, [1, 3, 5, 13]),
+            (5, 2, [1, 1, 5, 5, 17]),
+            (5, 4, [1, 1, 5, 5, 5]),
+            (5, 7, [1, 1, 7, 11, 19]),
+            (5, 11, [1, 1, 5, 1, 1]),
+            (5, 13, [1, 1, 1, 3, 11]),
+            (5, 14, [1, 3, 5, 5, 31]),
+            (6, 1, [1, 3, 3, 9, 7, 49]),
+            (6, 13, [1, 1, 1, 15, 21, 21]),
+            (6, 16, [1, 3, 1, 13, 27, 49]),
+            (6, 19, [1, 1, 1, 15, 7, 5]),
+            (6, 22, [1, 3, 1, 15, 13, 25]),
+            (6, 25, [1, 1, 5, 5, 19, 61]),
+            (7, 1, [1, 3, 7, 11, 23, 15, 103]),
+            (7, 4, [1, 3, 7, 13, 13, 15, 69]),
+            (7, 7, [1, 1, 3, 13, 7, 35, 63]),
+            (7, 8, [1, 3, 5, 9, 1, 25, 53]),
+            (7, 14, [1, 3, 1, 13, 9, 35, 107]),
+            (7, 19, [1, 3, 1, 5, 27, 61, 31]),
+            (7, 21, [1, 1, 5, 11, 19, 41, 61]),
+            (7, 28, [1, 3, 5, 3, 3, 13, 69]),
+            (7, 31, [1, 1, 7, 13, 1, 19, 1]),
+            (7, 32, [1, 3, 7, 5, 13, 19, 59]),
+            (7, 37, [1, 1, 3, 9, 25, 29, 41]),
+            (7, 41, [1, 3, 5, 13, 23, 1, 55]),
+            (7, 42, [1, 3, 7, 3, 13, 59, 17]),
+            (7, 50, [1, 3, 1, 3, 5, 53, 69]),
+            (7, 55, [1, 1, 5, 5, 23, 33, 13]),
+            (7, 56, [1, 1, 7, 7, 1, 61, 123]),
+            (7, 59, [1, 1, 7, 9, 13, 61, 49]),
+            (7, 62, [1, 3, 3, 5, 3, 55, 33]),
+            (8, 14, [1, 3, 1, 15, 31, 13, 49, 245]),
+            (8, 21, [1, 3, 5, 15, 31, 59, 63, 97]),
+            (8, 22, [1, 3, 1, 11, 11, 11, 77, 249]),
+            (8, 38, [1, 3, 1, 11, 27, 43, 71, 9]),
+            (8, 47, [1, 1, 7, 15, 21, 11, 81, 45]),
+            (8, 49, [1, 3, 7, 3, 25, 31, 65, 79]),
+            (8, 50, [1, 3, 1, 1, 19, 11, 3, 205]),
+            (8, 52, [1, 1, 5, 9, 19, 21, 29, 157]),
+            (8, 56, [1, 3, 7, 11, 1, 33, 89, 185]),
+            (8, 67, [1, 3, 3, 3, 15, 9, 79, 71]),
+            (8, 70, [1, 3, 7, 11, 15, 39, 119, 27]),
+            (8, 84, [1, 1, 3, 1, 11, 31, 97, 225]),
+            (8, 97, [1, 1, 1, 3, 23, 43, 57, 177]),
+            (8, 103, [1, 3, 7, 7, 17, 17, 37, 71]),
+            (8, 115, [1, 3, 1, 5, 27, 63, 123, 213]),
+            (8, 122, [1, 1, 3, 5, 11, 43, 53, 133]),
+            (9, 8, [1, 3, 5, 5, 29, 17, 47, 173, 479]),
+            (9, 13, [1, 3, 3, 11, 3, 1, 109, 9, 69]),
+            (9, 16, [1, 1, 1, 5, 17, 39, 23, 5, 343]),
+            (9, 22, [1, 3, 1, 5, 25, 15, 31, 103, 499]),
+            (9, 25, [1, 1, 1, 11, 11, 17, 63, 105, 183]),
+            (9, 44, [1, 1, 5, 11, 9, 29, 97, 231, 363]),
+            (9, 47, [1, 1, 5, 15, 19, 45, 41, 7, 383]),
+            (9, 52, [1, 3, 7, 7, 31, 19, 83, 137, 221]),
+            (9, 55, [1, 1, 1, 3, 23, 15, 111, 223, 83]),
+            (9, 59, [1, 1, 5, 13, 31, 15, 55, 25, 161]),
+            (9, 62, [1, 1, 3, 13, 25, 47, 39, 87, 257])]
+
+_sobol_bits = 32
+
+# Direction numbers of the first dim dimensions scaled to integers of _sobol_bits bits, an array of dim by bits
+def sobol_directions(dim):
+
+    if dim > len(_joe_kuo) + 1:
+        raise Exception('Sobol sequences are available for up to '+str(len(_joe_kuo) + 1)+' dimensions')
+
+    bits = _sobol_bits
+    V = np.zeros((dim, bits), dtype=np.uint64)
+    V[0] = [1 << (bits - 1 - k) for k in range(bits)]
+    for d in range(1, dim):
+        s, a, m = _joe_kuo[d - 1]
+        v = [m[k] << (bits - 1 - k) for k in range(s)]
+        for k in range(s, bits):
+            value = v[k - s] ^ (v[k - s] >> s)
+            for j in range(1, s):
+                if (a >> (s - 1 - j)) & 1:
+                    value ^= v[k - j]
+            v.append(value)
+        V[d] = v
+
+    return V
+
+# Points start to start+n of the Sobol sequence in Gray code order, an array of n by dim in [0, 1)
+# The first point of the sequence is the origin, which is skipped by default
+def sobol_sequence(n, dim, start=1):
+
+    if n <= 0:
+        return np.zeros((0, dim))
+    V = sobol_directions(dim)
+
+    # State at the first point is the XOR of the directions of the bits set in the Gray code of start
+    x = np.zeros(dim, dtype=np.uint64)
+    gray = start ^ (start >> 1)
+    for k in range(_sobol_bits):
+        if (gray >> k) & 1:
+            x ^= V[:, k]
+
+    # Every following point flips the direction of the lowest zero bit of the previous index
+    index = np.arange(start, start + n - 1, dtype=np.uint64)
+    lowest = np.zeros(len(index), dtype=int)
+    rest = index.copy()
+    while True:
+        odd = (rest & 1) == 1
+        if not odd.any():
+            break
+        lowest[odd] += 1
+        rest[odd] >>= np.uint64(1)
+    steps = np.vstack([x[None, :], V[:, lowest].T])
+    points = np.bitwise_xor.accumulate(steps, axis=0)
+
+    return points.astype(float) / float(1 << _sobol_bits)
+
+def _primes(n):
+
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p != 0 for p in primes):
+            primes.append(candidate)
+        candidate += 1
+
+    return primes
+
+# Points start to start+n of the Halton sequence, the radical inverses of the index in the first dim prime bases
+def halton_sequence(n, dim, start=1):
+
+    n = max(n, 0)
+    index = np.arange(start, start + n)
+    points = np.zeros((n, dim))
+    for d, base in enumerate(_primes(dim)):
+        rest = index.copy()
+        scale = 1.0
+        while rest.any():
+            scale /= base
+            points[:, d] += scale * (rest % base)
+            rest //= base
+
+    return points
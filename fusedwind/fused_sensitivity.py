@@ -0,0 +1,213 @@
+# Variance based global sensitivity analysis of FUSED objects and assemblies by Sobol indices
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.fused_doe import FUSED_DOE
+from fusedwind.fused_sampling import sobol_sequence, halton_sequence
+from fusedwind.fused_surrogate import input_bounds
+
+# Bounds of the scalar inputs of a FUSED object or of the independent inputs of a dataflow as name -> (lower, upper)
+# from the 'lower' and 'upper' keys of their interfaces, bounds given as a dict take precedence and are required
+# for other problems such as OpenMDAO problems
+def problem_bounds(problem, bounds=None):
+
+    found = {}
+    if isinstance(problem, FUSED_Object):
+        found = input_bounds(problem.interface['input'])
+        shapes = dict((k, v['shape']) for k, v in problem.interface['input'].items() if 'shape' in v.keys())
+    elif isinstance(problem, FUSED_Dataflow):
+        independent = problem.independent_inputs()
+        for name, obj in problem.objects:
+            for k, v in input_bounds(obj.interface['input']).items():
+                if k in independent:
+                    found[k] = v
+        shapes = dict((k, problem[k].shape) for k in independent if np.size(problem[k]) != 1)
+    else:
+        shapes = {}
+    if bounds is not None:
+        for k, v in bounds.items():
+            found[k] = tuple(v)
+
+    for k, (lower, upper) in found.items():
+        if k in shapes or np.ndim(lower) > 0 or np.ndim(upper) > 0:
+            raise Exception('The input '+k+' is an array, only scalar inputs can be sampled for sensitivity')
+    if len(found) == 0:
+        raise Exception('No input has bounds to sample, give them as bounds or as lower and upper in the interfaces')
+
+    return found
+
+# Saltelli design
+#################
+
+# Rows of the matrices A and B of n independent points and of the d matrices AB_i, A with its column i taken from B
+# The n*(d+2) rows follow each other matrix by matrix and are built on request, only A and B are held,
+# FUSED_DOE takes the design in place of a case table
+class FUSED_Saltelli(object):
+
+    # sampler is 'sobol' for a sequence of 2*d dimensions split into A and B, 'halton' or 'random'
+    # A seed shifts the quasi-random points by a random vector
+    def __init__(self, bounds, n, sampler='sobol', seed=None):
+
+        super(FUSED_Saltelli,self).__init__()
+
+        self.names = sorted(bounds.keys())
+        self.n = n
+        d = len(self.names)
+        self.n_rows = n * (d + 2)
+        rng = np.random.RandomState(seed)
+
+        if sampler == 'sobol':
+            u = sobol_sequence(n, 2 * d)
+        elif sampler == 'halton':
+            u = halton_sequence(n, 2 * d)
+        elif sampler == 'random':
+            u = rng.uniform(size=(n, 2 * d))
+        else:
+            raise Exception('Unknown sampler '+str(sampler)+', use sobol, halton or random')
+        if sampler != 'random' and seed is not None:
+            u = np.mod(u + rng.uniform(size=2 * d), 1.0)
+
+        lower = np.array([bounds[k][0] for k in self.names], dtype=float)
+        upper = np.array([bounds[k][1] for k in self.names], dtype=float)
+        self.A = lower + u[:, :d] * (upper - lower)
+        self.B = lower + u[:, d:] * (upper - lower)
+
+    # Inputs of the rows start to stop as a dict of name to array
+    def rows(self, start, stop):
+
+        index = np.arange(start, stop)
+        matrix = index // self.n
+        point = index % self.n
+
+        X = self.A[point]
+        X[matrix == 1] = self.B[point[matrix == 1]]
+        mixed = matrix >= 2
+        column = matrix[mixed] - 2
+        X[mixed, column] = self.B[point[mixed], column]
+
+        return dict((k, X[:, i]) for i, k in enumerate(self.names))
+
+    # Values of all rows as f(A), f(B) and f(AB_i) of shapes (n, ...), (n, ...) and (d, n, ...)
+    def split(self, values):
+
+        values = np.asarray(values)
+        d = len(self.names)
+        shape = values.shape[1:]
+
+        return values[:self.n], values[self.n:2 * self.n], values[2 * self.n:].reshape((d, self.n) + shape)
+
+# Estimators
+############
+
+# First order indices by the estimator of Saltelli et al. 2010 and total indices by the estimator of Jansen 1999
+# from the values f(A), f(B) of shape (n, m) and f(AB_i) of shape (d, n, m), indices are NaN for constant outputs
+def sobol_indices(fA, fB, fAB):
+
+    variance = np.var(np.concatenate([fA, fB]), axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = np.where(variance > 0.0, variance, np.nan)
+        first = np.mean(fB * (fAB - fA), axis=1) / variance
+        total = 0.5 * np.mean((fA - fAB) ** 2, axis=1) / variance
+
+    return first, total
+
+# Indices and their bootstrap percentile intervals over resamples of the n points, one resample at a time
+def bootstrap_indices(fA, fB, fAB, resamples=200, confidence=0.95, seed=None):
+
+    first, total = sobol_indices(fA, fB, fAB)
+    rng = np.random.RandomState(seed)
+    n = len(fA)
+    firsts = np.zeros((resamples,) + first.shape)
+    totals = np.zeros((resamples,) + total.shape)
+    for r in range(resamples):
+        index = rng.randint(n, size=n)
+        firsts[r], totals[r] = sobol_indices(fA[index], fB[index], fAB[:, index])
+
+    percentiles = [50.0 * (1.0 - confidence), 50.0 * (1.0 + confidence)]
+    with np.errstate(invalid='ignore'):
+        first_interval = np.nanpercentile(firsts, percentiles, axis=0) if resamples > 0 else np.array([first, first])
+        total_interval = np.nanpercentile(totals, percentiles, axis=0) if resamples > 0 else np.array([total, total])
+
+    return first, total, first_interval, total_interval
+
+# Sensitivity engine
+####################
+
+class FUSED_Sensitivity(object):
+
+    # problem is a FUSED object, whose rows are computed chunk_size at a time by compute_batch, or a picklable factory of
+    # set up problems whose chunks run on a pool of processes as in FUSED_DOE. The n*(d+2) evaluations of the design
+    # are built chunk by chunk, only the outputs of the rows are held. Rows that fail drop their point from the estimates
+    # The bounds of a FUSED object default to those of its interface, a factory is not called here and needs the bounds,
+    # e.g. problem_bounds of the models holding them. The inputs in shared are the same for every row and are placed
+    # once in shared memory for the pool
+    def __init__(self, problem, outputs, bounds=None, n=1024, sampler='sobol', seed=None, processes=None,
+                 chunk_size=1024, resamples=200, confidence=0.95, shared=None):
+
+        super(FUSED_Sensitivity,self).__init__()
+
+        self.problem = problem
+        self.outputs = list(outputs)
+        self.sampler = sampler
+        self.seed = seed
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.resamples = resamples
+        self.confidence = confidence
+        self.shared = shared
+        self.n = n
+
+        if isinstance(problem, FUSED_Object):
+            self.bounds = problem_bounds(problem, bounds)
+        elif bounds is None:
+            raise Exception('The bounds of the inputs must be given with a problem factory')
+        else:
+            self.bounds = problem_bounds(None, bounds)
+        self.design = FUSED_Saltelli(self.bounds, n, sampler, seed)
+        self.names = self.design.names
+
+    # Outputs of every row of the design and the tracebacks of failed rows
+    def evaluate(self):
+
+        design = self.design
+        values = {}
+        errors = {}
+
+        doe = FUSED_DOE(self.problem, design, self.outputs, self.processes, self.chunk_size, self.shared)
+        for start, chunk_values, chunk_errors in doe.chunks():
+            for name in self.outputs:
+                if name not in values:
+                    values[name] = np.full((design.n_rows,) + chunk_values[name].shape[1:], np.nan)
+                values[name][start:start + len(chunk_values[name])] = chunk_values[name]
+            errors.update(chunk_errors)
+
+        return values, errors
+
+    # First order and total indices of every output per input with their bootstrap intervals as (lower, upper)
+    def run(self):
+
+        values, errors = self.evaluate()
+        d = len(self.names)
+
+        summary = {'names': self.names, 'evaluations': self.design.n_rows, 'failures': len(errors), 'outputs': {}}
+        for name in self.outputs:
+            fA, fB, fAB = self.design.split(values[name])
+            shape = fA.shape[1:]
+            fA = fA.reshape(self.n, -1)
+            fB = fB.reshape(self.n, -1)
+            fAB = fAB.reshape(d, self.n, -1)
+
+            # Points where any row failed are dropped
+            valid = np.all(np.isfinite(fA) & np.isfinite(fB), axis=1) & np.all(np.isfinite(fAB), axis=(0, 2))
+            first, total, first_interval, total_interval = bootstrap_indices(
+                fA[valid], fB[valid], fAB[:, valid], self.resamples, self.confidence, self.seed)
+
+            summary['outputs'][name] = {'points': int(valid.sum()),
+                                        'first': first.reshape((d,) + shape),
+                                        'total': total.reshape((d,) + shape),
+                                        'first_interval': first_interval.reshape((2, d) + shape),
+                                        'total_interval': total_interval.reshape((2, d) + shape)}
+
+        return summary
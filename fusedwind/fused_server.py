@@ -0,0 +1,374 @@
+# Serve evaluations of warm FUSED problems to local clients over a Unix socket or localhost TCP
+# Messages are pickled, so only serve clients of the same machine that are trusted
+
+import argparse
+import importlib
+import multiprocessing
+import multiprocessing.pool
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import threading
+
+import numpy as np
+
+from fusedwind.fused_doe import run_cases, check_workers
+from fusedwind.fused_template import problem_state, restore_problem
+from fusedwind.fused_validation import check_table
+
+# The following are helper functions for the messages between client and server
+################################################################################
+
+_header = struct.Struct('!Q')
+
+def send_message(sock, message):
+
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_header.pack(len(data)) + data)
+
+# Exactly n bytes, None if the connection is closed before the first byte and eof is allowed
+def _recv_exact(sock, n, eof=False):
+
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            if eof and len(chunks) == 0:
+                return None
+            raise Exception('The connection was closed in the middle of a message')
+        chunks.append(chunk)
+        n -= len(chunk)
+
+    return b''.join(chunks)
+
+# Next message on the socket, None once the other side closed the connection
+def recv_message(sock):
+
+    header = _recv_exact(sock, _header.size, True)
+    if header is None:
+        return None
+
+    return pickle.loads(_recv_exact(sock, _header.unpack(header)[0]))
+
+def _connect(address):
+
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.connect(address)
+
+    return sock
+
+# Each worker sets up one problem of every registered assembly when it starts and keeps it warm
+#################################################################################################
+
+# The state after setup is restored before every chunk, so no input set by one request leaks into the next
+_server_problems = None
+_server_states = None
+
+def _init_server_worker(assemblies):
+
+    global _server_problems, _server_states
+    _server_problems = {}
+    _server_states = {}
+    for name, problem_factory in assemblies.items():
+        _server_problems[name] = problem_factory()
+        _server_states[name] = problem_state(_server_problems[name])
+
+def _evaluate_chunk(task):
+
+    assembly, start, cases, outputs = task
+    problem = _server_problems[assembly]
+    restore_problem(problem, _server_states[assembly])
+    values, errors = run_cases(problem, cases, outputs)
+
+    return start, values, errors
+
+# Slot of a queued chunk in the pending semaphore, released once by its completion or by the failure of its request
+class _Slot(object):
+
+    def __init__(self, semaphore):
+
+        self.semaphore = semaphore
+        self.lock = threading.Lock()
+        self.held = True
+
+    def release(self, result=None):
+
+        with self.lock:
+            if not self.held:
+                return
+            self.held = False
+        self.semaphore.release()
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+
+        while True:
+            request = recv_message(self.request)
+            if request is None:
+                return
+            try:
+                reply = self.server.fused.dispatch(request)
+            except Exception as e:
+                reply = {'error': str(e)}
+            send_message(self.request, reply)
+            if request.get('op') == 'shutdown':
+                return
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+# Evaluation server
+###################
+
+class FUSED_Server(object):
+
+    # assemblies is a dict of name to a picklable problem factory, e.g. a module level function returning a set up problem
+    # address is the path of a Unix socket or a (host, port) tuple, port 0 picks a free port
+    # Requests are split into chunks of chunk_size cases, at most max_pending chunks are queued on the workers and
+    # requests wait for a free slot up to timeout seconds before they are refused as busy
+    def __init__(self, assemblies, address, processes=None, chunk_size=16, max_pending=64, timeout=None):
+
+        super(FUSED_Server,self).__init__()
+
+        self.assemblies = dict(assemblies)
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'cases': 0, 'busy': 0}
+
+        # With no processes the problems are evaluated on one thread of the server process
+        if processes == 0:
+            self.pool = multiprocessing.pool.ThreadPool(1, _init_server_worker, (self.assemblies,))
+        else:
+            self.pool = multiprocessing.Pool(processes, _init_server_worker, (self.assemblies,))
+
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = _UnixServer(address, _Handler)
+        else:
+            self.server = _TCPServer(address, _Handler)
+        self.server.fused = self
+        self.address = self.server.server_address
+        self.thread = None
+        self.serving = False
+        self.closed = False
+
+    def dispatch(self, request):
+
+        op = request.get('op')
+        if op == 'evaluate':
+            return self.evaluate(request['assembly'], request['cases'], request['outputs'])
+        elif op == 'assemblies':
+            return {'assemblies': sorted(self.assemblies.keys())}
+        elif op == 'stats':
+            with self.lock:
+                return {'stats': dict(self.counts)}
+        elif op == 'shutdown':
+            # Closed from another thread, the server waits for the handler of this request to reply
+            threading.Thread(target=self.close).start()
+            return {}
+        raise Exception('Unknown request '+str(op))
+
+    # Evaluate a table of cases on the warm problems of an assembly, the reply holds the values and errors as in FUSED_DOE
+    def evaluate(self, assembly, cases, outputs):
+
+        # The request is checked before it is dispatched, the workers check the cases against the declarations
+        if assembly not in self.assemblies:
+            raise Exception('The assembly '+str(assembly)+' is not registered')
+        if not isinstance(cases, dict) or not all(isinstance(name, str) for name in outputs):
+            raise Exception('A request holds a dict of cases and a list of output names')
+        n = check_table(cases)
+
+        workers = list(getattr(self.pool, '_pool', []))
+        results = []
+        busy = False
+        for start in range(0, n, self.chunk_size):
+            if not self._acquire():
+                busy = True
+                break
+            chunk = dict((k, np.asarray(v)[start:start+self.chunk_size]) for k, v in cases.items())
+            slot = _Slot(self.pending)
+            results.append((slot, self.pool.apply_async(_evaluate_chunk, ((assembly, start, chunk, outputs),),
+                                                        callback=slot.release, error_callback=slot.release)))
+
+        # Chunks that were queued complete and free their slot before the reply, also for a refused request
+        # A chunk lost with a worker that died never completes, the request fails and frees the slots still held
+        values = dict((name, []) for name in outputs)
+        errors = {}
+        try:
+            for slot, result in results:
+                start, chunk_values, chunk_errors = self._wait(result, workers)
+                for name in outputs:
+                    values[name].append(chunk_values[name])
+                for i, e in chunk_errors.items():
+                    errors[start + i] = e
+        finally:
+            for slot, result in results:
+                if not result.ready():
+                    slot.release()
+        if busy:
+            with self.lock:
+                self.counts['busy'] += 1
+            return {'error': 'busy'}
+
+        for name in outputs:
+            values[name] = np.concatenate(values[name]) if len(values[name]) > 0 else np.zeros(0)
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts['cases'] += n
+
+        return {'values': values, 'errors': errors}
+
+    def _acquire(self):
+
+        if self.timeout is None:
+            return self.pending.acquire()
+
+        return self.pending.acquire(True, self.timeout)
+
+    # Result of a chunk, checking every second that the workers of the pool at the start of the request are alive
+    def _wait(self, result, workers):
+
+        while True:
+            try:
+                return result.get(1.0)
+            except multiprocessing.TimeoutError:
+                check_workers(workers)
+
+    def serve_forever(self):
+
+        self.serving = True
+        self.server.serve_forever()
+
+    # Serve from a background thread
+    def start(self):
+
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        return self
+
+    # Stop serving and terminate the workers, closing again does nothing
+    def close(self):
+
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self.serving:
+            self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.pool.terminate()
+        self.pool.join()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+# Client keeping one connection to a server
+class FUSED_Client(object):
+
+    def __init__(self, address):
+
+        super(FUSED_Client,self).__init__()
+
+        self.address = address
+        self.sock = _connect(address)
+
+    def request(self, message):
+
+        send_message(self.sock, message)
+        reply = recv_message(self.sock)
+        if reply is None:
+            raise Exception('The server closed the connection')
+        if 'error' in reply:
+            raise Exception('The server failed the request: '+reply['error'])
+
+        return reply
+
+    # Values and errors of every case, as returned by FUSED_DOE.run
+    def evaluate(self, assembly, cases, outputs):
+
+        reply = self.request({'op': 'evaluate', 'assembly': assembly, 'cases': cases, 'outputs': list(outputs)})
+
+        return reply['values'], reply['errors']
+
+    def assemblies(self):
+
+        return self.request({'op': 'assemblies'})['assemblies']
+
+    def stats(self):
+
+        return self.request({'op': 'stats'})['stats']
+
+    def shutdown(self):
+
+        self.request({'op': 'shutdown'})
+
+    def close(self):
+
+        self.sock.close()
+
+# Problem factory from 'package.module:function'
+def load_factory(path):
+
+    module, function = path.split(':')
+
+    return getattr(importlib.import_module(module), function)
+
+# Run a server from the command line, e.g.
+# python -m fusedwind.fused_server --unix /tmp/fused.sock lcoe=fusedwind.examples.fused_om_csm_examples:lcoe_dataflow
+def main(args=None):
+
+    parser = argparse.ArgumentParser(description='Serve evaluations of warm FUSED problems')
+    parser.add_argument('assemblies', nargs='+', help='name=package.module:function returning a set up problem')
+    parser.add_argument('--unix', help='path of the Unix socket')
+    parser.add_argument('--port', type=int, default=0, help='localhost TCP port')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=16)
+    parser.add_argument('--max-pending', type=int, default=64)
+    parser.add_argument('--timeout', type=float, default=None)
+    options = parser.parse_args(args)
+
+    assemblies = {}
+    for spec in options.assemblies:
+        name, path = spec.split('=')
+        assemblies[name] = load_factory(path)
+    address = options.unix if options.unix is not None else ('127.0.0.1', options.port)
+
+    server = FUSED_Server(assemblies, address, options.processes, options.chunk_size, options.max_pending, options.timeout)
+    print('Serving ' + ', '.join(sorted(assemblies.keys())) + ' on ' + str(server.address))
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
+
+if __name__=="__main__":
+
+    main()
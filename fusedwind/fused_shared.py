@@ -0,0 +1,140 @@
+# Place large inputs shared by every case in named shared memory, worker processes read them without copies
+
+import weakref
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from fusedwind.fused_dataflow import FUSED_Dataflow
+
+def _require_shared_memory():
+
+    if shared_memory is None:
+        raise Exception('Shared inputs require multiprocessing.shared_memory, which is available from Python 3.8')
+
+# Close and remove segments, a segment already removed is skipped
+# A view still exported in this process keeps its mapping open, the name is removed anyway
+def _release(segments):
+
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+        try:
+            shm.unlink()
+        except OSError:
+            pass
+    del segments[:]
+
+# Read-only array over the memory of a segment
+def shared_view(shm, shape, dtype):
+
+    view = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    view.flags.writeable = False
+
+    return view
+
+# Open a segment created by another process, the creating process alone is responsible for removing it
+def attach_segment(name):
+
+    _require_shared_memory()
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+# Read-only views of the arrays of a handle and the segments they map, which must stay referenced while the views are used
+def attach_arrays(handle):
+
+    views = {}
+    segments = []
+    for name, (segment, shape, dtype) in handle.items():
+        shm = attach_segment(segment)
+        segments.append(shm)
+        views[name] = shared_view(shm, shape, dtype)
+
+    return views, segments
+
+# Read-only views of arrays of this process, for runs that do not go through shared memory
+def read_only(arrays):
+
+    views = {}
+    for name, val in arrays.items():
+        views[name] = np.asarray(val).view()
+        views[name].flags.writeable = False
+
+    return views
+
+# Feed inputs of a set up problem from the views, a dataflow reads them in place and an OpenMDAO problem copies them once
+def share_inputs(problem, views):
+
+    if isinstance(problem, FUSED_Dataflow):
+        problem.share(views)
+    else:
+        for k, v in views.items():
+            problem[k] = v
+
+# Shared arrays
+###############
+
+class FUSED_SharedArrays(object):
+
+    # Each array is copied once into a segment of its own, handle() describes the segments in a few bytes so that
+    # workers attach to them instead of receiving the arrays. The segments are removed by close(), when the object
+    # is collected or at exit. If this process is killed, the resource tracker of multiprocessing removes them
+    def __init__(self, arrays):
+
+        super(FUSED_SharedArrays,self).__init__()
+
+        _require_shared_memory()
+        self.layout = {}
+        self.segments = []
+        self._finalizer = weakref.finalize(self, _release, self.segments)
+        try:
+            for name in sorted(arrays.keys()):
+                val = np.ascontiguousarray(arrays[name])
+                if val.dtype.hasobject:
+                    raise Exception('The shared array '+name+' holds python objects')
+                shm = shared_memory.SharedMemory(create=True, size=max(val.nbytes, 1))
+                self.segments.append(shm)
+                np.ndarray(val.shape, dtype=val.dtype, buffer=shm.buf)[...] = val
+                self.layout[name] = (shm.name, val.shape, val.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    # Names, shapes and dtypes of the segments, small enough to send with every task
+    def handle(self):
+
+        return dict(self.layout)
+
+    # Read-only views in this process
+    def views(self):
+
+        views = {}
+        for name, shm in zip(sorted(self.layout.keys()), self.segments):
+            segment, shape, dtype = self.layout[name]
+            views[name] = shared_view(shm, shape, dtype)
+
+        return views
+
+    def nbytes(self):
+
+        return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for segment, shape, dtype in self.layout.values())
+
+    def close(self):
+
+        self._finalizer()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
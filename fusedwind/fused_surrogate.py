@@ -0,0 +1,321 @@
+# Fast regression models standing in for expensive FUSED objects, using NumPy only
+
+import multiprocessing
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object, batch_size, broadcast_batch, build_layout
+from fusedwind.fused_partials import pack_values, evaluate_rows
+from fusedwind.fused_sampling import latin_hypercube
+
+# The following are helper functions to sample a model over the bounds of its inputs
+#####################################################################################
+
+# Bounds of the inputs as name -> (lower, upper), from the 'lower' and 'upper' keys of the interface unless given
+def input_bounds(inner_dict, bounds=None):
+
+    found = {}
+    for k, v in inner_dict.items():
+        if 'lower' in v.keys() and 'upper' in v.keys():
+            found[k] = (v['lower'], v['upper'])
+    if bounds is not None:
+        for k, v in bounds.items():
+            if k not in inner_dict:
+                raise Exception('The input '+k+' with bounds is not in the interface')
+            found[k] = tuple(v)
+
+    return found
+
+def _evaluate_chunk(task):
+
+    model, X, input_layout, output_layout = task
+
+    return evaluate_rows(model, X, input_layout, output_layout)
+
+# Outputs of the model at the rows of X, split into chunks evaluated on a pool of processes unless processes is 0
+def sample_model(model, X, input_layout, output_layout, processes=None, chunk_size=16):
+
+    if processes == 0:
+        return evaluate_rows(model, X, input_layout, output_layout)
+
+    tasks = [(model, X[i:i+chunk_size], input_layout, output_layout) for i in range(0, X.shape[0], chunk_size)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        return np.concatenate(pool.map(_evaluate_chunk, tasks))
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Regression models on inputs scaled to the unit cube and outputs scaled to unit variance
+###########################################################################################
+
+class FUSED_RBF(object):
+
+    # kernel is 'gaussian' or 'multiquadric', epsilon defaults to the inverse of the mean distance between samples
+    def __init__(self, kernel='gaussian', epsilon=None, regularization=1e-10):
+
+        super(FUSED_RBF,self).__init__()
+
+        self.kernel = kernel
+        self.epsilon = epsilon
+        self.regularization = regularization
+
+    def basis(self, r):
+
+        if self.kernel == 'gaussian':
+            return np.exp(-(self.eps * r) ** 2)
+        elif self.kernel == 'multiquadric':
+            return np.sqrt(1.0 + (self.eps * r) ** 2)
+        raise Exception('Unknown kernel '+str(self.kernel))
+
+    def fit(self, X, Y):
+
+        self.X = X
+        r = _distances(X, X)
+        self.eps = self.epsilon if self.epsilon is not None else 1.0 / max(r.mean(), 1e-12)
+        A = self.basis(r) + self.regularization * np.eye(len(X))
+        A_inv = np.linalg.inv(A)
+        self.weights = A_inv.dot(Y)
+
+        # Leave one out residuals of every sample in closed form
+        self.loo = self.weights / np.diag(A_inv)[:, None]
+
+        return self
+
+    # Predictions and an error estimate per point, the RBF error is the leave one out RMS of each output
+    def predict(self, X):
+
+        Y = self.basis(_distances(X, self.X)).dot(self.weights)
+        error = np.tile(np.sqrt(np.mean(self.loo ** 2, axis=0)), (len(X), 1))
+
+        return Y, error
+
+class FUSED_Kriging(object):
+
+    # Ordinary Kriging with a Gaussian correlation, the width theta of each output is chosen from thetas by maximum likelihood
+    def __init__(self, thetas=None, nugget=1e-10):
+
+        super(FUSED_Kriging,self).__init__()
+
+        if thetas is None:
+            thetas = np.logspace(-1, 3, 25)
+        self.thetas = thetas
+        self.nugget = nugget
+
+    def fit(self, X, Y):
+
+        self.X = X
+        n = len(X)
+        best = np.full(Y.shape[1], -np.inf)
+        choice = np.full(Y.shape[1], -1)
+        factors = {}
+        for i, theta in enumerate(self.thetas):
+            try:
+                L = np.linalg.cholesky(np.exp(-theta * _distances(X, X) ** 2) + self.nugget * np.eye(n))
+            except np.linalg.LinAlgError:
+                continue
+            ones = _cho_solve(L, np.ones(n))
+            beta = ones.dot(Y) / ones.sum()
+            sigma2 = np.maximum(np.sum((Y - beta) * _cho_solve(L, Y - beta), axis=0) / n, 1e-300)
+            likelihood = -0.5 * n * np.log(sigma2) - np.sum(np.log(np.diag(L)))
+            better = likelihood > best
+            best[better] = likelihood[better]
+            choice[better] = i
+            factors[i] = L
+        if len(factors) == 0:
+            raise Exception('The Kriging correlation matrix is singular for every theta')
+
+        # One model per chosen theta, holding the outputs that share it
+        self.models = []
+        self.loo = np.zeros_like(Y)
+        for i in np.unique(choice):
+            columns = np.flatnonzero(choice == i)
+            L = factors[i]
+            ones = _cho_solve(L, np.ones(n))
+            beta = ones.dot(Y[:, columns]) / ones.sum()
+            alpha = _cho_solve(L, Y[:, columns] - beta)
+            sigma2 = np.maximum(np.sum((Y[:, columns] - beta) * alpha, axis=0) / n, 1e-300)
+            self.models.append((columns, self.thetas[i], L, ones, beta, alpha, sigma2))
+
+            # Leave one out residuals of every sample in closed form, holding theta and the mean
+            self.loo[:, columns] = alpha / np.diag(_cho_solve(L, np.eye(n)))[:, None]
+
+        return self
+
+    # Predictions and the standard deviation of the Kriging estimate per point
+    def predict(self, X):
+
+        Y = np.zeros((len(X), self.loo.shape[1]))
+        error = np.zeros_like(Y)
+        for columns, theta, L, ones, beta, alpha, sigma2 in self.models:
+            r = np.exp(-theta * _distances(X, self.X) ** 2)
+            Y[:, columns] = beta + r.dot(alpha)
+            v = _cho_solve(L, r.T)
+            u = 1.0 - ones.dot(r.T)
+            mse = np.maximum(1.0 - np.sum(r.T * v, axis=0) + u ** 2 / ones.sum(), 0.0)
+            error[:, columns] = np.sqrt(mse[:, None] * sigma2)
+
+        return Y, error
+
+def _distances(A, B):
+
+    d2 = np.sum(A ** 2, axis=1)[:, None] + np.sum(B ** 2, axis=1)[None, :] - 2.0 * A.dot(B.T)
+
+    return np.sqrt(np.maximum(d2, 0.0))
+
+def _cho_solve(L, b):
+
+    return np.linalg.solve(L.T, np.linalg.solve(L, b))
+
+# Drop in replacement of an expensive FUSED object
+##################################################
+
+class FUSED_Surrogate(FUSED_Object):
+
+    vectorized = True
+
+    # Samples the model at n_samples points of a latin hypercube over the bounded inputs, the other inputs are held at
+    # their values in fixed or else at their defaults
+    # method is 'kriging' or 'rbf' or a regression object with fit, predict and its leave one out residuals as loo
+    # Points outside the sampled domain, including points where an input that is not sampled takes another value,
+    # are always computed by the model. Points whose error estimate, relative to the spread of the samples, exceeds
+    # tolerance are computed by the model when fallback or retrain is set, retrain also adds these points to the samples
+    def __init__(self, model, n_samples=50, bounds=None, method='kriging', processes=None, seed=None,
+                 tolerance=None, fallback=False, retrain=False, fixed=None):
+
+        super(FUSED_Surrogate,self).__init__()
+
+        self.model = model
+        self.interface = model.interface
+        if method == 'kriging':
+            method = FUSED_Kriging()
+        elif method == 'rbf':
+            method = FUSED_RBF()
+        self.regression = method
+        self.processes = processes
+        self.tolerance = tolerance
+        self.fallback = fallback
+        self.retrain = retrain
+        self.counts = {'predictions': 0, 'fallbacks': 0, 'retrains': 0}
+
+        self.bounds = input_bounds(self.interface['input'], bounds)
+        if len(self.bounds) == 0:
+            raise Exception('No input of '+type(model).__name__+' has bounds to sample')
+        self.input_layout = build_layout(self.interface['input'])
+        self.output_layout = build_layout(self.interface['output'])
+        if fixed is None:
+            fixed = {}
+        for k in fixed.keys():
+            if k not in self.interface['input']:
+                raise Exception('The fixed input '+k+' is not in the interface')
+            if k in self.bounds:
+                raise Exception('The input '+k+' is both fixed and sampled')
+        self.fixed = dict(fixed)
+        self.default = pack_values(self.interface['input'], self.input_layout, self.fixed)
+
+        # Columns of the flat inputs that are sampled and their bounds, array inputs take bounds per element
+        columns = []
+        lower = []
+        upper = []
+        for k in sorted(self.bounds.keys()):
+            start, stop, shape = self.input_layout[k]
+            columns.extend(range(start, stop))
+            lower.extend(np.broadcast_to(np.asarray(self.bounds[k][0], dtype=float), shape).ravel())
+            upper.extend(np.broadcast_to(np.asarray(self.bounds[k][1], dtype=float), shape).ravel())
+        self.columns = np.array(columns, dtype=int)
+        self.lower = np.array(lower)
+        self.upper = np.array(upper)
+        self.fixed_columns = np.setdiff1d(np.arange(len(self.default)), self.columns)
+
+        unit = latin_hypercube(dict((i, (0.0, 1.0)) for i in range(len(self.columns))), n_samples, seed)
+        U = np.column_stack([unit[i] for i in range(len(self.columns))])
+        X = np.tile(self.default, (n_samples, 1))
+        X[:, self.columns] = self.lower + U * (self.upper - self.lower)
+        self.X = X
+        self.Y = sample_model(model, X, self.input_layout, self.output_layout, processes)
+        self.fit()
+
+    # Fit the regression to the samples and estimate its error by leave one out cross validation
+    def fit(self):
+
+        self.y_mean = self.Y.mean(axis=0)
+        self.y_scale = self.Y.std(axis=0)
+        self.y_scale[self.y_scale == 0.0] = 1.0
+        self.regression.fit(self.scale_inputs(self.X), (self.Y - self.y_mean) / self.y_scale)
+        self.error = self.cross_validate()
+
+    # RMS leave one out error per output relative to the spread of the samples
+    def cross_validate(self):
+
+        rms = np.sqrt(np.mean(self.regression.loo ** 2, axis=0))
+
+        return dict((k, float(rms[start:stop].max())) for k, (start, stop, shape) in self.output_layout.items())
+
+    def scale_inputs(self, X):
+
+        return (X[:, self.columns] - self.lower) / np.where(self.upper > self.lower, self.upper - self.lower, 1.0)
+
+    # Predicted outputs as rows and the relative error estimate of each row, inf outside the sampled domain
+    def predict_rows(self, X):
+
+        Z, error = self.regression.predict(self.scale_inputs(X))
+        Y = self.y_mean + Z * self.y_scale
+        error = error.max(axis=1) if error.shape[1] > 0 else np.zeros(len(X))
+
+        U = self.scale_inputs(X)
+        outside = np.any((U < 0.0) | (U > 1.0), axis=1) | np.any(X[:, self.fixed_columns] != self.default[self.fixed_columns], axis=1)
+        error[outside] = np.inf
+
+        return Y, error
+
+    # Flat rows of a point or a batch of inputs and the number of points, None for a single point
+    def input_rows(self, inputs):
+
+        interface = self.interface
+        try:
+            n = batch_size(interface['input'], inputs)
+        except Exception:
+            n = None
+        batch = broadcast_batch(interface['input'], inputs, 1 if n is None else n)
+        X = np.zeros((1 if n is None else n, len(self.default)))
+        for k, (start, stop, shape) in self.input_layout.items():
+            X[:, start:stop] = np.reshape(batch[k], (len(X), stop - start))
+
+        return X, n
+
+    def compute(self, inputs, outputs):
+
+        X, n = self.input_rows(inputs)
+        Y, error = self.predict_rows(X)
+        self.counts['predictions'] += len(X)
+
+        poor = np.isinf(error)
+        if self.tolerance is not None and (self.fallback or self.retrain):
+            poor |= error > self.tolerance
+        poor = np.flatnonzero(poor)
+        if len(poor) > 0:
+            Y[poor] = evaluate_rows(self.model, X[poor], self.input_layout, self.output_layout)
+            self.counts['fallbacks'] += len(poor)
+            # Only points inside the sampled domain are added, the regression does not see the inputs that are not sampled
+            learn = poor[np.isfinite(error[poor])]
+            if self.retrain and len(learn) > 0:
+                self.X = np.concatenate([self.X, X[learn]])
+                self.Y = np.concatenate([self.Y, Y[learn]])
+                self.fit()
+                self.counts['retrains'] += 1
+
+        for k, (start, stop, shape) in self.output_layout.items():
+            if 'shape' not in self.interface['output'][k].keys():
+                shape = ()
+            value = Y[:, start:stop].reshape((len(X),) + tuple(shape))
+            outputs[k] = value[0] if n is None else value
+
+        return outputs
+
+    # Relative error estimate of the prediction at a point or each point of a batch of inputs
+    def estimate_error(self, inputs):
+
+        X, n = self.input_rows(inputs)
+        error = self.predict_rows(X)[1]
+
+        return error[0] if n is None else error
@@ -0,0 +1,123 @@
+# Build and set up a FUSED problem once and hand out independent instances with the state after setup
+
+import contextlib
+import pickle
+import threading
+
+from fusedwind.fused_dataflow import FUSED_Dataflow
+
+# Copy of the whole state of a set up problem, the state buffer of a dataflow or the vectors of an OpenMDAO problem
+def problem_state(problem):
+
+    if isinstance(problem, FUSED_Dataflow):
+        return problem.snapshot_state()
+
+    from fusedwind.fused_openmdao import FUSED_snapshot
+
+    return FUSED_snapshot(problem)
+
+def restore_problem(problem, state):
+
+    if isinstance(problem, FUSED_Dataflow):
+        problem.restore_state(state)
+        problem.invalidate()
+    else:
+        from fusedwind.fused_openmdao import FUSED_restore
+        FUSED_restore(problem, state)
+
+# Template of a set up problem with a bounded pool of instances
+class FUSED_Template(object):
+
+    # The problem factory returns a set up problem, either a native dataflow or an OpenMDAO problem
+    # Instances are reset by restoring the whole state the prototype had after setup. Problems that can be pickled,
+    # such as dataflows, are copied from a pickled image of the prototype, others are built by the factory.
+    # Taking pooled instances with acquire and release, or problem(), avoids both once the pool is warm
+    def __init__(self, problem_factory, pool_size=4):
+
+        super(FUSED_Template,self).__init__()
+
+        self.problem_factory = problem_factory
+        self.pool_size = pool_size
+        self.prototype = problem_factory()
+        self.initial = problem_state(self.prototype)
+        try:
+            self.image = pickle.dumps(self.prototype, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            self.image = None
+        self.idle = [self.prototype]
+
+        self.created = 1
+        self.lock = threading.Lock()
+        self.available = threading.BoundedSemaphore(pool_size)
+
+    # A new independent copy of the prototype with the state after setup, it does not count against the pool
+    def clone(self):
+
+        if self.image is None:
+            raise Exception('Problems of type '+type(self.prototype).__name__+' cannot be copied, '
+                            'take pooled instances with acquire and release')
+
+        return pickle.loads(self.image)
+
+    # A new instance for the pool, copied from the prototype or built by the factory when it cannot be copied
+    def _create(self):
+
+        if self.image is not None:
+            return self.clone()
+        problem = self.problem_factory()
+        self.reset(problem)
+
+        return problem
+
+    # Return the problem to the state after setup, inputs and outputs alike
+    def reset(self, problem):
+
+        restore_problem(problem, self.initial)
+
+    # Take an instance from the pool, blocks while pool_size instances are in use
+    def acquire(self, timeout=None):
+
+        if timeout is None:
+            acquired = self.available.acquire()
+        else:
+            acquired = self.available.acquire(True, timeout)
+        if not acquired:
+            raise Exception('No problem instance became available within '+str(timeout)+' s')
+
+        with self.lock:
+            if len(self.idle) > 0:
+                return self.idle.pop()
+            self.created += 1
+
+        try:
+            return self._create()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            self.available.release()
+            raise
+
+    # Give an instance back to the pool, it is reset before it is handed out again
+    def release(self, problem):
+
+        try:
+            self.reset(problem)
+            with self.lock:
+                self.idle.append(problem)
+        finally:
+            self.available.release()
+
+    # Use an instance of the pool in a with statement
+    @contextlib.contextmanager
+    def problem(self, timeout=None):
+
+        instance = self.acquire(timeout)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def stats(self):
+
+        with self.lock:
+            return {'created': self.created, 'idle': len(self.idle), 'pool_size': self.pool_size}
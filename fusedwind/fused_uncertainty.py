@@ -0,0 +1,334 @@
+# Propagate uncertain inputs through FUSED problems by Monte Carlo sampling with streaming statistics
+
+import numpy as np
+
+from fusedwind.fused_doe import FUSED_DOE
+from fusedwind.fused_sampling import sobol_sequence, halton_sequence
+
+# The following are distributions of uncertain inputs, ppf maps probabilities in (0, 1) to values
+##################################################################################################
+
+# Inverse of the standard normal distribution by the rational approximation of P. J. Acklam, relative error below 1.2e-9
+_a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+_b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01, -1.328068155288572e+01]
+_c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+_d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00]
+
+def normal_ppf(u):
+
+    u = np.asarray(u, dtype=float)
+    x = np.zeros(u.shape)
+    low = u < 0.02425
+    high = u > 1.0 - 0.02425
+    mid = ~(low | high)
+
+    q = u[mid] - 0.5
+    r = q * q
+    x[mid] = (((((_a[0]*r + _a[1])*r + _a[2])*r + _a[3])*r + _a[4])*r + _a[5]) * q / \
+             (((((_b[0]*r + _b[1])*r + _b[2])*r + _b[3])*r + _b[4])*r + 1.0)
+    with np.errstate(divide='ignore'):
+        for tail, sign, p in [(low, 1.0, u[low]), (high, -1.0, 1.0 - u[high])]:
+            q = np.sqrt(-2.0 * np.log(p))
+            x[tail] = sign * (((((_c[0]*q + _c[1])*q + _c[2])*q + _c[3])*q + _c[4])*q + _c[5]) / \
+                      ((((_d[0]*q + _d[1])*q + _d[2])*q + _d[3])*q + 1.0)
+
+    return x
+
+class FUSED_Uniform(object):
+
+    def __init__(self, lower, upper):
+
+        self.lower = lower
+        self.upper = upper
+
+    def ppf(self, u):
+
+        return self.lower + u * (self.upper - self.lower)
+
+class FUSED_Normal(object):
+
+    def __init__(self, mean, std):
+
+        self.mean = mean
+        self.std = std
+
+    def ppf(self, u):
+
+        return self.mean + self.std * normal_ppf(u)
+
+# Log normal distribution given by the mean and standard deviation of the logarithm of the value
+class FUSED_LogNormal(object):
+
+    def __init__(self, mu, sigma):
+
+        self.mu = mu
+        self.sigma = sigma
+
+    def ppf(self, u):
+
+        return np.exp(self.mu + self.sigma * normal_ppf(u))
+
+class FUSED_Triangular(object):
+
+    def __init__(self, lower, mode, upper):
+
+        self.lower = lower
+        self.mode = mode
+        self.upper = upper
+
+    def ppf(self, u):
+
+        width = self.upper - self.lower
+        split = (self.mode - self.lower) / width
+
+        return np.where(u < split,
+                        self.lower + np.sqrt(u * width * (self.mode - self.lower)),
+                        self.upper - np.sqrt((1.0 - u) * width * (self.upper - self.mode)))
+
+class FUSED_Weibull(object):
+
+    def __init__(self, k, scale):
+
+        self.k = k
+        self.scale = scale
+
+    def ppf(self, u):
+
+        return self.scale * (-np.log1p(-u)) ** (1.0 / self.k)
+
+# Table of n cases of the inputs drawn from their distributions, a dict of name to distribution
+# sampler is 'sobol', 'halton' or 'random', quasi-random points are shifted by a random vector when a seed is given
+# Tables of consecutive ranges of start are parts of one sequence, random points with a seed are drawn per start
+def sample_distributions(distributions, n, sampler='sobol', seed=None, start=1):
+
+    names = sorted(distributions.keys())
+    dim = len(names)
+    rng = np.random.RandomState(seed)
+
+    if sampler == 'sobol':
+        u = sobol_sequence(n, dim, start)
+    elif sampler == 'halton':
+        u = halton_sequence(n, dim, start)
+    elif sampler == 'random':
+        u = np.random.RandomState(None if seed is None else [seed, start]).uniform(size=(n, dim))
+    else:
+        raise Exception('Unknown sampler '+str(sampler)+', use sobol, halton or random')
+    if sampler != 'random' and seed is not None:
+        u = np.mod(u + rng.uniform(size=dim), 1.0)
+
+    # Keep the probabilities away from 0 and 1 where unbounded distributions are infinite
+    u = np.clip(u, 1e-12, 1.0 - 1e-12)
+
+    cases = {}
+    for j, k in enumerate(names):
+        cases[k] = distributions[k].ppf(u[:, j])
+
+    return cases
+
+# Provider of n cases drawn from the distributions on request, FUSED_DOE takes it in place of a case table
+# so that the whole table is never built
+class FUSED_Samples(object):
+
+    def __init__(self, distributions, n, sampler='sobol', seed=None):
+
+        super(FUSED_Samples,self).__init__()
+
+        self.distributions = distributions
+        self.names = sorted(distributions.keys())
+        self.n_rows = n
+        self.sampler = sampler
+        self.seed = seed
+
+    def rows(self, start, stop):
+
+        return sample_distributions(self.distributions, stop - start, self.sampler, self.seed, 1 + start)
+
+# Statistics of a stream of values with bounded memory
+######################################################
+
+# Histogram that doubles the width of its bins whenever a value falls outside its range,
+# quantiles are accurate to the width of a bin
+class FUSED_QuantileSketch(object):
+
+    def __init__(self, bins=4096):
+
+        self.bins = bins
+        self.counts = np.zeros(bins)
+        self.lower = None
+        self.width = None
+        self.n = 0
+
+    def update(self, values):
+
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        low = values.min()
+        high = values.max()
+        if self.lower is None:
+            self.lower = low
+            self.width = max((high - low) / self.bins * (1.0 + 1e-9), abs(low) * 1e-12, 1e-300)
+
+        # Grow the range towards the values outside it, merging pairs of bins
+        while low < self.lower or high >= self.lower + self.width * self.bins:
+            merged = self.counts.reshape(-1, 2).sum(axis=1)
+            zeros = np.zeros(self.bins // 2)
+            if low < self.lower:
+                self.counts = np.concatenate([zeros, merged])
+                self.lower -= self.width * self.bins
+            else:
+                self.counts = np.concatenate([merged, zeros])
+            self.width *= 2.0
+
+        index = np.minimum(((values - self.lower) / self.width).astype(int), self.bins - 1)
+        self.counts += np.bincount(index, minlength=self.bins)
+        self.n += len(values)
+
+    # Value at the cumulative probability p, interpolated within its bin
+    def quantile(self, p):
+
+        if self.n == 0:
+            return np.nan
+        cumulative = np.cumsum(self.counts)
+        target = np.clip(p, 0.0, 1.0) * self.n
+        i = min(int(np.searchsorted(cumulative, target)), self.bins - 1)
+        before = cumulative[i] - self.counts[i]
+        fraction = (target - before) / self.counts[i] if self.counts[i] > 0 else 0.0
+
+        return self.lower + self.width * (i + fraction)
+
+class FUSED_Statistics(object):
+
+    def __init__(self, bins=4096):
+
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = FUSED_QuantileSketch(bins)
+
+    # Merge a batch of values into the running mean and variance by the update of Chan et al., NaN are skipped
+    def update(self, values):
+
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = np.sum((values - mean) ** 2)
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.sketch.update(values)
+
+    def variance(self):
+
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def std(self):
+
+        return np.sqrt(self.variance())
+
+    def quantile(self, p):
+
+        return self.sketch.quantile(p)
+
+    # Half width of the confidence interval of the mean for the normal quantile z
+    def mean_interval(self, z=1.959963984540054):
+
+        return z * np.sqrt(self.variance() / self.n) if self.n > 1 else np.inf
+
+    # Half width of the distribution free confidence interval of the quantile p from the binomial ranks around it
+    def quantile_interval(self, p, z=1.959963984540054):
+
+        if self.n < 2:
+            return np.inf
+        spread = z * np.sqrt(p * (1.0 - p) / self.n)
+
+        return 0.5 * (self.quantile(min(p + spread, 1.0)) - self.quantile(max(p - spread, 0.0)))
+
+# Monte Carlo engine
+####################
+
+class FUSED_MonteCarlo(object):
+
+    # Draws up to max_samples cases of the uncertain inputs and evaluates them batch_size at a time as in FUSED_DOE,
+    # on a pool of processes from a problem factory or in this process by compute_batch for a FUSED object
+    # The inputs in shared are the same for every case and are placed once in shared memory
+    # Sampling stops early once the confidence intervals of the mean and the quantiles of every output are within
+    # rtol of their value, the intervals assume independent samples and are conservative for quasi-random sequences
+    def __init__(self, problem_factory, distributions, outputs, sampler='sobol', batch_size=1024, max_samples=2**20,
+                 quantiles=(0.5, 0.9), rtol=None, confidence=0.95, seed=None, processes=None, bins=4096, shared=None):
+
+        super(FUSED_MonteCarlo,self).__init__()
+
+        self.problem_factory = problem_factory
+        self.distributions = distributions
+        self.outputs = list(outputs)
+        self.sampler = sampler
+        self.batch_size = batch_size
+        self.max_samples = max_samples
+        self.quantiles = list(quantiles)
+        self.rtol = rtol
+        self.z = normal_ppf(0.5 + 0.5 * confidence)
+        self.seed = seed
+        self.processes = processes
+        self.bins = bins
+        self.shared = shared
+
+    def converged(self):
+
+        if self.rtol is None:
+            return False
+        for name in self.outputs:
+            stats = self.statistics[name]
+            if stats.n < 2 * self.batch_size:
+                return False
+            if stats.mean_interval(self.z) > self.rtol * abs(stats.mean):
+                return False
+            for p in self.quantiles:
+                if stats.quantile_interval(p, self.z) > self.rtol * abs(stats.quantile(p)):
+                    return False
+
+        return True
+
+    def run(self):
+
+        samples = FUSED_Samples(self.distributions, self.max_samples, self.sampler, self.seed)
+        doe = FUSED_DOE(self.problem_factory, samples, self.outputs, self.processes, self.batch_size, self.shared)
+
+        self.statistics = dict((name, FUSED_Statistics(self.bins)) for name in self.outputs)
+        self.errors = {}
+        self.samples = 0
+        chunks = doe.chunks()
+        try:
+            for start, values, errors in chunks:
+                for name in self.outputs:
+                    self.statistics[name].update(values[name])
+                self.errors.update(errors)
+                self.samples = min(start + self.batch_size, doe.n)
+                if self.converged():
+                    break
+        finally:
+            chunks.close()
+
+        return self.summary()
+
+    # Number of cases run and whether they converged, with the mean, standard deviation, quantiles and the half widths
+    # of their confidence intervals per output
+    def summary(self):
+
+        summary = {'samples': self.samples, 'converged': self.converged(), 'failures': len(self.errors), 'outputs': {}}
+        for name, stats in self.statistics.items():
+            summary['outputs'][name] = {'n': stats.n, 'mean': stats.mean, 'std': stats.std(), 'min': stats.min, 'max': stats.max,
+                                        'mean_interval': stats.mean_interval(self.z),
+                                        'quantiles': dict((p, stats.quantile(p)) for p in self.quantiles),
+                                        'quantile_intervals': dict((p, stats.quantile_interval(p, self.z)) for p in self.quantiles)}
+
+        return summary
@@ -0,0 +1,284 @@
+# Check the values of FUSED interfaces against their declarations, compiled once and applied to whole batches
+
+import numpy as np
+
+from fusedwind.fused_wind import batch_shape
+
+# Declared types of numeric variables and the dtype their values are coerced to
+_dtypes = {float: np.float64, int: np.int64, bool: np.bool_}
+
+def _kind(variable):
+
+    return variable['type'] if 'type' in variable.keys() else float
+
+def _type_name(t):
+
+    return getattr(t, '__name__', str(t))
+
+# Declared shape of a variable, () for scalars and None while it holds a symbolic size
+def declared_shape(variable):
+
+    if 'shape' not in variable.keys():
+        return ()
+    shape = tuple(variable['shape'])
+    for sz in shape:
+        if type(sz) is not int:
+            return None
+
+    return shape
+
+# Default value of a variable checked against its type and shape, as a float or an array of zeros for OpenMDAO
+def default_value(name, variable):
+
+    shape = declared_shape(variable)
+    if shape is None:
+        for sz in variable['shape']:
+            if type(sz) is not int:
+                raise Exception('The size '+sz['name']+' of '+name+' must be specified when implementing the interface')
+    if shape != ():
+        return np.zeros(shape, dtype=float)
+
+    val = np.asarray(variable['val'] if 'val' in variable.keys() else 0.0)
+    if val.size != 1 or val.dtype.kind not in 'biuf':
+        raise Exception('The scalar '+name+' has the default value '+repr(variable['val']))
+    val = float(val.reshape(-1)[0])
+    kind = _kind(variable)
+    if kind is int and val != np.round(val):
+        raise Exception('The default value '+str(val)+' of '+name+' is not an int')
+    if kind is bool and val not in (0.0, 1.0):
+        raise Exception('The default value '+str(val)+' of '+name+' is not a bool')
+
+    return val
+
+# Names of the variables of inner_dict of a type and size that can be validated
+def checkable(inner_dict, names):
+
+    return [k for k in names if k in inner_dict and _kind(inner_dict[k]) in _dtypes and declared_shape(inner_dict[k]) is not None]
+
+# Validator of one interface
+############################
+
+class FUSED_Validator(object):
+
+    # The numeric variables of inner_dict are laid out as the columns of one row per point, so whole batches are checked
+    # with a few array operations. Bounds come from the 'lower' and 'upper' keys, int and bool values must be integral
+    def __init__(self, inner_dict, names=None):
+
+        super(FUSED_Validator,self).__init__()
+
+        if names is None:
+            names = sorted(inner_dict.keys())
+        self.names = []
+        self.strings = []
+        self.shapes = {}
+        self.types = {}
+        self.layout = {}
+        lower = []
+        upper = []
+        integral = []
+        columns = []
+        for k in names:
+            variable = inner_dict[k]
+            kind = _kind(variable)
+            if kind is str:
+                self.strings.append(k)
+                continue
+            if kind not in _dtypes:
+                raise Exception('The variable '+k+' has the type '+_type_name(kind)+', only float, int, bool and str can be validated')
+            shape = declared_shape(variable)
+            if shape is None:
+                raise Exception('The size of '+k+' must be specified before its interface is validated')
+            size = int(np.prod(shape))
+            self.names.append(k)
+            self.shapes[k] = shape
+            self.types[k] = kind
+            self.layout[k] = (len(columns), len(columns) + size)
+            columns.extend([k] * size)
+            lower.append(np.broadcast_to(np.asarray(variable['lower'] if 'lower' in variable.keys() else -np.inf, dtype=float), shape).ravel())
+            upper.append(np.broadcast_to(np.asarray(variable['upper'] if 'upper' in variable.keys() else np.inf, dtype=float), shape).ravel())
+            integral.append(np.full(size, kind is not float))
+        self.width = len(columns)
+        self.columns = np.array(columns, dtype=object)
+        self.lower = np.concatenate(lower) if self.width > 0 else np.zeros(0)
+        self.upper = np.concatenate(upper) if self.width > 0 else np.zeros(0)
+        self.integral = np.flatnonzero(np.concatenate(integral)) if self.width > 0 else np.zeros(0, dtype=int)
+        self.booleans = np.array([j for j, k in enumerate(columns) if self.types[k] is bool], dtype=int)
+        self.bounded = np.flatnonzero(np.isfinite(self.lower) | np.isfinite(self.upper))
+
+    # Values of n points as rows, each value holds a leading dimension of n points or is shared by all of them
+    def rows(self, values, n):
+
+        X = np.zeros((n, self.width))
+        for k in self.names:
+            if k not in values:
+                raise Exception('The variable '+k+' is missing')
+            start, stop = self.layout[k]
+            val = np.asarray(values[k])
+            if val.dtype.kind not in 'biuf':
+                raise Exception('The variable '+k+' of type '+_type_name(self.types[k])+' has values of type '+str(val.dtype))
+            shape = self.shapes[k]
+            if val.shape == batch_shape({'shape': shape}, n) or (shape == () and val.shape == (n, 1)):
+                X[:, start:stop] = val.reshape(n, stop - start)
+            elif val.shape == shape or (shape == () and val.shape == (1,)):
+                X[:, start:stop] = val.reshape(1, stop - start)
+            else:
+                raise Exception('The variable '+k+' of shape '+str(shape)+' has values of shape '+str(val.shape)+' for '+str(n)+' points')
+
+        return X
+
+    # Entries of the rows that break their bounds or are not integral
+    def invalid(self, X):
+
+        bad = np.zeros(X.shape, dtype=bool)
+        if len(self.bounded) > 0:
+            B = X[:, self.bounded]
+            bad[:, self.bounded] = (B < self.lower[self.bounded]) | (B > self.upper[self.bounded])
+        if len(self.integral) > 0:
+            I = X[:, self.integral]
+            bad[:, self.integral] |= I != np.round(I)
+        if len(self.booleans) > 0:
+            bad[:, self.booleans] |= (X[:, self.booleans] != 0.0) & (X[:, self.booleans] != 1.0)
+
+        return bad
+
+    # Message for an entry of the rows, the point is left out where the caller keys messages by point
+    def _message(self, X, i, j, point=True):
+
+        k = self.columns[j]
+        value = X[i, j]
+        if self.types[k] is bool and value not in (0.0, 1.0):
+            reason = 'is not a bool'
+        elif self.types[k] is int and value != np.round(value):
+            reason = 'is not an int'
+        else:
+            reason = 'is outside the bounds ['+str(self.lower[j])+', '+str(self.upper[j])+']'
+
+        return 'The value '+str(value)+' of '+k+(' at point '+str(i) if point else '')+' '+reason
+
+    # Messages for the columns of the rows that break their bounds or are not integral, at most limit of them
+    def check_rows(self, X, limit=10):
+
+        bad = self.invalid(X)
+        if not bad.any():
+            return []
+
+        messages = []
+        for i, j in zip(*np.nonzero(bad)):
+            messages.append(self._message(X, i, j))
+            if len(messages) == limit:
+                break
+
+        return messages
+
+    # Message per point of a batch that does not match the declarations, for runs that skip those points
+    # Values that cannot be read as rows at all fail every point with the same message
+    def point_errors(self, values, n):
+
+        try:
+            X = self.rows(values, n)
+        except Exception as e:
+            return dict((i, str(e)) for i in range(n))
+        bad = self.invalid(X)
+
+        errors = {}
+        for i in np.flatnonzero(bad.any(axis=1)):
+            errors[int(i)] = self._message(X, i, np.flatnonzero(bad[i])[0], False)
+
+        return errors
+
+    # Raise on values that do not match the declarations, n defaults to the points of a batch or 1
+    def validate(self, values, n=None):
+
+        if n is None:
+            n = self.batch_size(values)
+        for k in self.strings:
+            if k in values and not isinstance(values[k], str):
+                raise Exception('The variable '+k+' of type str has the value '+repr(values[k]))
+        messages = self.check_rows(self.rows(values, n))
+        if len(messages) > 0:
+            raise Exception('\n'.join(messages))
+
+        return n
+
+    # Values of the declared type and shape with a leading dimension of n points, after validating them
+    def coerce(self, values, n=None):
+
+        n = self.validate(values, n)
+        coerced = {}
+        for k in self.names:
+            val = np.asarray(values[k])
+            shape = batch_shape({'shape': self.shapes[k]}, n)
+            if val.size == np.prod(shape):
+                val = val.reshape(shape)
+            else:
+                val = np.broadcast_to(val.reshape(self.shapes[k]), shape)
+            coerced[k] = val.astype(_dtypes[self.types[k]])
+        for k in self.strings:
+            if k in values:
+                coerced[k] = values[k]
+
+        return coerced
+
+    def batch_size(self, values):
+
+        sizes = set()
+        for k in self.names:
+            if k in values:
+                val = np.asarray(values[k])
+                if val.ndim > len(self.shapes[k]) and not (self.shapes[k] == () and val.shape == (1,)):
+                    sizes.add(val.shape[0])
+        if len(sizes) > 1:
+            raise Exception('The values have different numbers of points '+str(sorted(sizes)))
+
+        return sizes.pop() if len(sizes) > 0 else 1
+
+# Check that a table of cases, e.g. of a sweep or a request to a server, maps names to numeric arrays of the same
+# number of cases and return that number. Values are checked against declarations where the problem is known
+def check_table(cases):
+
+    counts = set()
+    for k, v in cases.items():
+        if not isinstance(k, str):
+            raise Exception('The input '+repr(k)+' of the cases is not named by a string')
+        val = np.asarray(v)
+        if val.dtype.kind not in 'biuf':
+            raise Exception('The input '+k+' of the cases has values of type '+str(val.dtype))
+        if val.ndim == 0:
+            raise Exception('The input '+k+' of the cases has a single value instead of one per case')
+        counts.add(len(val))
+    if len(counts) != 1:
+        raise Exception('All inputs of a case table must have the same number of cases')
+
+    return counts.pop()
+
+# Assembly checks
+#################
+
+# Check that the declarations of each variable agree between the components that produce and consume it
+# declarations maps a variable to a list of (component, variable, is_output), a float input may take an int output
+def check_declarations(declarations):
+
+    messages = []
+    for name in sorted(declarations.keys()):
+        entries = declarations[name]
+        outputs = [e for e in entries if e[2]]
+        inputs = [e for e in entries if not e[2]]
+        reference = outputs[0] if len(outputs) > 0 else inputs[0] if len(inputs) > 0 else None
+        if reference is None:
+            continue
+        ref_kind = _kind(reference[1])
+        ref_shape = declared_shape(reference[1])
+        for component, variable, is_output in entries:
+            if component == reference[0] and is_output == reference[2]:
+                continue
+            kind = _kind(variable)
+            shape = declared_shape(variable)
+            widening = len(outputs) > 0 and ref_kind is int and kind is float
+            if kind is not ref_kind and not widening:
+                messages.append(name+' is '+_type_name(ref_kind)+' in '+reference[0]+' but '+_type_name(kind)+' in '+component)
+            if shape is not None and ref_shape is not None and shape != ref_shape and \
+               not (shape in [(), (1,)] and ref_shape in [(), (1,)]):
+                messages.append(name+' has the shape '+str(ref_shape)+' in '+reference[0]+' but '+str(shape)+' in '+component)
+
+    if len(messages) > 0:
+        raise Exception('Inconsistent declarations of connected variables:\n'+'\n'.join(messages))
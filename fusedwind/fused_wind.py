@@ -1,16 +1,199 @@
 import numpy as np
 import copy
+import hashlib
+import weakref
+
+# The following are the records holding the variables of an interface
+######################################################################
+
+# Metadata of a variable, shared between all variables with an identical declaration
+class _Metadata(dict):
+
+    __slots__ = ('__weakref__',)
+
+_shared_metadata = weakref.WeakValueDictionary()
+
+_plain_types = (float, int, bool, str, type, type(None))
+
+# Hashable key of a declaration, or None if it holds values that cannot be compared
+def _freeze(val):
+
+    t = type(val)
+    if t in _plain_types:
+        return (t, val)
+    if t is np.ndarray:
+        return (t, val.dtype.str, val.shape, val.tobytes())
+    if t is list or t is tuple:
+        items = tuple(_freeze(x) for x in val)
+        return None if None in items else (t,) + items
+    if isinstance(val, dict):
+        items = tuple((k, _freeze(val[k])) for k in sorted(val.keys()))
+        return None if None in [v for k, v in items] else (dict,) + items
+    try:
+        hash(val)
+    except TypeError:
+        return None
+
+    return (t, val)
+
+# Hashable key of the entries of a declaration, flat declarations of plain values take the short path
+def _declaration_key(declaration):
+
+    key = []
+    for k in sorted(declaration.keys()):
+        v = declaration[k]
+        t = type(v)
+        if t in _plain_types:
+            key.append((k, t, v))
+        else:
+            v = _freeze(v)
+            if v is None:
+                return None
+            key.append((k, v))
+
+    return tuple(key)
+
+# Copy a declaration into immutable shared metadata
+def _share_metadata(declaration):
+
+    key = _declaration_key(declaration)
+    if key is not None:
+        meta = _shared_metadata.get(key)
+        if meta is not None:
+            return meta
+
+    meta = _Metadata()
+    for k, v in declaration.items():
+        if type(v) in _plain_types:
+            meta[k] = v
+        elif isinstance(v, np.ndarray):
+            meta[k] = np.array(v)
+            meta[k].setflags(write=False)
+        elif isinstance(v, list):
+            meta[k] = tuple(copy.deepcopy(v))
+        else:
+            meta[k] = copy.deepcopy(v)
+    if key is not None:
+        _shared_metadata[key] = meta
+
+    return meta
+
+# A variable reads through to its shared metadata and keeps its own copy of entries written to it
+class Variable(object):
+
+    __slots__ = ('_meta', '_own')
+
+    def __init__(self, meta, own=None):
+
+        self._meta = meta
+        self._own = own
+
+    def __getitem__(self, k):
+
+        if self._own is not None and k in self._own:
+            return self._own[k]
+
+        return self._meta[k]
+
+    def __setitem__(self, k, v):
+
+        if self._own is None:
+            self._own = {}
+        self._own[k] = v
+
+    def __contains__(self, k):
+
+        return k in self._meta or (self._own is not None and k in self._own)
+
+    def keys(self):
+
+        if self._own is None:
+            return list(self._meta.keys())
+
+        return list(self._meta.keys()) + [k for k in self._own.keys() if k not in self._meta]
+
+    def items(self):
+
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+
+        return [self[k] for k in self.keys()]
+
+    def get(self, k, default=None):
+
+        return self[k] if k in self else default
+
+    def __iter__(self):
+
+        return iter(self.keys())
+
+    def __len__(self):
+
+        return len(self.keys())
+
+    def __eq__(self, other):
+
+        return dict(self.items()) == dict(other.items())
+
+    def __repr__(self):
+
+        return 'Variable(' + repr(dict(self.items())) + ')'
+
+# Create a variable from a dict or another variable, sharing metadata where possible
+def make_variable(variable):
+
+    if isinstance(variable, Variable):
+        if variable._own is None:
+            return Variable(variable._meta)
+        return Variable(_share_metadata(dict(variable.items())))
+
+    return Variable(_share_metadata(variable))
+
+# The inputs and outputs of a model, indexable as interface['input'] and interface['output']
+class Interface(object):
+
+    __slots__ = ('input', 'output')
+
+    def __init__(self):
+
+        self.input = {}
+        self.output = {}
+
+    def __getitem__(self, k):
+
+        if k == 'input':
+            return self.input
+        if k == 'output':
+            return self.output
+        raise KeyError(k)
+
+    def keys(self):
+
+        return ['output', 'input']
+
+    def items(self):
+
+        return [('output', self.output), ('input', self.input)]
+
+    def __contains__(self, k):
+
+        return k in ('output', 'input')
+
+    def __iter__(self):
+
+        return iter(self.keys())
 
 # The following are helper functions to create a custom interface
 #################################################################
 
 def create_interface():
 
-    return {'output': {}, 'input': {}}
+    return Interface()
 
 def set_variable(inner_dict, variable):
 
-    inner_dict[variable['name']]=copy.deepcopy(variable)
+    inner_dict[variable['name']]=make_variable(variable)
 
 def set_input(fifc, variable):
 
@@ -30,6 +213,197 @@ def extend_interface(base, extension):
 
     return base
 
+# The following are helper functions to evaluate interfaces over a batch of points
+##################################################################################
+
+# Shape of a variable with a leading batch dimension of n points
+def batch_shape(variable, n):
+
+    if 'shape' in variable.keys():
+        return (n,) + tuple(variable['shape'])
+
+    return (n,)
+
+# Array holding the default value of a variable for each of n points
+def batch_value(variable, n, dtype=float):
+
+    val = np.zeros(batch_shape(variable, n), dtype=dtype)
+    if 'val' in variable.keys():
+        val[...] = variable['val']
+
+    return val
+
+# Allocate the default values for all variables of an interface over n points
+def create_batch(inner_dict, n, dtype=float):
+
+    batch = {}
+    for k, v in inner_dict.items():
+        batch[k] = batch_value(v, n, dtype)
+
+    return batch
+
+# Find the number of points in a set of batched values
+def batch_size(inner_dict, values):
+
+    sizes = set()
+    for k, v in inner_dict.items():
+        if k not in values:
+            continue
+        val = np.asarray(values[k])
+        rank = len(v['shape']) if 'shape' in v.keys() else 0
+        if val.ndim > rank:
+            sizes.add(val.shape[0])
+
+    # A single point broadcasts against any batch
+    if len(sizes) > 1:
+        sizes.discard(1)
+    if len(sizes) == 0:
+        raise Exception('None of the inputs have a batch dimension')
+    if len(sizes) > 1:
+        raise Exception('The inputs have different batch sizes '+str(sorted(sizes)))
+
+    return sizes.pop()
+
+# Expand inputs to a full batch, points that are not specified take the interface default
+def broadcast_batch(inner_dict, values, n, dtype=float):
+
+    batch = {}
+    for k, v in inner_dict.items():
+        if k in values:
+            val = np.asarray(values[k], dtype=dtype)
+            if val.shape != batch_shape(v, n):
+                # Values shared by all points are broadcast without a copy
+                val = np.broadcast_to(val, batch_shape(v, n))
+            batch[k] = val
+        else:
+            batch[k] = batch_value(v, n, dtype)
+
+    return batch
+
+# The following are helper functions to back interfaces with one contiguous buffer
+##################################################################################
+
+# Shape of a variable in a buffer, scalars are stored as arrays of one element like in OpenMDAO
+def variable_shape(variable):
+
+    if 'shape' in variable.keys():
+        return tuple(variable['shape'])
+
+    return (1,)
+
+# Offsets of variables in a flat buffer as name -> (start, stop, shape), in the order of names if given
+def build_layout(inner_dict, names=None):
+
+    if names is None:
+        names = sorted(inner_dict.keys())
+
+    layout = {}
+    offset = 0
+    for k in names:
+        shape = variable_shape(inner_dict[k])
+        size = int(np.prod(shape))
+        layout[k] = (offset, offset + size, shape)
+        offset += size
+
+    return layout
+
+# Slices copying the named variables between two layouts, runs that are contiguous in both are merged
+def transfer_plan(src_layout, dst_layout, names=None):
+
+    if names is None:
+        names = [k for k in src_layout.keys() if k in dst_layout]
+
+    plan = []
+    for k in sorted(names, key=lambda k: src_layout[k][0]):
+        s0, s1, shape = src_layout[k]
+        d0, d1, shape = dst_layout[k]
+        if len(plan) > 0 and plan[-1][0].stop == s0 and plan[-1][1].stop == d0:
+            plan[-1] = (slice(plan[-1][0].start, s1), slice(plan[-1][1].start, d1))
+        else:
+            plan.append((slice(s0, s1), slice(d0, d1)))
+
+    return plan
+
+# Named views into one contiguous float64 buffer, reading a variable does not copy it
+class FUSED_Vector(object):
+
+    def __init__(self, layout, data=None):
+
+        super(FUSED_Vector,self).__init__()
+
+        if data is None:
+            data = np.zeros(max([0] + [stop for start, stop, shape in layout.values()]))
+        self.layout = layout
+        self.data = data
+        self._bind()
+
+    def _bind(self):
+
+        self.views = {}
+        for k, (start, stop, shape) in self.layout.items():
+            self.views[k] = self.data[start:stop].reshape(shape)
+
+    def __getitem__(self, k):
+
+        return self.views[k]
+
+    def __setitem__(self, k, v):
+
+        self.views[k][...] = v
+
+    def __contains__(self, k):
+
+        return k in self.views
+
+    def keys(self):
+
+        return self.views.keys()
+
+    def items(self):
+
+        return self.views.items()
+
+    # Copy the variables of another vector following a plan from transfer_plan
+    def transfer(self, src, plan):
+
+        for s, d in plan:
+            self.data[d] = src.data[s]
+
+    def snapshot(self):
+
+        return self.data.copy()
+
+    def restore(self, data):
+
+        self.data[...] = data
+
+    def hash(self):
+
+        return hashlib.sha1(self.data.tobytes()).hexdigest()
+
+    # Views are rebuilt on the copied buffer
+    def __getstate__(self):
+
+        return {'layout': self.layout, 'data': self.data}
+
+    def __setstate__(self, state):
+
+        self.layout = state['layout']
+        self.data = state['data']
+        self._bind()
+
+# Vector over the variables of an interface, holding their default values
+def create_vector(inner_dict, names=None, layout=None, data=None):
+
+    if layout is None:
+        layout = build_layout(inner_dict, names)
+    vector = FUSED_Vector(layout, data)
+    for k in layout.keys():
+        if 'val' in inner_dict[k].keys():
+            vector[k] = inner_dict[k]['val']
+
+    return vector
+
 '''
 # Consider adding to simplify including inputs into FUSED_Objects
 def fusedvar(name,val,desc='',shape=None):
@@ -40,8 +414,40 @@ def fusedvar(name,val,desc='',shape=None):
 # The following are helper functions to help objects implement interfaces
 #########################################################################
 
+# Variable of an interface with the sizes of its arrays applied
+def resolve_variable(variable, sizes):
+
+    var = make_variable(variable)
+    if 'shape' in var.keys():
+        shape = list(var['shape'])
+        for i, sz in enumerate(shape):
+            if type(sz) is not int:
+                my_name = sz['name']
+                if my_name not in sizes.keys():
+                    print('The interface requires that the size '+my_name+' is specified')
+                    raise Exception
+                shape[i]=sizes[my_name]
+        var['shape']=tuple(shape)
+        if 'val' in var.keys():
+            var['val']=np.zeros(var['shape'])
+
+    return var
+
 class FUSED_Object(object):
 
+    # Models whose compute accepts inputs with a leading batch dimension set this to True
+    vectorized = False
+    # Models whose compute works on complex arrays set this to True to allow complex step partials
+    complex_step = False
+
+    # The arguments given to the constructor are kept as the configuration of the model, e.g. to name it in caches
+    def __new__(cls, *args, **kwargs):
+
+        obj = super(FUSED_Object,cls).__new__(cls)
+        obj._config = (args, kwargs)
+
+        return obj
+
     def __init__(self):
 
         super(FUSED_Object,self).__init__()
@@ -51,37 +457,21 @@ class FUSED_Object(object):
 
         for k, v in fifc['input'].items():
 
-            # Apply the sizes of arrays
-            if 'shape' in v.keys():
-                for i, sz in enumerate(v['shape']):
-                    if type(sz) is not int:
-                        my_name = sz['name']
-                        if my_name not in kwargs.keys():
-                            print('The interface requires that the size '+my_name+' is specified')
-                            raise Exception
-                        v['shape'][i]=kwargs[my_name]
-                if 'val' in v.keys():
-                    v['val']=np.zeros(v['shape'])
-
             # Add our parameter
-            self.add_input(**v)
+            set_input(self.interface, resolve_variable(v, kwargs))
 
         for k, v in fifc['output'].items():
 
-            # Apply the sizes of arrays
-            if 'shape' in v.keys():
-                for i, sz in enumerate(v['shape']):
-                    if type(sz) is not int:
-                        my_name = sz['name']
-                        if my_name not in kwargs.keys():
-                            print('The interface requires that the size '+my_name+' is specified')
-                            raise Exception
-                        v['shape'][i]=kwargs[my_name]
-                if 'val' in v.keys():
-                    v['val']=np.zeros(v['shape'])
-
             # add out output
-            self.add_output(**v)
+            set_output(self.interface, resolve_variable(v, kwargs))
+
+    # Back the inputs and the outputs with one contiguous buffer each, compute with model.compute(model.inputs, model.outputs)
+    def allocate_buffers(self):
+
+        self.inputs = create_vector(self.interface['input'])
+        self.outputs = create_vector(self.interface['output'])
+
+        return self.inputs, self.outputs
 
     def add_input(self, **kwargs):
 
@@ -90,3 +480,37 @@ class FUSED_Object(object):
     def add_output(self, **kwargs):
 
         set_output(self.interface, kwargs)
+
+    # Compute n points at once, either in one vectorized call or by looping over the points
+    # The batch is complex when any input is, as for complex step, and float64 otherwise
+    def compute_batch(self, inputs, outputs=None, n=None):
+
+        if n is None:
+            n = batch_size(self.interface['input'], inputs)
+        dtype = complex if any(np.iscomplexobj(v) for v in inputs.values()) else float
+        inputs = broadcast_batch(self.interface['input'], inputs, n, dtype)
+
+        if self.vectorized:
+            if outputs is None:
+                outputs = create_batch(self.interface['output'], n, dtype)
+            self.compute(inputs, outputs)
+            return outputs
+
+        # Scalar fallback for models that cannot vectorize, outputs a point does not set keep their default
+        results = create_batch(self.interface['output'], n, dtype)
+        point_inputs = {}
+        for i in range(n):
+            for k in inputs.keys():
+                point_inputs[k] = inputs[k][i]
+            point_outputs = {}
+            self.compute(point_inputs, point_outputs)
+            for k, v in point_outputs.items():
+                if k in results:
+                    results[k][i] = np.reshape(v, results[k][i].shape)
+
+        if outputs is None:
+            return results
+        for k, v in results.items():
+            outputs[k] = v
+
+        return outputs
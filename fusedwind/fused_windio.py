@@ -0,0 +1,177 @@
+# Load FUSED interfaces from windio YAML files, compiled once and cached in a binary file
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from fusedwind.fused_wind import create_interface, set_input, set_output
+from fusedwind.fused_cache import default_cache_dir
+
+# Types of variables as spelled in the YAML files
+windio_types = {'float': float, 'int': int, 'bool': bool, 'str': str}
+
+# Bumped whenever the compiled form changes, older cache files are recompiled
+_cache_version = 1
+
+# Directory of the windio files shipped with the package
+def windio_path(*names):
+
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'windio', *names)
+
+# Directory of the cache files, see fusedwind.fused_cache.default_cache_dir
+def windio_cache_dir():
+
+    return default_cache_dir('windio')
+
+# The following are helper functions to compile YAML documents into variable declarations
+##########################################################################################
+
+def compile_variable(name, definition):
+
+    variable = dict(definition)
+    variable['name'] = name
+    if variable.get('type') not in windio_types:
+        raise Exception('The variable '+name+' has the unknown type '+str(variable.get('type'))+', use one of '+', '.join(sorted(windio_types.keys())))
+    variable['type'] = windio_types[variable['type']]
+    if 'shape' in variable and isinstance(variable['shape'], list):
+        variable['shape'] = tuple(variable['shape'])
+    if isinstance(variable.get('val'), list):
+        variable['val'] = np.array(variable['val'], dtype=variable['type'])
+
+    return variable
+
+# Declarations of every interface of a document as name -> {'input': [...], 'output': [...]}
+def compile_document(document, source='<string>'):
+
+    if not isinstance(document, dict):
+        raise Exception('The windio file '+source+' does not hold a mapping of interfaces')
+
+    compiled = {}
+    for name, interface in document.items():
+        if not isinstance(interface, dict) or not set(interface.keys()) <= set(['input', 'output']):
+            raise Exception('The interface '+name+' in '+source+' must hold input and output mappings of variables')
+        compiled[name] = {}
+        for io in ['input', 'output']:
+            variables = interface.get(io) or {}
+            compiled[name][io] = [compile_variable(k, v) for k, v in variables.items()]
+
+    return compiled
+
+def parse_yaml(content, source='<string>'):
+
+    try:
+        import yaml
+    except ImportError:
+        raise Exception('PyYAML is required to compile the windio file '+source)
+
+    # The libyaml parser is much faster where PyYAML was built with it
+    return yaml.load(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+def build_interface(declarations):
+
+    fifc = create_interface()
+    for variable in declarations['input']:
+        set_input(fifc, variable)
+    for variable in declarations['output']:
+        set_output(fifc, variable)
+
+    return fifc
+
+# Binary cache
+##############
+
+def _cache_file(path, cache_dir):
+
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest() + '.pkl')
+
+def _read_cache(fname):
+
+    try:
+        with open(fname, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+# The cache is written to a temporary file and renamed, a cache that cannot be written only costs a recompile
+def _write_cache(fname, entry):
+
+    try:
+        if not os.path.isdir(os.path.dirname(fname)):
+            os.makedirs(os.path.dirname(fname))
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(fname))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+        if os.path.exists(fname):
+            os.remove(fname)
+        os.rename(tmp, fname)
+    except (IOError, OSError):
+        pass
+
+# Compiled declarations of a windio file, from the cache when its modification time and size or its content hash match
+# A file touched without changing is recognized by its hash and the cache entry refreshed, without parsing the YAML
+def load_windio(path, cache_dir=None):
+
+    if cache_dir is None:
+        cache_dir = windio_cache_dir()
+    fname = _cache_file(path, cache_dir)
+    stat = os.stat(path)
+    entry = _read_cache(fname)
+    if entry is not None and entry.get('version') == _cache_version and \
+       entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+        return entry['interfaces']
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha1(content).hexdigest()
+    if entry is not None and entry.get('version') == _cache_version and entry['hash'] == digest:
+        interfaces = entry['interfaces']
+    else:
+        interfaces = compile_document(parse_yaml(content, path), path)
+
+    _write_cache(fname, {'version': _cache_version, 'mtime': stat.st_mtime, 'size': stat.st_size,
+                         'hash': digest, 'interfaces': interfaces})
+
+    return interfaces
+
+# Lazy access
+#############
+
+# Interfaces of a windio file, the file is loaded on the first access and each interface is built once
+class FUSED_WindIO(object):
+
+    def __init__(self, path, cache_dir=None):
+
+        super(FUSED_WindIO,self).__init__()
+
+        self.path = path
+        self.cache_dir = cache_dir
+        self.declarations = None
+        self.interfaces = {}
+
+    def load(self):
+
+        if self.declarations is None:
+            self.declarations = load_windio(self.path, self.cache_dir)
+
+        return self.declarations
+
+    def keys(self):
+
+        return list(self.load().keys())
+
+    def __contains__(self, name):
+
+        return name in self.load()
+
+    def __getitem__(self, name):
+
+        if name not in self.interfaces:
+            declarations = self.load()
+            if name not in declarations:
+                raise KeyError('The interface '+name+' is not defined in '+self.path)
+            self.interfaces[name] = build_interface(declarations[name])
+
+        return self.interfaces[name]
@@ -0,0 +1,184 @@
+# Annual energy production of a wind plant at many sites in one vectorized pass
+
+import math
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+
+# Wind speeds of the 161 point power curves of the NREL cost and scaling model, 0 to 40 m/s in steps of 0.25 m/s
+default_wind_curve = np.linspace(0.0, 40.0, 161)
+
+_gamma = np.vectorize(math.gamma, otypes=[float])
+
+# Mean wind speed at hub height from the mean wind speed at 50 m by the power law
+def hub_wind_speed(wind_speed_50m, hub_height, shear_exponent):
+
+    return wind_speed_50m * (hub_height / 50.0) ** shear_exponent
+
+# Scale of the Weibull distribution with shape k and the given mean wind speed
+def weibull_scale(mean_wind_speed, k):
+
+    return mean_wind_speed / _gamma(1.0 + 1.0 / k)
+
+# Energy of one turbine in a year per site, summing the power curve times the Weibull density over the grid
+# as the cost and scaling model does, the sites are processed chunk_size at a time to bound the memory used
+# With x = v / scale the density is k / v * x^k * exp(-x^k), so the power curve divided by the wind speed is
+# weighted once and each point of the grid costs two exponentials computed in place
+def turbine_energy(power_curve, wind_curve, hub_speed, k, chunk_size=4096):
+
+    power_curve = np.asarray(power_curve, dtype=float)
+    wind_curve = np.asarray(wind_curve, dtype=float)
+    hub_speed = np.atleast_1d(np.asarray(hub_speed, dtype=float))
+    k = np.broadcast_to(np.asarray(k, dtype=float), hub_speed.shape)
+    scale = weibull_scale(hub_speed, k)
+    log_scale = np.log(scale)
+    dv = wind_curve[1] - wind_curve[0]
+
+    positive = wind_curve > 0.0
+    log_v = np.log(wind_curve[positive])
+    weights = power_curve[positive] / wind_curve[positive]
+
+    energy = np.zeros(hub_speed.shape)
+    for start in range(0, len(hub_speed), chunk_size):
+        stop = start + chunk_size
+        z = np.subtract.outer(log_scale[start:stop], log_v)
+        z *= -k[start:stop, None]
+        np.exp(z, out=z)
+        np.negative(z, out=z)
+        density = np.exp(z)
+        density *= z
+        energy[start:stop] = -k[start:stop] * density.dot(weights)
+
+    # A wind speed of zero only contributes for k <= 1, where the density does not vanish at zero
+    zero_power = power_curve[~positive].sum()
+    if zero_power != 0.0:
+        with np.errstate(divide='ignore'):
+            energy += zero_power * np.where(k < 1.0, np.inf, np.where(k == 1.0, 1.0 / scale, 0.0))
+
+    return energy * 8760.0 * dv
+
+# Chunks of a wind speed series of samples, or of samples by sites
+# The source is an array or memory mapped array, the path of a .npy file that is memory mapped,
+# or a function returning an iterable of chunks such as a generator reading SCADA or mesoscale files
+def wind_chunks(source, chunk_size=65536):
+
+    if callable(source):
+        for chunk in source():
+            yield np.asarray(chunk, dtype=float)
+        return
+
+    if isinstance(source, str):
+        source = np.load(source, mmap_mode='r')
+    for start in range(0, len(source), chunk_size):
+        yield np.asarray(source[start:start+chunk_size], dtype=float)
+
+# Mean power of a turbine per site over a wind speed series and the number of valid samples, gaps given as NaN are skipped
+# The power curve is interpolated linearly and the wind speeds are scaled to hub height by the factor height_ratio
+def series_power(power_curve, wind_curve, chunks, height_ratio=1.0):
+
+    total = 0.0
+    count = 0
+    for chunk in chunks:
+        valid = ~np.isnan(chunk)
+        power = np.interp(np.where(valid, chunk, 0.0) * height_ratio, wind_curve, power_curve)
+        power[~valid] = 0.0
+        total = total + power.sum(axis=0)
+        count = count + valid.sum(axis=0)
+
+    return total / np.maximum(count, 1), count
+
+### FUSED-wrapper file
+class aep_weibull_fused(FUSED_Object):
+
+    # One turbine type and plant layout evaluated at n_sites sites given by their Weibull wind climate
+    def __init__(self, n_sites=1, n_speeds=161, chunk_size=4096):
+        super(aep_weibull_fused, self).__init__()
+
+        self.chunk_size = chunk_size
+
+        # Turbine and plant
+        self.add_input(**{'name': 'power_curve', 'val' : np.zeros(n_speeds), 'type' : float, 'shape' : (n_speeds,)})
+        wind_curve = default_wind_curve if n_speeds == 161 else np.zeros(n_speeds)
+        self.add_input(**{'name': 'wind_curve', 'val' : wind_curve, 'type' : float, 'shape' : (n_speeds,)})
+        self.add_input(**{'name': 'machine_rating', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'hub_height', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'turbine_number', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'soiling_losses', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'array_losses', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'availability', 'val' : 0.0, 'type' : float})
+
+        # Sites
+        self.add_input(**{'name': 'wind_speed_50m', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+        self.add_input(**{'name': 'weibull_k', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+        self.add_input(**{'name': 'shear_exponent', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+
+        self.add_output(**{'name': 'hub_wind_speed', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+        self.add_output(**{'name': 'gross_aep', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+        self.add_output(**{'name': 'net_aep', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+        self.add_output(**{'name': 'capacity_factor', 'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)})
+
+    def compute(self, inputs, outputs):
+
+        hub_speed = hub_wind_speed(np.asarray(inputs['wind_speed_50m']), inputs['hub_height'], np.asarray(inputs['shear_exponent']))
+        turbine_number = inputs['turbine_number']
+
+        gross_aep = turbine_number * turbine_energy(inputs['power_curve'], inputs['wind_curve'], hub_speed, inputs['weibull_k'], self.chunk_size)
+        net_aep = gross_aep * (1.0 - inputs['soiling_losses']) * (1.0 - inputs['array_losses']) * inputs['availability']
+
+        outputs['hub_wind_speed'] = hub_speed
+        outputs['gross_aep'] = gross_aep
+        outputs['net_aep'] = net_aep
+        outputs['capacity_factor'] = net_aep / (8760.0 * inputs['machine_rating'] * turbine_number)
+
+### FUSED-wrapper file
+class aep_series_fused(FUSED_Object):
+
+    # Energy from a wind speed series measured at measurement_height, read chunk by chunk from source as in wind_chunks
+    # A series of samples gives scalar outputs that feed the cost models, samples by n_sites sites give arrays
+    def __init__(self, source, n_sites=None, n_speeds=161, chunk_size=65536):
+        super(aep_series_fused, self).__init__()
+
+        self.source = source
+        self.chunk_size = chunk_size
+
+        # Turbine and plant
+        self.add_input(**{'name': 'power_curve', 'val' : np.zeros(n_speeds), 'type' : float, 'shape' : (n_speeds,)})
+        wind_curve = default_wind_curve if n_speeds == 161 else np.zeros(n_speeds)
+        self.add_input(**{'name': 'wind_curve', 'val' : wind_curve, 'type' : float, 'shape' : (n_speeds,)})
+        self.add_input(**{'name': 'machine_rating', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'hub_height', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'turbine_number', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'soiling_losses', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'array_losses', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'availability', 'val' : 0.0, 'type' : float})
+
+        # Series
+        self.add_input(**{'name': 'measurement_height', 'val' : 0.0, 'type' : float})
+        self.add_input(**{'name': 'shear_exponent', 'val' : 0.0, 'type' : float})
+
+        if n_sites is None:
+            site = {'val' : 0.0, 'type' : float}
+        else:
+            site = {'val' : np.zeros(n_sites), 'type' : float, 'shape' : (n_sites,)}
+        for name in ['mean_power', 'gross_aep', 'net_aep', 'capacity_factor']:
+            self.add_output(name=name, **site)
+
+    def compute(self, inputs, outputs):
+
+        # Scale to hub height, a series measured at hub height has a measurement_height of zero or equal to hub_height
+        height_ratio = 1.0
+        if inputs['measurement_height'] > 0.0:
+            height_ratio = (inputs['hub_height'] / inputs['measurement_height']) ** inputs['shear_exponent']
+
+        mean_power, count = series_power(inputs['power_curve'], inputs['wind_curve'],
+                                         wind_chunks(self.source, self.chunk_size), height_ratio)
+
+        # The series is annualized by its mean power
+        gross_aep = inputs['turbine_number'] * mean_power * 8760.0
+        net_aep = gross_aep * (1.0 - inputs['soiling_losses']) * (1.0 - inputs['array_losses']) * inputs['availability']
+
+        outputs['mean_power'] = mean_power
+        outputs['gross_aep'] = gross_aep
+        outputs['net_aep'] = net_aep
+        outputs['capacity_factor'] = net_aep / (8760.0 * inputs['machine_rating'] * inputs['turbine_number'])
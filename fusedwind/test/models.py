@@ -0,0 +1,78 @@
+# Small pure Python models shared by the tests
+
+import numpy as np
+
+from fusedwind.fused_wind import FUSED_Object
+
+# Area and power curve of a rotor, the power approaches the rating smoothly. The model is vectorized and works on
+# complex arrays, the rating in W is large enough to show steps that are too small for its magnitude
+class Rotor(FUSED_Object):
+
+    vectorized = True
+    complex_step = True
+
+    def __init__(self, cp=0.45):
+
+        super(Rotor,self).__init__()
+
+        self.cp = cp
+        self.add_input(name='diameter', val=120.0, lower=1.0, upper=300.0)
+        self.add_input(name='speeds', val=np.array([6.0, 9.0, 12.0]), shape=(3,))
+        self.add_input(name='rating', val=5.0e6, lower=1.0e5)
+        self.add_output(name='area', val=0.0)
+        self.add_output(name='power', val=np.zeros(3), shape=(3,))
+
+    def compute(self, inputs, outputs):
+
+        diameter = np.asarray(inputs['diameter'])
+        rating = np.asarray(inputs['rating'])
+        area = 0.25 * np.pi * diameter**2
+        ideal = 0.5 * 1.225 * self.cp * area[..., None] * np.asarray(inputs['speeds'])**3
+        outputs['area'] = area
+        outputs['power'] = rating[..., None] * np.tanh(ideal / rating[..., None])
+
+        return outputs
+
+# Cost of a rotor from its area and power curve
+class Cost(FUSED_Object):
+
+    vectorized = True
+    complex_step = True
+
+    def __init__(self, price=150.0):
+
+        super(Cost,self).__init__()
+
+        self.price = price
+        self.add_input(name='area', val=0.0)
+        self.add_input(name='power', val=np.zeros(3), shape=(3,))
+        self.add_output(name='cost', val=0.0)
+        self.add_output(name='specific_cost', val=0.0)
+
+    def compute(self, inputs, outputs):
+
+        cost = self.price * np.asarray(inputs['area']) + 0.2 * np.sum(np.asarray(inputs['power']), axis=-1)
+        outputs['cost'] = cost
+        outputs['specific_cost'] = cost / np.asarray(inputs['power'])[..., -1]
+
+        return outputs
+
+# Linear model counting its calls, a counter set while running must not change how the model is named
+class Counted(FUSED_Object):
+
+    def __init__(self, slope=2.0):
+
+        super(Counted,self).__init__()
+
+        self.slope = slope
+        self.calls = 0
+        self.add_input(name='x', val=1.0)
+        self.add_input(name='v', val=np.zeros(2), shape=(2,))
+        self.add_output(name='y', val=0.0)
+
+    def compute(self, inputs, outputs):
+
+        self.calls += 1
+        outputs['y'] = self.slope * inputs['x'] + np.sum(inputs['v'])
+
+        return outputs
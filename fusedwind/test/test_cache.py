@@ -0,0 +1,77 @@
+# Tests of the keys and names of fusedwind.fused_cache
+
+import numpy as np
+
+from fusedwind.fused_cache import FUSED_Cache, FUSED_Cached, hash_inputs, model_name
+from fusedwind.test.models import Counted
+
+def test_hash_inputs():
+
+    inner_dict = Counted().interface['input']
+    inputs = {'x': 1.0, 'v': np.array([0.0, 1.0])}
+
+    assert hash_inputs(inner_dict, inputs) == hash_inputs(inner_dict, {'x': np.array([1.0]), 'v': [0.0, 1.0]})
+    assert hash_inputs(inner_dict, inputs) != hash_inputs(inner_dict, {'x': 1.0, 'v': np.array([1.0, 0.0])})
+    assert hash_inputs(inner_dict, inputs) != hash_inputs(inner_dict, inputs, 'other')
+
+def test_hits_and_misses():
+
+    model = Counted()
+    cached = FUSED_Cached(model)
+    for x in [1.0, 2.0, 1.0, 1.0, 2.0]:
+        outputs = cached.compute({'x': x, 'v': np.zeros(2)}, {})
+        assert outputs['y'] == 2.0 * x
+    cached.compute({'x': 1.0, 'v': np.ones(2)}, {})
+
+    assert model.calls == 3
+    assert cached.cache.stats()['hits'] == 3
+    assert cached.cache.stats()['misses'] == 3
+
+# Models are named by their configuration, not by what they set while running or by their identity
+def test_model_names():
+
+    model = Counted(3.0)
+    name = model_name(model)
+    model.compute({'x': 1.0, 'v': np.zeros(2)}, {})
+
+    assert model_name(model) == name
+    assert model_name(Counted(3.0)) == name
+    assert model_name(Counted(slope=3.0)) != model_name(Counted(2.0))
+
+# A cache shared by two models of different configurations keeps their outputs apart
+def test_shared_cache():
+
+    cache = FUSED_Cache()
+    first = FUSED_Cached(Counted(2.0), cache)
+    second = FUSED_Cached(Counted(5.0), cache)
+    inputs = {'x': 1.0, 'v': np.zeros(2)}
+
+    assert first.compute(inputs, {})['y'] == 2.0
+    assert second.compute(inputs, {})['y'] == 5.0
+    assert FUSED_Cached(Counted(5.0), cache).compute(inputs, {})['y'] == 5.0
+    assert cache.stats()['hits'] == 1
+
+# Entries on disk are found again by a new cache of the same directory, as by another process
+def test_disk_cache(tmp_path):
+
+    inputs = {'x': 4.0, 'v': np.ones(2)}
+    model = Counted(2.0)
+    FUSED_Cached(model, FUSED_Cache(path=str(tmp_path))).compute(inputs, {})
+    again = Counted(2.0)
+    cached = FUSED_Cached(again, FUSED_Cache(path=str(tmp_path)))
+
+    assert cached.compute(inputs, {})['y'] == 10.0
+    assert again.calls == 0
+    assert cached.cache.stats()['disk_hits'] == 1
+
+# The least recently used entries are evicted to stay within the memory budget
+def test_eviction():
+
+    cache = FUSED_Cache(max_bytes=3 * 8)
+    for key in ['a', 'b', 'c']:
+        cache.put(key, {'y': np.zeros(1)})
+    cache.get('a')
+    cache.put('d', {'y': np.zeros(1)})
+
+    assert sorted(cache.entries.keys()) == ['a', 'c', 'd']
+    assert cache.get('b') is None
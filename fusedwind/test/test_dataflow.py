@@ -0,0 +1,73 @@
+# Tests of the native dataflow of fusedwind.fused_dataflow against the same assembly run by OpenMDAO
+
+import numpy as np
+import pytest
+
+from fusedwind.fused_dataflow import FUSED_Dataflow
+from fusedwind.test.models import Rotor, Cost
+
+inputs = {'diameter': 140.0, 'speeds': np.array([5.0, 8.0, 11.0]), 'rating': 6.0e6}
+outputs = ['area', 'power', 'cost', 'specific_cost']
+
+def rotor_dataflow(**options):
+
+    dataflow = FUSED_Dataflow(**options)
+    dataflow.add('rotor', Rotor())
+    dataflow.add('cost', Cost())
+    dataflow.setup()
+
+    return dataflow
+
+def expected_values():
+
+    values = dict(inputs)
+    values.update(Rotor().compute_batch(dict((k, [v]) for k, v in inputs.items())))
+    values.update(Cost().compute_batch({'area': values['area'], 'power': values['power']}))
+
+    return dict((k, np.ravel(values[k])) for k in outputs)
+
+def test_dataflow():
+
+    dataflow = rotor_dataflow()
+    for k, v in inputs.items():
+        dataflow[k] = v
+    dataflow.run()
+
+    for k, v in expected_values().items():
+        assert np.allclose(np.ravel(dataflow[k]), v, rtol=1e-14, atol=0.0)
+
+# Incremental and threaded runs give the same values as full runs
+@pytest.mark.parametrize('options', [{'incremental': True}, {'threads': 2}])
+def test_dataflow_options(options):
+
+    reference = rotor_dataflow()
+    with rotor_dataflow(**options) as dataflow:
+        for rating in [6.0e6, 6.0e6, 3.0e6]:
+            for problem in [reference, dataflow]:
+                problem['rating'] = rating
+                problem.run()
+            for k in outputs:
+                assert np.array_equal(dataflow[k], reference[k])
+
+# OpenMDAO writes its reports and outputs in the working directory, the test runs in a temporary one
+def test_openmdao_equals_dataflow(tmp_path, monkeypatch):
+
+    pytest.importorskip('openmdao')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('OPENMDAO_REPORTS', '0')
+    from fusedwind.fused_openmdao import FUSED_Component, FUSED_Group, FUSED_add, FUSED_Problem, FUSED_setup, FUSED_run
+
+    root = FUSED_Group()
+    FUSED_add(root, 'rotor', FUSED_Component(Rotor()), ['*'])
+    FUSED_add(root, 'cost', FUSED_Component(Cost()), ['*'])
+    problem = FUSED_Problem(root)
+    FUSED_setup(problem)
+    dataflow = rotor_dataflow()
+    for k, v in inputs.items():
+        problem[k] = v
+        dataflow[k] = v
+    FUSED_run(problem)
+    dataflow.run()
+
+    for k in outputs:
+        assert np.allclose(np.ravel(problem[k]), np.ravel(dataflow[k]), rtol=1e-14, atol=0.0)
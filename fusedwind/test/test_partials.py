@@ -0,0 +1,55 @@
+# Tests of the Jacobians of fusedwind.fused_partials
+
+import numpy as np
+
+from fusedwind.fused_partials import FUSED_Partials
+from fusedwind.test.models import Rotor
+
+# Exact Jacobian of Rotor by hand, in the flat layouts of the partials
+def rotor_jacobian(partials, diameter, speeds, rating, cp=0.45):
+
+    area = 0.25 * np.pi * diameter**2
+    ideal = 0.5 * 1.225 * cp * area * speeds**3
+    t = np.tanh(ideal / rating)
+    slope = 1.0 - t**2
+
+    J = np.zeros((partials.n_out, partials.n_in))
+    o_area = partials.output_layout['area'][0]
+    o_power = slice(*partials.output_layout['power'][:2])
+    i_diameter = partials.input_layout['diameter'][0]
+    i_rating = partials.input_layout['rating'][0]
+    i_speeds = partials.input_layout['speeds'][0]
+    J[o_area, i_diameter] = 0.5 * np.pi * diameter
+    J[o_power, i_diameter] = slope * ideal * 2.0 / diameter
+    J[o_power, i_rating] = t - slope * ideal / rating
+    J[o_power, i_speeds + np.arange(3)] = np.diag(slope * 3.0 * ideal / speeds)
+
+    return J
+
+def test_complex_step_is_exact():
+
+    partials = FUSED_Partials(Rotor(), 'cs')
+    speeds = np.array([6.0, 9.0, 12.0])
+    J = partials.jacobian()
+
+    assert np.allclose(J, rotor_jacobian(partials, 120.0, speeds, 5.0e6), rtol=1e-12, atol=0.0)
+
+# Finite differences agree with complex step on every column, including the rating of a magnitude of 1e6
+def test_finite_differences_agree_with_complex_step():
+
+    inputs = {'diameter': 150.0, 'speeds': np.array([5.0, 8.0, 11.0]), 'rating': 8.0e6}
+    J_cs = FUSED_Partials(Rotor(), 'cs').jacobian(inputs)
+    for form, rtol in [('forward', 1e-4), ('central', 1e-7)]:
+        partials = FUSED_Partials(Rotor(), 'fd', form=form)
+        J_fd = partials.jacobian(inputs)
+        for j in range(partials.n_in):
+            scale = np.abs(J_cs[:, j]).max()
+            assert np.abs(J_fd[:, j] - J_cs[:, j]).max() <= rtol * scale
+
+def test_sparsity():
+
+    partials = FUSED_Partials(Rotor(), 'cs')
+
+    assert set(partials.nonzero.keys()) == set([('area', 'diameter'), ('power', 'diameter'), ('power', 'speeds'), ('power', 'rating')])
+    rows, cols = partials.nonzero['power', 'speeds']
+    assert np.array_equal(rows, cols)
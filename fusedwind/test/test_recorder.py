@@ -0,0 +1,83 @@
+# Tests of the streaming recorder of fusedwind.fused_recorder and of sweeps recorded by FUSED_DOE
+
+import os
+
+import numpy as np
+import pytest
+
+from fusedwind.fused_doe import FUSED_DOE
+from fusedwind.fused_recorder import FUSED_Recorder, load_records, read_meta
+from fusedwind.fused_sampling import full_factorial
+from fusedwind.test.models import Rotor
+
+def test_record_and_load(tmp_path):
+
+    path = str(tmp_path / 'sweep')
+    with FUSED_Recorder(path, ['x', 'v'], chunk_size=4) as recorder:
+        for i in range(10):
+            recorder.record({'x': np.array([float(i)]), 'v': np.full(3, i)})
+        assert read_meta(path)['count'] == 8
+        assert len(recorder) == 10
+
+    records = load_records(path)
+    assert records['x'].shape == (10,)
+    assert records['v'].shape == (10, 3)
+    assert np.array_equal(records['x'], np.arange(10.0))
+    assert np.array_equal(load_records(path, False)['v'][:, 1], np.arange(10.0))
+
+# A recording is resumed after its committed cases, rows written after the last commit are truncated
+def test_resume_and_truncate(tmp_path):
+
+    path = str(tmp_path / 'sweep')
+    recorder = FUSED_Recorder(path, ['x'], chunk_size=4)
+    recorder.record_batch({'x': np.arange(6.0)})
+    del recorder
+
+    # A chunk written without its commit, as by a run that stopped between the two
+    with open(os.path.join(path, 'x.f64'), 'ab') as f:
+        np.full(4, -1.0).tofile(f)
+
+    recorder = FUSED_Recorder(path, ['x'], chunk_size=4)
+    assert len(recorder) == 4
+    assert os.path.getsize(os.path.join(path, 'x.f64')) == 4 * 8
+    recorder.record_batch({'x': np.arange(4.0, 9.0)})
+    recorder.close()
+
+    assert np.array_equal(load_records(path)['x'], np.arange(9.0))
+    with pytest.raises(Exception):
+        FUSED_Recorder(path, ['y'])
+
+def test_digest(tmp_path):
+
+    path = str(tmp_path / 'sweep')
+    with FUSED_Recorder(path, ['x'], digest='a') as recorder:
+        recorder.record({'x': 1.0})
+
+    assert len(FUSED_Recorder(path, digest='a')) == 1
+    with pytest.raises(Exception):
+        FUSED_Recorder(path, digest='b')
+
+# A sweep stopped part way is resumed by recording it again, another sweep is refused
+def test_sweep_resume(tmp_path):
+
+    path = str(tmp_path / 'sweep')
+    cases = full_factorial({'diameter': np.linspace(80.0, 160.0, 5), 'rating': [3.0e6, 5.0e6, 8.0e6]})
+    doe = FUSED_DOE(Rotor(), cases, ['area', 'power'], chunk_size=4)
+    expected, errors = doe.run()
+
+    recorder = FUSED_Recorder(path, ['diameter', 'rating', 'area', 'power'], chunk_size=4)
+    recorder.check(doe.digest())
+    chunk_values = dict((k, v[:4]) for k, v in cases.items())
+    chunk_values.update(dict((k, v[:4]) for k, v in expected.items()))
+    recorder.record_batch(chunk_values)
+    assert read_meta(path)['count'] == 4
+
+    recorder = FUSED_Recorder(path, chunk_size=4)
+    assert doe.record(recorder) == {}
+    records = load_records(path)
+    assert np.array_equal(records['diameter'], cases['diameter'])
+    assert np.array_equal(records['power'], expected['power'])
+
+    other = FUSED_DOE(Rotor(0.4), cases, ['area', 'power'], chunk_size=4)
+    with pytest.raises(Exception):
+        other.record(FUSED_Recorder(path))
@@ -0,0 +1,73 @@
+# Tests of the case tables and quasi-random sequences of fusedwind.fused_sampling
+
+import numpy as np
+import pytest
+
+from fusedwind.fused_sampling import sobol_sequence, halton_sequence, full_factorial, case_count
+
+# The first points in Gray code order, the origin is point 0
+def test_sobol_first_points():
+
+    expected = [[0.0, 0.0, 0.0], [0.5, 0.5, 0.5], [0.75, 0.25, 0.25], [0.25, 0.75, 0.75], [0.375, 0.375, 0.625]]
+
+    assert np.array_equal(sobol_sequence(5, 3, 0), expected)
+    assert np.array_equal(sobol_sequence(4, 3), expected[1:])
+
+# Every block of 2**k points starting at a multiple of 2**k puts one point in each interval of width 2**-k per dimension
+def test_sobol_stratification():
+
+    k = 8
+    for start in [0, 256, 1024]:
+        points = sobol_sequence(2**k, 64, start)
+        cells = np.floor(points * 2**k).astype(int)
+        for d in range(64):
+            assert np.array_equal(np.sort(cells[:, d]), np.arange(2**k))
+
+def test_sobol_matches_reference():
+
+    qmc = pytest.importorskip('scipy.stats.qmc')
+    reference = qmc.Sobol(64, scramble=False, bits=32).random(1024)
+
+    assert np.array_equal(sobol_sequence(1024, 64, 0), reference)
+
+# Tables of consecutive ranges of start are parts of one sequence
+def test_sobol_continuation():
+
+    whole = sobol_sequence(1000, 7)
+    parts = np.vstack([sobol_sequence(300, 7, 1), sobol_sequence(1, 7, 301), sobol_sequence(699, 7, 302)])
+
+    assert np.array_equal(whole, parts)
+
+def test_sobol_dimensions():
+
+    assert sobol_sequence(0, 4).shape == (0, 4)
+    with pytest.raises(Exception):
+        sobol_sequence(1, 65)
+
+def test_halton_first_points():
+
+    expected = [[1.0/2, 1.0/3, 1.0/5], [1.0/4, 2.0/3, 2.0/5], [3.0/4, 1.0/9, 3.0/5], [1.0/8, 4.0/9, 4.0/5]]
+
+    assert np.allclose(halton_sequence(4, 3), expected, rtol=0.0, atol=1e-15)
+
+def test_halton_matches_reference():
+
+    qmc = pytest.importorskip('scipy.stats.qmc')
+    reference = qmc.Halton(5, scramble=False).random(200)
+
+    assert np.allclose(halton_sequence(200, 5, 0), reference, rtol=0.0, atol=1e-15)
+
+def test_halton_continuation():
+
+    whole = halton_sequence(500, 4)
+    parts = np.vstack([halton_sequence(123, 4, 1), halton_sequence(377, 4, 124)])
+
+    assert np.array_equal(whole, parts)
+    assert halton_sequence(0, 4).shape == (0, 4)
+
+def test_full_factorial():
+
+    cases = full_factorial({'b': [1.0, 2.0, 3.0], 'a': [0.0, 1.0]})
+
+    assert case_count(cases) == 6
+    assert set(zip(cases['a'], cases['b'])) == set((a, b) for a in [0.0, 1.0] for b in [1.0, 2.0, 3.0])
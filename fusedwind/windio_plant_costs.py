@@ -1,100 +1,24 @@
-# placeholder code - will replace with importing from yaml
+# Interfaces of the plant cost models, imported from windio/plant_costs.yaml
 
-from fusedwind.fused_wind import create_interface, set_output, set_input
+from fusedwind.fused_windio import FUSED_WindIO, windio_path
 
-### Wind IO content (in windio - as yaml and in FUSED-Wind (or windio) as python dictionary translation)
+### Wind IO content (in windio - as yaml and in FUSED-Wind as FUSED interfaces compiled from it)
 
-## Turbine Cost
-# turbine costs
-turbine_cost = {'name': 'turbine_cost', 'type': float, 'val': 0.0}
+# The YAML file is compiled once into a binary cache and only loaded when one of the interfaces is first used
+plant_costs = FUSED_WindIO(windio_path('plant_costs.yaml'))
 
-# turbine cost model description (basic)
-machine_rating =  { 'name': 'machine_rating' , 'type': float, 'val': 0.0 }
-rotor_diameter =  { 'name': 'rotor_diameter' , 'type': float, 'val': 0.0 }
-hub_height =  { 'name': 'hub_height' , 'type': float, 'val': 0.0 }
-blade_number = { 'name': 'blade_number', 'type': int, 'val': 3}
-
-# turbine cost 
-fifc_tcc_costs = create_interface()
-set_output(fifc_tcc_costs, turbine_cost)
-set_input(fifc_tcc_costs, machine_rating)
-set_input(fifc_tcc_costs, rotor_diameter)
-set_input(fifc_tcc_costs, hub_height)
-set_input(fifc_tcc_costs, blade_number)
-
-
-## Plant AEP
-# aep
-net_aep = {'name':'net_aep', 'type': float, 'val': 0.0}
-
-# plant aep model description (basic)
-machine_rating =  { 'name': 'machine_rating' , 'type': float, 'val': 1 }
-rotor_diameter =  { 'name': 'rotor_diameter' , 'type': float, 'val': 1 }
-hub_height =  { 'name': 'hub_height' , 'type': float, 'val': 1 }
-turbine_number =  { 'name': 'turbine_number' , 'type': int, 'val': 1 }
-
-#aep
-fifc_aep = create_interface()
-set_output(fifc_aep, net_aep)
-set_input(fifc_aep, machine_rating)
-set_input(fifc_aep, rotor_diameter)
-set_input(fifc_aep, hub_height)
-set_input(fifc_aep, turbine_number)
-
-## Plant Cost
-# bos costs
-bos_costs =  { 'name': 'bos_costs' , 'type': float, 'val': 1 }
-
-# plant cost model description (basic)
-machine_rating =  { 'name': 'machine_rating' , 'type': float, 'val': 1 }
-rotor_diameter =  { 'name': 'rotor_diameter' , 'type': float, 'val': 1 }
-hub_height =  { 'name': 'hub_height' , 'type': float, 'val': 1 }
-RNA_mass =  { 'name': 'RNA_mass' , 'type': float, 'val': 1 }
-turbine_cost =  { 'name': 'turbine_cost' , 'type': float, 'val': 1 }
-turbine_number =  { 'name': 'turbine_number' , 'type': float, 'val': 1 }
+__all__ = ['fifc_tcc_costs', 'fifc_aep', 'fifc_bos_costs', 'fifc_opex', 'fifc_finance']
 
 ### FUSED-interface content (in FUSED-Wind)
-# bos_costs
-fifc_bos_costs = create_interface()
-set_output(fifc_bos_costs, bos_costs)
-set_input(fifc_bos_costs, machine_rating)
-set_input(fifc_bos_costs, rotor_diameter)
-set_input(fifc_bos_costs, hub_height)
-set_input(fifc_bos_costs, RNA_mass)
-set_input(fifc_bos_costs, turbine_cost)
-set_input(fifc_bos_costs, turbine_number)
-
-# opex
-# bos costs
-avg_annual_opex =  { 'name': 'avg_annual_opex' , 'type': int, 'val': 1 }
-
-# plant cost model description (basic)
-machine_rating =  { 'name': 'machine_rating' , 'type': int, 'val': 1 }
-turbine_number =  { 'name': 'turbine_number' , 'type': int, 'val': 1 }
-
-# opex
-fifc_opex = create_interface()
-set_output(fifc_opex, avg_annual_opex)
-set_input(fifc_opex, machine_rating)
-set_input(fifc_opex, turbine_number)
 
+# Interfaces are resolved on first access and kept as module attributes, later lookups do not come here
+def __getattr__(name):
 
-## Financing
-# financial model output
-coe = {'name' : 'coe', 'type': float, 'val': 0.0}
+    if name in __all__:
+        globals()[name] = plant_costs[name]
+        return globals()[name]
+    raise AttributeError('module '+__name__+' has no attribute '+name)
 
-# finance model description (basic)
-turbine_cost = {'name': 'turbine_cost', 'type': float, 'val': 0.0}
-turbine_number = {'name':'turbine_number', 'type':float, 'val': 0.0}
-bos_costs = {'name' : 'bos_costs', 'type':float, 'val': 0.0}
-avg_annual_opex = {'name':'avg_annual_opex', 'type':float, 'val': 0.0}
-net_aep = {'name':'net_aep', 'type': float, 'val': 0.0}
+def __dir__():
 
-# turbine cost 
-fifc_finance = create_interface()
-set_input(fifc_finance, turbine_cost)
-set_input(fifc_finance, turbine_number)
-set_input(fifc_finance, bos_costs)
-set_input(fifc_finance, avg_annual_opex)
-set_input(fifc_finance, net_aep)
-set_output(fifc_finance, coe)
+    return sorted(list(globals().keys()) + __all__)
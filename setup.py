@@ -33,7 +33,7 @@ setup(name='fusedwind',
 #         'fusedwind.core',
 #         'fusedwind.lib',
 #         'fusedwind.util',
-#         'fusedwind.test',
+         'fusedwind.test',
 #         'fusedwind.variables',
 #         'fusedwind.turbine',
 #         'fusedwind.turbine.test',
@@ -41,12 +41,14 @@ setup(name='fusedwind',
 #         'fusedwind.plant_cost',
       ],
       package_data={
+         'fusedwind': ['windio/*.yaml'],
 #         'fusedwind.turbine.test': ['data/*',
 #                                    'data_version_1/*',
 #                                    'data_version_2/*'],
       },
       install_requires=[
 #       'six', 'Sphinx', 'numpydoc', 'networkx',
+        'pyyaml',
       ],
       entry_points= """
       """